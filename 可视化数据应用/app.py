@@ -3,6 +3,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import streamlit as st
+import os
+import time
+
+from arrow_cache import default_sheet_cache
+from chart_layout import CHART_TYPES, DEFAULT_LAYOUT, MAX_COLUMNS, load_layout, resolve_layout
+from profiler import Profiler, profile_log_path, profiling_requested
+from workbook import (
+    ColumnValueIndex, LazyWorkbook, compact_from_env, group_means, parallel_workers_from_env, people_matrix,
+    person_metrics, person_rows, person_statistics
+)
+from workbook_cache import content_hash, shared_workbook_cache
+from workbook_source import shared_prefetcher, shared_workbook_directory, workbook_dir_from_env
 
 # 初始化session state
 if 'qwen_api_key' not in st.session_state:
@@ -106,6 +118,29 @@ def render_header():
     pass
 
 
+def evaluation_error_message(error):
+    """生成评价失败时显示的提示"""
+    from qianwen_api import (
+        AuthError, DeadlineExceededError, EndpointNotFoundError, GenerationCancelled, NetworkError,
+        RateLimitedError, RequestTimeoutError, ServerError
+    )
+    if isinstance(error, AuthError):
+        return "⚠️ API Key 未配置或无效，请在侧边栏中检查您的 API Key"
+    if isinstance(error, EndpointNotFoundError):
+        return "⚠️ API 地址或模型未找到，请检查 Base URL 和模型配置"
+    if isinstance(error, (RequestTimeoutError, DeadlineExceededError)):
+        return "⚠️ 网络连接超时，请检查网络连接或稍后重试"
+    if isinstance(error, NetworkError):
+        return "⚠️ 无法连接到模型服务，请检查网络连接和 Base URL"
+    if isinstance(error, RateLimitedError):
+        return "⚠️ 请求过于频繁或额度不足，请稍后重试"
+    if isinstance(error, ServerError):
+        return "⚠️ 模型服务暂时不可用，请稍后重试"
+    if isinstance(error, GenerationCancelled):
+        return "⚠️ 生成已取消"
+    return f"⚠️ 生成失败: {error}"
+
+
 def render_sidebar():                #渲染侧边栏
     """渲染侧边栏"""
     st.sidebar.markdown('<div class="sidebar">', unsafe_allow_html=True)
@@ -149,96 +184,415 @@ def render_sidebar():                #渲染侧边栏
         # # 提示信息
         # st.info("请在主页面中选择人员数据，然后点击下方按钮生成评价")
         
+        # 忽略缓存选项：数据和模型参数都没变时默认直接返回上次的评价
+        refresh_evaluation = st.checkbox(
+            "忽略缓存，重新生成",
+            value=False,
+            help="默认情况下，相同人员数据和模型的评价会直接使用缓存结果",
+            key="refresh_evaluation"
+        )
+        
         # 生成评价按钮
         generate_eval_btn = st.button(
             "📝 生成人员评价",
             key="generate_evaluation_btn",
             help="根据主页面中筛选的人员数据生成评价",
-            use_container_width=True
+            width='stretch'
         )
         
         # 显示评价结果
         if generate_eval_btn:
             # 获取主页面中的筛选数据
-            if 'filtered_df' in st.session_state and len(st.session_state.filtered_df) > 0:
+            filtered_df = get_filtered_df()
+            if filtered_df is not None and len(filtered_df) > 0:
                 with st.spinner('正在生成评价...'):
                     # 准备人员数据
-                    person_name = st.session_state.filtered_df.iloc[0].iloc[0]
-                    person_data = st.session_state.filtered_df.iloc[0].to_dict()
+                    person_name = filtered_df.iloc[0].iloc[0]
+                    person_data = filtered_df.iloc[0].to_dict()
                     import json
                     person_data_str = json.dumps(person_data, ensure_ascii=False, indent=2)
                     
-                    # 使用qianwen_api中的函数生成评价
-                    from qianwen_api import generate_evaluation
-                    evaluation = generate_evaluation(
-                        person_data_str,
-                        person_name,
-                        api_key=st.session_state.qwen_api_key,
-                        base_url=st.session_state.qwen_base_url,
-                        model=st.session_state.qwen_model
-                    )
+                    # 使用qianwen_api中的函数流式生成评价，边生成边显示
+                    # 页面重新运行或用户离开时，Streamlit 在下一次更新页面时中断脚本，生成器随之关闭连接
+                    from qianwen_api import GenerationError, stream_evaluation
+                    result_placeholder = st.empty()
+                    evaluation = ""
+                    error = None
+                    with get_profiler().stage('generate_evaluation') as record:
+                        try:
+                            for chunk in stream_evaluation(
+                                person_data_str,
+                                person_name,
+                                api_key=st.session_state.qwen_api_key,
+                                base_url=st.session_state.qwen_base_url,
+                                model=st.session_state.qwen_model,
+                                refresh=refresh_evaluation
+                            ):
+                                evaluation += chunk
+                                result_placeholder.markdown(f"**评价结果：**\n\n{evaluation}")
+                        except GenerationError as e:
+                            error = e
+                        record['payload_bytes'] = len(evaluation.encode('utf-8'))
                     
-                    # 检查评价结果是否包含错误信息
-                    if evaluation.startswith("生成评价时出错") or evaluation.startswith("生成失败"):
-                        # 解析错误信息，提供更友好的提示
-                        error_msg = evaluation
-                        if "401" in error_msg or "API key" in error_msg:
-                            st.error("⚠️ API Key 未配置或无效，请在侧边栏中检查您的 API Key")
-                        elif "404" in error_msg:
-                            st.error("⚠️ API 地址未找到，请检查 Base URL 配置")
-                        elif "timeout" in error_msg.lower() or "连接" in error_msg:
-                            st.error("⚠️ 网络连接超时，请检查网络连接或稍后重试")
-                        else:
-                            st.error(f"⚠️ {evaluation}")
-                    else:
-                        st.markdown("**评价结果：**")
-                        st.markdown(evaluation)
+                    # 按错误类型提供更友好的提示
+                    if error is not None:
+                        st.error(evaluation_error_message(error))
             else:
                 st.warning("请先在主页面中选择人员数据")
 
+        # 评价缓存统计
+        from qianwen_api import default_evaluation_cache
+        cache_stats = default_evaluation_cache().stats()
+        st.caption(f"评价缓存：{cache_stats['entries']} 条，命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次")
+
 
     
     return None
 
 
-def read_file(uploaded_file):
-    """读取上传的文件并返回数据"""
+def render_batch_evaluation(df, sheet_names, sheet_dfs):
+    """在侧边栏渲染批量生成评价功能"""
+    with st.sidebar.expander("📝 批量生成评价", expanded=False):
+        only_filtered = st.checkbox(
+            "仅评价当前筛选结果",
+            value=False,
+            help="勾选后只评价主页面筛选出的人员，否则评价第一列中的所有人员",
+            key="batch_eval_only_filtered"
+        )
+        concurrency = st.number_input("并发请求数", min_value=1, max_value=32, value=4, key="batch_eval_concurrency")
+        requests_per_minute = st.number_input(
+            "每分钟请求上限",
+            min_value=0,
+            max_value=6000,
+            value=60,
+            help="0表示不限速",
+            key="batch_eval_rpm"
+        )
+        max_retries = st.number_input("失败重试次数", min_value=0, max_value=10, value=3, key="batch_eval_retries")
+        refresh = st.checkbox("忽略缓存，重新生成", value=False, key="batch_eval_refresh")
+
+        filtered_df = get_filtered_df() if only_filtered else None
+        source_df = filtered_df if filtered_df is not None else df
+        person_names = source_df.iloc[:, 0].dropna().unique().tolist() if len(source_df.columns) > 0 else []
+        st.caption(f"待评价人数: {len(person_names)}")
+
+        if st.button("📝 批量生成评价", key="batch_evaluation_btn", width='stretch', disabled=not person_names):
+            progress_bar = st.progress(0.0, text="正在批量生成评价...")
+
+            def on_progress(done, total, person_name):
+                progress_bar.progress(done / total, text=f"已完成 {done}/{total}：{person_name}")
+
+            from qianwen_api import generate_evaluations_batch
+            with get_profiler().stage('generate_evaluations_batch', rows=len(person_names)):
+                st.session_state.batch_evaluations = generate_evaluations_batch(
+                    person_names,
+                    sheet_names,
+                    sheet_dfs,
+                    api_key=st.session_state.qwen_api_key,
+                    base_url=st.session_state.qwen_base_url,
+                    model=st.session_state.qwen_model,
+                    concurrency=int(concurrency),
+                    requests_per_minute=int(requests_per_minute),
+                    max_retries=int(max_retries),
+                    progress_callback=on_progress,
+                    refresh=refresh
+                )
+
+        if st.session_state.get('batch_evaluations'):
+            evaluations, failures = st.session_state.batch_evaluations
+            names = list(evaluations) + list(failures)
+            # 失败的人员按错误类型给出提示，评价列留空
+            result_df = pd.DataFrame({
+                "人员": names,
+                "评价": [evaluations.get(name, "") for name in names],
+                "错误": [evaluation_error_message(failures[name]) if name in failures else "" for name in names],
+            })
+            st.info(f"共 {len(names)} 人，失败 {len(failures)} 人")
+            if failures:
+                reasons = pd.Series([evaluation_error_message(error) for error in failures.values()]).value_counts()
+                for reason, count in reasons.items():
+                    st.caption(f"{reason}（{count} 人）")
+            st.download_button(
+                "下载评价结果",
+                data=result_df.to_csv(index=False).encode('utf-8-sig'),
+                file_name="人员评价.csv",
+                mime="text/csv",
+                key="batch_evaluation_download",
+                width='stretch'
+            )
+
+
+def get_profiler():
+    """获取当前会话的性能分析器"""
+    if 'profiler' not in st.session_state:
+        st.session_state.profiler = Profiler(
+            enabled=profiling_requested(st.query_params),
+            log_path=profile_log_path()
+        )
+    return st.session_state.profiler
+
+
+def render_profiler_panel():
+    """在侧边栏显示本次运行各阶段的耗时（仅在开启性能分析时显示）
+
+    切换人员等只重新运行片段的操作不会刷新本面板，这些阶段的记录仍会写入日志文件。
+    """
+    profiler = get_profiler()
+    if not profiler.enabled:
+        return
+    with st.sidebar.expander("⏱️ 性能分析", expanded=False):
+        stage_df = profiler.to_frame()
+        if stage_df.empty:
+            st.caption("暂无记录")
+            return
+        st.caption(f"运行 {profiler.run_id}，共 {len(stage_df)} 个阶段")
+        st.dataframe(stage_df, width='stretch', hide_index=True)
+        if profiler.log_path:
+            st.caption(f"记录已追加到 {profiler.log_path}")
+
+
+def cache_admin_requested():
+    """是否显示工作簿缓存管理面板：环境变量 APP_ADMIN=1
+
+    共享缓存中包含所有会话上传的文件，因此只能由部署方通过环境变量开启，不提供页面地址参数。
+    """
+    return os.environ.get('APP_ADMIN', '').lower() in ('1', 'true', 'yes')
+
+
+def render_cache_admin_panel():
+    """在侧边栏显示共享工作簿缓存的内容和内存占用（仅在开启管理面板时显示）"""
+    if not cache_admin_requested():
+        return
+    cache = get_workbook_cache()
+    with st.sidebar.expander("🗄️ 工作簿缓存", expanded=False):
+        entries = cache.describe()
+        total = sum(entry['bytes'] for entry in entries)
+        st.caption(
+            f"{len(entries)} 个工作簿，{total / 1024 / 1024:.1f} / {cache.max_bytes / 1024 / 1024:.0f} MB，"
+            f"命中 {cache.hits} 次，未命中 {cache.misses} 次"
+        )
+        if not entries:
+            return
+        rows = []
+        for entry in entries:
+            file_hash, _ = entry['key']
+            workbook = entry['value']
+            rows.append({
+                '文件': workbook.file_name,
+                '哈希': file_hash[:12],
+                '已加载子表': f"{len(workbook.loaded_sheets())}/{len(workbook.sheet_names)}",
+                '内存(MB)': round(entry['bytes'] / 1024 / 1024, 1),
+                '最近访问': time.strftime('%H:%M:%S', time.localtime(entry['last_access'])),
+            })
+        st.dataframe(pd.DataFrame(rows), width='stretch', hide_index=True)
+        if st.button("清空缓存", key="clear_workbook_cache", width='stretch'):
+            cache.clear()
+            st.rerun()
+
+
+def get_workbook_cache():
+    """获取进程内共享的工作簿缓存（按文件内容哈希去重，所有会话只读共用，LRU淘汰）"""
+    return shared_workbook_cache(sizeof=lambda workbook: workbook.nbytes())
+
+
+def get_filtered_df():
+    """当前会话筛选出的数据行
+
+    会话中只保存工作簿的缓存键和筛选出的行位置，数据本身从共享缓存中的工作簿即时取出，
+    不在每个会话里保存副本。工作簿已被淘汰或尚未筛选时返回 None。
+    """
+    key = st.session_state.get('workbook_key')
+    positions = st.session_state.get('filtered_positions')
+    if key is None or positions is None:
+        return None
+    # 侧边栏每次重新运行都会调用，不计入管理面板中的命中统计
+    workbook = get_workbook_cache().peek(key)
+    if workbook is None:
+        return None
+    return workbook[workbook.sheet_names[0]].iloc[positions]
+
+
+def open_workbook(file_name, data, file_hash=None):
+    """打开文件内容，返回按需解析子表的工作簿
+
+    已解析的子表会写入磁盘列式缓存，服务重启后再次上传同一文件时直接映射读取。
+    环境变量 WORKBOOK_COMPACT=1 时，子表加载后会转换为更省内存的类型。
+    """
+    return LazyWorkbook.open(
+        file_name, data, file_hash=file_hash, disk_cache=default_sheet_cache(), compact=compact_from_env()
+    )
+
+
+def find_previous_workbook(cache, file_name, source_path=None):
+    """在缓存中查找最近使用的同名文件；提供 source_path 时查找服务器目录中同一路径的文件"""
+    for _, workbook in cache.items():
+        if source_path is not None:
+            if workbook.source_path == source_path:
+                return workbook
+        elif workbook.file_name == file_name:
+            return workbook
+    return None
+
+
+def workbook_cache_key(file_name, file_hash):
+    """共享缓存的键：按内容去重，不同会话上传同一份文件时共用一个工作簿（扩展名决定解析方式，也作为键的一部分）"""
+    return (file_hash, os.path.splitext(file_name)[1].lower())
+
+
+def cached_workbook(cache, source_file, file_hash):
+    """从共享缓存中取出工作簿，不存在时打开并写入缓存
+
+    不调用页面组件，可以在后台线程中使用。其他会话正在解析同一文件时等待其完成，不会重复解析。
+    服务器目录中的文件（ServerFile）修改后，新版本复用旧版本中没有变化的子表，
+    之后从缓存中删除同一路径的所有旧版本。
+
+    Returns:
+        (工作簿, 是否由本次调用创建)
+    """
+    cache_key = workbook_cache_key(source_file.name, file_hash)
+    source_path = getattr(source_file, 'path', None)
+
+    def create():
+        created = open_workbook(source_file.name, source_file.getvalue(), file_hash)
+        created.source_path = source_path
+        # 重新上传修改过的同名文件时，内容没有变化的子表直接复用旧版本的解析结果
+        previous = find_previous_workbook(cache, source_file.name, source_path)
+        if previous is not None:
+            created.reuse_unchanged_sheets(previous)
+        return created
+
+    workbook, created = cache.get_or_create(cache_key, create)
+    if created and source_path is not None:
+        # 按路径而不是按上一次的哈希删除：文件在写入过程中被读到的中间版本也会一并删除
+        for key, cached in cache.items():
+            if key != cache_key and cached.source_path == source_path:
+                cache.discard(key)
+    return workbook, created
+
+
+def preload_workbook(server_file):
+    """后台预解析服务器目录中的文件：解析所有子表并写入共享缓存（和磁盘缓存）"""
+    cache = get_workbook_cache()
+    workbook, _ = cached_workbook(cache, server_file, server_file.file_hash)
+    workbook.load_all(parallel_workers_from_env())
+    cache.trim()
+    return workbook
+
+
+def get_workbook_directory():
+    """环境变量 WORKBOOK_DIR 配置的服务器工作簿目录，未配置时返回 None"""
+    root = workbook_dir_from_env()
+    if root is None:
+        return None
+    return shared_workbook_directory(root, load=preload_workbook)
+
+
+def select_server_file(directory):
+    """从服务器目录中选择文件，返回与上传文件接口相同的对象，没有可选文件时返回 None"""
+    files = directory.list_files()
+    if not files:
+        st.info(f"目录 {directory.root} 中没有 Excel 或 CSV 文件")
+        return None
+    cache = get_workbook_cache()
+    labels = {}
+    for info in files:
+        # 只用记录中的哈希判断是否已解析，不为了显示读取文件
+        file_hash = directory.known_hash(info['name'])
+        ready = file_hash is not None and workbook_cache_key(info['name'], file_hash) in cache
+        modified = time.strftime('%Y-%m-%d %H:%M', time.localtime(info['mtime']))
+        labels[info['name']] = (
+            f"{'⚡ ' if ready else ''}{info['name']}（{info['size'] / 1024 / 1024:.1f} MB，修改于 {modified}）"
+        )
+    name = st.selectbox(
+        "选择服务器上的文件",
+        list(labels),
+        format_func=labels.get,
+        key="server_file",
+        label_visibility="collapsed",
+    )
+    prefetcher = shared_prefetcher()
+    if prefetcher is not None and name in prefetcher.errors:
+        st.warning(f"后台预解析失败: {prefetcher.errors[name]}")
     try:
-        with st.spinner('🔄 正在读取文件...'):
-            if uploaded_file.name.endswith('.csv'):
-                # CSV文件只有一个表
-                df = pd.read_csv(uploaded_file)
-                sheet_names = ["Sheet1"]
-                sheet_dfs = {"Sheet1": df}
-            else:
-                # Excel文件可能有多个子表
-                excel_file = pd.ExcelFile(uploaded_file)
-                sheet_names = excel_file.sheet_names
-                # 读取所有子表数据
-                sheet_dfs = {}
-                for sheet_name in sheet_names:
-                    sheet_dfs[sheet_name] = excel_file.parse(sheet_name)
-                # 默认使用第一个子表数据
-                df = sheet_dfs[sheet_names[0]]
-        return df, sheet_names, sheet_dfs
+        return directory.get(name)
+    except (OSError, ValueError) as e:
+        st.error(f"读取文件时出错: {str(e)}")
+        return None
+
+
+def read_file(uploaded_file, parallel_workers=None):
+    """读取上传的文件并返回数据
+
+    解析结果按文件内容哈希保存在进程内共享的缓存中，页面重新运行时以及其他会话上传同一文件时
+    直接复用，只有新的文件内容才会解析。工作簿在会话间共享，调用方不能修改其中的数据。
+    返回的子表数据为按需解析的工作簿，只有实际用到的子表才会被解析。
+    重新上传修改过的同名 .xlsx 文件时，按子表内容哈希只重新解析有变化的子表。
+    
+    Args:
+        uploaded_file: 上传的文件，或服务器目录中的文件（ServerFile）
+        parallel_workers: 并行解析的进程数，大于1时一次性在多个进程中解析所有子表；
+            默认读取环境变量 WORKBOOK_PARALLEL_WORKERS
+    """
+    if parallel_workers is None:
+        parallel_workers = parallel_workers_from_env()
+    try:
+        cache = get_workbook_cache()
+        # 服务器目录中的文件已带有按修改时间缓存的哈希，不必读取内容
+        file_hash = getattr(uploaded_file, 'file_hash', None) or content_hash(uploaded_file.getvalue())
+        cache_key = workbook_cache_key(uploaded_file.name, file_hash)
+        st.session_state.workbook_key = cache_key
+        workbook = cache.get(cache_key)
+        if workbook is None:
+            with st.spinner('🔄 正在读取文件...'):
+                workbook, _ = cached_workbook(cache, uploaded_file, file_hash)
+                if parallel_workers > 1:
+                    workbook.load_all(parallel_workers)
+                # 默认使用第一个子表数据；CSV文件分块读取，在进度条中显示读取进度
+                progress_bar = st.progress(0.0, text="正在解析数据...") if workbook.is_csv else None
+                progress = None
+                if progress_bar is not None:
+                    progress = lambda fraction: progress_bar.progress(fraction, text=f"正在解析数据... {fraction:.0%}")
+                workbook.load_sheet(workbook.sheet_names[0], progress)
+                if progress_bar is not None:
+                    progress_bar.empty()
+        df = workbook[workbook.sheet_names[0]]
+        cache.trim()
+        return df, workbook.sheet_names, workbook
     except Exception as e:
         st.error(f"读取文件时出错: {str(e)}")
         return None, None, None
 
 
-def show_file_info(uploaded_file, df, sheet_names):
+def show_file_info(uploaded_file, df, sheet_names, sheet_dfs=None):
     """显示文件信息（在上传组件下方）"""
+    memory_info = ""
+    if isinstance(sheet_dfs, LazyWorkbook):
+        # 已加载子表的内存占用，开启压缩时同时显示压缩前的大小
+        before_bytes, after_bytes = sheet_dfs.memory_report()
+        memory_info = f"\n💾 内存占用: {after_bytes / 1024 / 1024:.1f} MB"
+        if sheet_dfs.compact:
+            memory_info += f"（压缩前 {before_bytes / 1024 / 1024:.1f} MB）"
+        if sheet_dfs.reused_sheets:
+            memory_info += f"\n♻️ 未修改的子表（直接复用）: {', '.join(sheet_dfs.reused_sheets)}"
     # 在上传组件下方显示包含完整信息的成功提示
-    st.success(f"成功读取文件: {uploaded_file.name}\n📊 数据行数: {df.shape[0]}\n📋 数据列数: {df.shape[1]}\n📁 子表数量: {len(sheet_names)}\n📝 子表名称: {', '.join(sheet_names)}")
+    st.success(f"成功读取文件: {uploaded_file.name}\n📊 数据行数: {df.shape[0]}\n📋 数据列数: {df.shape[1]}\n📁 子表数量: {len(sheet_names)}\n📝 子表名称: {', '.join(sheet_names)}{memory_info}")
+
+
+# 取值数量不超过该值时直接列出所有取值，否则改为先搜索再选择
+PICKER_FULL_LIST_LIMIT = 1000
+# 搜索时最多发送到页面的匹配项数量
+PICKER_MATCH_LIMIT = 200
+
 
+def filter_data(df, sheet_dfs=None):
+    """筛选数据
 
-def filter_data(df):
-    """筛选数据"""
+    Args:
+        df: 要筛选的数据（第一个子表）
+        sheet_dfs: 工作簿，提供时复用其中缓存的列取值索引，每列只排序一次
+    """
     st.subheader("🔍 数据筛选")
     
-    # 初始化筛选后的数据
-    filtered_df = df.copy()
-    
     # 筛选功能：选择列索引和对应值进行筛选
     try:
         # 选择筛选列（按索引）
@@ -254,9 +608,25 @@ def filter_data(df):
         # 获取选中列的名称
         selected_column = df.columns[selected_col_index]
         
-        # 获取选中列的唯一值并排序
-        unique_values = df[selected_column].dropna().unique().tolist()
-        unique_values.sort()
+        # 获取选中列排序后的唯一值（按工作簿缓存）
+        if isinstance(sheet_dfs, LazyWorkbook):
+            value_index = sheet_dfs.column_values(sheet_dfs.sheet_names[0], selected_column)
+        else:
+            value_index = ColumnValueIndex(df[selected_column])
+        
+        if len(value_index) <= PICKER_FULL_LIST_LIMIT:
+            unique_values = value_index.options()
+        else:
+            # 取值太多时先按关键字查找，只把匹配的前若干项发送到页面
+            search_text = st.text_input(
+                f"搜索{selected_column}",
+                value="",
+                help=f"共 {len(value_index)} 个取值，输入关键字后只显示前 {PICKER_MATCH_LIMIT} 个匹配项",
+                key="filter_col_search"
+            )
+            unique_values = value_index.search(search_text, limit=PICKER_MATCH_LIMIT)
+            if not unique_values:
+                st.warning("没有匹配的值")
         
         # 选择筛选值
         selected_value = st.selectbox(
@@ -268,46 +638,218 @@ def filter_data(df):
         )
         
         # 执行筛选
-        filtered_df = df[df[selected_column] == selected_value]
+        positions = value_index.rows(selected_value)
+        filtered_df = df.iloc[positions]
         st.info(f"筛选后数据行数: {len(filtered_df)}")
         
-        # 将筛选后的数据保存到session_state中
-        st.session_state.filtered_df = filtered_df
+        # 只在session_state中保存行位置，数据通过 get_filtered_df 从共享的工作簿取出
+        st.session_state.filtered_positions = positions
     except Exception as e:
         st.error(f"筛选数据时出错: {str(e)}")
         # 如果筛选出错，使用原始数据
-        filtered_df = df.copy()
-        st.session_state.filtered_df = filtered_df
+        filtered_df = df
+        st.session_state.filtered_positions = slice(None)
     return filtered_df
 
 
-def configure_radar_chart(df):
-    """配置雷达图"""
+def configure_radar_chart(df, sheet_dfs=None):
+    """配置雷达图，返回雷达图顶点列
+
+    坐标反转选项放在雷达图旁边（见 radar_panel），切换时只重新渲染雷达图。
+    sheet_dfs 为工作簿时直接使用第一个子表数值矩阵的列名。
+    """
     # 雷达图配置
     with st.sidebar.expander("📊 图表配置", expanded=False):
     
         # 初始化顶点列列表
-        numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
-    
-        # 添加雷达图坐标模式选择
-        invert_radar_coords = st.checkbox(
-            "反转雷达图坐标",
-            value=True,
-            help="勾选后：外部边线为0点，数据越大顶点越靠近中心；取消勾选：中心为0点，数据越大顶点越高"
-        )
+        if isinstance(sheet_dfs, LazyWorkbook):
+            numeric_columns = list(sheet_dfs.metric_matrix(sheet_dfs.sheet_names[0]).columns)
+        else:
+            numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
     
         if len(numeric_columns) >= 2:
             # 直接使用所有数值列作为顶点列
             vertex_cols = numeric_columns
+            st.caption(f"雷达图顶点: {', '.join(map(str, vertex_cols))}")
         else:
             st.warning("数据中至少需要2个数值列来创建雷达图")
             vertex_cols = []
-            invert_radar_coords = False
     
-    return vertex_cols, invert_radar_coords
+    return vertex_cols
+
+
+def build_radar_figure(vertex_cols, original_values, current_name, invert_coordinates=False, population=None):
+    """构建雷达图
+
+    Args:
+        vertex_cols (list): 雷达图顶点列名列表
+        original_values (list): 各顶点对应的原始数值
+        current_name (str): 当前选中的名称
+        invert_coordinates (bool): 是否反转坐标
+        population (dict): 人群对比数据（见 population_overlay），为 None 时不叠加
+    """
+    # 叠加人群对比时坐标范围同时覆盖四分位区间
+    scale_values = list(original_values)
+    if population is not None:
+        scale_values += [val for val in population['high'] if not np.isnan(val)]
+    # 数据处理：根据invert_coordinates参数决定是否反转
+    if invert_coordinates:
+        # 反转坐标：外部为0，数据越大越靠近中心
+        max_value = max(scale_values) * 1.2  # 增加20%作为缓冲
+        vertex_values = [max_value - val for val in original_values]
+
+        radial_axis_config = dict(
+            visible=True,
+            range=[0, max_value],
+            # 不显示具体刻度，只显示轴线
+            tickvals=[],
+            ticktext=[]
+        )
+        chart_title = f"{current_name} - 雷达图（反转坐标）"
+    else:
+        # 原始坐标：中心为0，数据越大越远离中心
+        vertex_values = original_values
+        max_value = max(scale_values) * 1.2
+
+        radial_axis_config = dict(
+            visible=True,
+            range=[0, max_value],
+            # 不显示具体刻度，只显示轴线
+            tickvals=[],
+            ticktext=[]
+        )
+        chart_title = f"{current_name} - 雷达图"
+
+    # 创建带数值的标签：在数据名称后显示对应数值
+    theta_labels = [f"{col}: {val:.0f}" for col, val in zip(vertex_cols, original_values)]
+
+    fig_radar = go.Figure()
+    if population is not None:
+        # 人群四分位区间和中位数，画在人员数据下方
+        def to_radius(values):
+            values = [0.0 if np.isnan(val) else float(val) for val in values]
+            radius = [max_value - val for val in values] if invert_coordinates else values
+            return radius + [radius[0]]
+
+        closed_theta = theta_labels + [theta_labels[0]]
+        for key, name, dash in (('low', '人群P25', 'dot'), ('median', '人群中位数', 'dash'), ('high', '人群P75', 'dot')):
+            fig_radar.add_trace(go.Scatterpolar(
+                r=to_radius(population[key]),
+                theta=closed_theta,
+                mode='lines',
+                name=name,
+                line=dict(color='rgba(113, 128, 150, 0.9)', width=1, dash=dash),
+                hoverinfo='skip'
+            ))
+    fig_radar.add_trace(go.Scatterpolar(
+        r=vertex_values + [vertex_values[0]],
+        theta=theta_labels + [theta_labels[0]],  # 使用带数值的标签
+        fill='toself',
+        name='雷达图数据',
+        line_color='rgba(102, 126, 234, 1)',
+        fillcolor='rgba(102, 126, 234, 0.3)',
+        line=dict(width=2),
+        **_percentile_hover(population)
+    ))
+    fig_radar.update_layout(
+        polar=dict(radialaxis=radial_axis_config),
+        height=280,  # 缩小雷达图高度
+        margin=dict(l=15, r=15, t=40, b=30),  # 调整边距
+        template="plotly_white",
+        font=dict(size=9),  # 调整字体大小
+        showlegend=population is not None,
+        legend=dict(orientation='h', y=-0.15, font=dict(size=8))
+    )
+    return fig_radar
+
+
+# 多人对比雷达图最多叠加的人数（或分组数）
+COMPARE_MAX_TRACES = 50
+# 超过该数量时改用WebGL绘制且不填充，保持页面流畅
+COMPARE_WEBGL_THRESHOLD = 10
+
+
+def build_comparison_radar_figure(vertex_cols, labels, values, invert_coordinates=False, title="多人对比雷达图"):
+    """构建多人对比雷达图
+
+    Args:
+        vertex_cols (list): 雷达图顶点列名列表
+        labels (list): 每条曲线的名称（人员或分组）
+        values (ndarray): 形状为 (曲线数, 顶点数) 的数值
+        invert_coordinates (bool): 是否反转坐标
+        title (str): 图表标题
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64)[:COMPARE_MAX_TRACES])
+    labels = list(labels)[:COMPARE_MAX_TRACES]
+    max_value = max(float(values.max()) if values.size else 0.0, 1.0) * 1.2
+    radius = max_value - values if invert_coordinates else values
+    # 一次性闭合所有曲线并保留两位小数，减少发送到浏览器的数据量
+    radius = np.round(np.hstack([radius, radius[:, :1]]), 2)
+    theta = list(vertex_cols) + [vertex_cols[0]]
+
+    use_webgl = len(labels) > COMPARE_WEBGL_THRESHOLD
+    trace_type = go.Scatterpolargl if use_webgl else go.Scatterpolar
+    fill = 'none' if use_webgl else 'toself'
+    colors = px.colors.qualitative.Plotly
+    # 悬停时显示原始数值
+    original = np.round(np.hstack([values, values[:, :1]]), 2)
+    traces = [
+        trace_type(
+            r=radius[i],
+            theta=theta,
+            mode='lines',
+            fill=fill,
+            opacity=0.8 if use_webgl else 0.6,
+            name=str(label),
+            line=dict(width=1 if use_webgl else 2, color=colors[i % len(colors)]),
+            customdata=original[i],
+            hovertemplate='%{fullData.name}<br>%{theta}: %{customdata}<extra></extra>'
+        )
+        for i, label in enumerate(labels)
+    ]
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        title=dict(text=title, font=dict(size=12)),
+        polar=dict(radialaxis=dict(visible=True, range=[0, max_value], tickvals=[], ticktext=[])),
+        height=420,
+        margin=dict(l=30, r=30, t=50, b=30),
+        template="plotly_white",
+        font=dict(size=9),
+        legend=dict(font=dict(size=8))
+    )
+    return fig
+
+
+def _percentile_hover(population):
+    """人员数据的悬停提示中显示百分位"""
+    if population is None or population.get('percentile') is None:
+        return {}
+    percentile = population['percentile']
+    return dict(
+        customdata=list(percentile) + [percentile[0]],
+        hovertemplate='%{theta}<br>百分位: P%{customdata:.0f}<extra></extra>'
+    )
 
 
-def render_radar_chart(vertex_cols, current_name, sheet_names, sheet_dfs, invert_coordinates=False):
+def population_overlay(sheet_dfs, sheet_name, current_name, columns):
+    """
+    人群对比数据：各列的四分位区间、中位数和当前人员的百分位
+
+    统计每个子表只计算一次，之后每次切换人员只是数组取值。
+
+    Returns:
+        {'low', 'median', 'high', 'percentile'}，各为与 columns 对应的列表；
+        人员不存在时 percentile 为 None
+    """
+    stats, position = person_statistics(sheet_dfs, sheet_name, current_name)
+    low, median, high = stats.band(columns)
+    percentile = None
+    if position is not None:
+        percentile = stats.row_stats(position, columns)['百分位'].tolist()
+    return {'low': low.tolist(), 'median': median.tolist(), 'high': high.tolist(), 'percentile': percentile}
+
+
+def render_radar_chart(vertex_cols, current_name, sheet_names, sheet_dfs, invert_coordinates=False, show_population=False):
     """渲染雷达图
     
     Args:
@@ -316,6 +858,7 @@ def render_radar_chart(vertex_cols, current_name, sheet_names, sheet_dfs, invert
         sheet_names (list): 子表名称列表
         sheet_dfs (dict): 子表数据字典
         invert_coordinates (bool): 是否反转坐标（True: 外部为0，数据越大越靠近中心；False: 中心为0，数据越大越远离中心）
+        show_population (bool): 是否叠加人群中位数和四分位区间
     """
     try:
         # 检查是否已选择顶点列
@@ -325,12 +868,11 @@ def render_radar_chart(vertex_cols, current_name, sheet_names, sheet_dfs, invert
                 radar_df = sheet_dfs[sheet_names[0]]
                 # 确保第一列存在
                 if len(radar_df.columns) > 0:
-                    radar_data = radar_df[radar_df.iloc[:, 0] == current_name]
+                    # 使用用户选择的顶点列（直接取数值矩阵中的一行）
+                    _, radar_values = person_metrics(sheet_dfs, sheet_names[0], current_name, vertex_cols)
                     
-                    if not radar_data.empty:
-                        # 使用用户选择的顶点列
-                        row_data = radar_data.iloc[0]
-                        original_values = [row_data[col] for col in vertex_cols]
+                    if radar_values is not None:
+                        original_values = radar_values.tolist()
                         
                         # 检查数据是否为零
                         total_value = sum(original_values)
@@ -346,58 +888,14 @@ def render_radar_chart(vertex_cols, current_name, sheet_names, sheet_dfs, invert
                             # 数据为零时显示统一文本
                             st.markdown(f"<h2 style='color: #e53e3e; text-align: center; margin-top: 80px;'>数据为0</h2>", unsafe_allow_html=True)
                         else:
-                            # 数据处理：根据invert_coordinates参数决定是否反转
-                            if invert_coordinates:
-                                # 反转坐标：外部为0，数据越大越靠近中心
-                                max_value = max(original_values) * 1.2  # 增加20%作为缓冲
-                                vertex_values = [max_value - val for val in original_values]
-                                
-                                radial_axis_config = dict(
-                                    visible=True,
-                                    range=[0, max_value],
-                                    # 不显示具体刻度，只显示轴线
-                                    tickvals=[],
-                                    ticktext=[]
-                                )
-                                chart_title = f"{current_name} - 雷达图（反转坐标）"
-                            else:
-                                # 原始坐标：中心为0，数据越大越远离中心
-                                vertex_values = original_values
-                                max_value = max(vertex_values) * 1.2
-                                
-                                radial_axis_config = dict(
-                                    visible=True,
-                                    range=[0, max_value],
-                                    # 不显示具体刻度，只显示轴线
-                                    tickvals=[],
-                                    ticktext=[]
-                                )
-                                chart_title = f"{current_name} - 雷达图"
-                            
-                            # 创建带数值的标签：在数据名称后显示对应数值
-                            theta_labels = [f"{col}: {val:.0f}" for col, val in zip(vertex_cols, original_values)]
-                            
-                            fig_radar = go.Figure()
-                            fig_radar.add_trace(go.Scatterpolar(
-                                r=vertex_values + [vertex_values[0]],
-                                theta=theta_labels + [theta_labels[0]],  # 使用带数值的标签
-                                fill='toself',
-                                name='雷达图数据',
-                                line_color='rgba(102, 126, 234, 1)',
-                                fillcolor='rgba(102, 126, 234, 0.3)',
-                                line=dict(width=2)
-                            ))
-                            # 使用第一个子表名称
-                            radar_sheet_name = sheet_names[0]
-                            
-                            fig_radar.update_layout(
-                                polar=dict(radialaxis=radial_axis_config),
-                                height=280,  # 缩小雷达图高度
-                                margin=dict(l=15, r=15, t=40, b=30),  # 调整边距
-                                template="plotly_white",
-                                font=dict(size=9)  # 调整字体大小
+                            population = None
+                            if show_population:
+                                population = population_overlay(sheet_dfs, radar_sheet_name, current_name, vertex_cols)
+                            fig_radar = build_radar_figure(
+                                vertex_cols, original_values, current_name, invert_coordinates, population
                             )
-                            st.plotly_chart(fig_radar, use_container_width=True)
+                            get_profiler().add_payload(fig_radar)
+                            st.plotly_chart(fig_radar, width='stretch')
                 else:
                     st.info("雷达图子表没有数据列")
             else:
@@ -408,230 +906,266 @@ def render_radar_chart(vertex_cols, current_name, sheet_names, sheet_dfs, invert
         st.error(f"生成雷达图时出错: {str(e)}")
 
 
-def render_pie_chart(current_name, sheet_names, sheet_dfs):
-    """渲染饼图"""
-    try:
-        if len(sheet_names) > 1:
-            # 使用第二个子表数据
-            pie_sheet_name = sheet_names[1]
-            pie_df = sheet_dfs[pie_sheet_name]
-            # 确保第一列存在
-            if len(pie_df.columns) > 0:
-                # 筛选当前人名的数据
-                pie_data = pie_df[pie_df.iloc[:, 0] == current_name]
-                
-                if not pie_data.empty:
-                    numeric_cols = pie_data.select_dtypes(include=[np.number]).columns.tolist()
-                    if len(numeric_cols) > 0:
-                        row_data = pie_data.iloc[0]
-                        # 准备数据：名称为数值列名称，数值为当前行对应列的值
-                        chart_data = pd.DataFrame({
-                            "数据列": numeric_cols,
-                            "数值": [row_data[col] for col in numeric_cols]
-                        })
-                        
-                        # 显示图表标题
-                        # st.markdown(f"<h4>🥧 饼图</h4>", unsafe_allow_html=True)
-                        st.markdown(f"<h5 style='margin-top: -15px; margin-bottom: 15px;'>{current_name} - {pie_sheet_name}</h5>", unsafe_allow_html=True)
-                        
-                        # 检查数据是否为零
-                        total_value = chart_data["数值"].sum()
-                        if total_value == 0:
-                            # 数据为零时显示统一文本
-                            st.markdown(f"<h2 style='color: #e53e3e; text-align: center; margin-top: 80px;'>数据为0</h2>", unsafe_allow_html=True)
-                        else:
-                            # 数据不为零时绘制饼图
-                            fig_pie = px.pie(
-                                chart_data, names="数据列", values="数值",
-                                color_discrete_sequence=px.colors.sequential.RdBu,
-                                template="plotly_white",
-                                hole=0.3
-                            )
-                            # 添加数据标签
-                            fig_pie.update_traces(
-                                textinfo='label+value+percent',  # 显示标签、数值和百分比
-                                textfont_size=10  # 调整为比h4小两号
-                            )
-                            fig_pie.update_layout(
-                                plot_bgcolor="rgba(0,0,0,0)",
-                                paper_bgcolor="rgba(0,0,0,0)",
-                                margin=dict(l=10, r=10, t=10, b=10),
-                                height=300,
-                                font=dict(size=10)  # 图表内部字体比h4小两号
-                            )
-                            st.plotly_chart(fig_pie, use_container_width=True)
-                else:
-                    st.info("未找到当前人名的饼图数据")
-            else:
-                st.info("饼图子表没有数据列")
-        else:
-            st.info("请上传包含至少2个子表的Excel文件")
-    except Exception as e:
-        st.error(f"生成饼图时出错: {str(e)}")
+def build_chart_data(row_data, numeric_cols):
+    """准备图表数据：名称为数值列名称，数值为当前行对应列的值"""
+    return pd.DataFrame({
+        "数据列": numeric_cols,
+        "数值": [row_data[col] for col in numeric_cols]
+    })
 
 
-def render_bar_chart(chart_num, current_name, sheet_names, sheet_dfs, color_sequence):
-    """渲染柱状图"""
-    try:
-        sheet_index = chart_num + 2  # 柱状图1使用第3个子表（索引2），柱状图2使用第4个子表（索引3）
-        if len(sheet_names) > sheet_index:
-            # 使用对应子表数据
-            bar_sheet_name = sheet_names[sheet_index]
-            bar_df = sheet_dfs[bar_sheet_name]
-            # 确保第一列存在
-            if len(bar_df.columns) > 0:
-                # 筛选当前人名的数据
-                bar_data = bar_df[bar_df.iloc[:, 0] == current_name]
-                
-                if not bar_data.empty:
-                        numeric_cols = bar_data.select_dtypes(include=[np.number]).columns.tolist()
-                        if len(numeric_cols) > 0:
-                            row_data = bar_data.iloc[0]
-                            # 准备数据：x轴为数值列名称，y轴为当前行对应列的值
-                            chart_data = pd.DataFrame({
-                                "数据列": numeric_cols,
-                                "数值": [row_data[col] for col in numeric_cols]
-                            })
-                            
-                            # 显示图表标题
-                            # st.markdown(f"<h4>📊 柱状图</h4>", unsafe_allow_html=True)
-                            st.markdown(f"<h5 style='margin-top: -15px; margin-bottom: 15px;'>{current_name} - {bar_sheet_name}</h5>", unsafe_allow_html=True)
-                            
-                            # 检查数据是否为零
-                            total_value = chart_data["数值"].sum()
-                            if total_value == 0:
-                                # 数据为零时显示统一文本
-                                st.markdown(f"<h2 style='color: #e53e3e; text-align: center; margin-top: 80px;'>数据为0</h2>", unsafe_allow_html=True)
-                            else:
-                                fig_bar = px.bar(
-                                    chart_data, x="数据列", y="数值",
-                                    color_discrete_sequence=color_sequence,
-                                    template="plotly_white",
-                                    barmode='group',
-                                    text="数值"  # 在柱子上显示数值
-                                )
-                                # 计算y轴范围，确保y轴为自然数（从0开始的正整数）
-                                max_value = chart_data["数值"].max()
-                                # 为y轴范围添加一些缓冲，确保最大值能够完整显示
-                                y_max = max(max_value * 1.2, 1)  # 确保y轴至少显示到1
-                                y_min = 0  # 自然数从0开始
-                                
-                                # 计算y轴刻度，只显示自然数
-                                y_ticks = list(range(0, int(y_max) + 2))  # 生成0到y_max+1的自然数刻度
-                                
-                                fig_bar.update_traces(
-                                    textposition='auto',  # 自动调整数值位置，避免重叠
-                                    textfont_size=10  # 设置数值字体大小为比h4小两号
-                                )
-                                fig_bar.update_layout(
-                                    plot_bgcolor="rgba(0,0,0,0)",
-                                    paper_bgcolor="rgba(0,0,0,0)",
-                                    margin=dict(l=10, r=10, t=10, b=50),
-                                    xaxis=dict(tickmode='linear', title="数据列", tickangle=45, title_font=dict(size=10), tickfont=dict(size=9)),  # 旋转x轴标签，避免重叠
-                                    yaxis=dict(
-                                        title="数据高度", 
-                                        range=[y_min, y_max],  # 设置y轴范围从0开始
-                                        tickmode='array',  # 使用自定义刻度
-                                        tickvals=y_ticks,  # 只显示自然数刻度
-                                        automargin=True,
-                                        title_font=dict(size=10),
-                                        tickfont=dict(size=9)
-                                    ),
-                                    font=dict(size=10),  # 图表内部字体比h4小两号
-                                    bargap=0.5,
-                                    bargroupgap=0.3,
-                                    height=350  # 增加高度以容纳数值标签
-                                )
-                                st.plotly_chart(fig_bar, use_container_width=True)
-                else:
-                    st.info("未找到当前人名的柱状图数据")
-            else:
-                st.info("柱状图子表没有数据列")
-        else:
-            st.info(f"请上传包含至少{sheet_index + 1}个子表的Excel文件")
-    except Exception as e:
-        st.error(f"生成柱状图{chart_num + 1}时出错: {str(e)}")
+def chart_data_from_metrics(numeric_cols, values):
+    """由数值矩阵的一行准备图表数据，"数值"列直接引用矩阵中的数据，不复制"""
+    return pd.DataFrame({"数据列": numeric_cols, "数值": values}, copy=False)
 
 
-def render_line_chart(current_name, sheet_names, sheet_dfs):
-    """渲染折线图"""
+def build_pie_figure(chart_data):
+    """构建饼图，chart_data 包含"数据列"和"数值"两列"""
+    fig_pie = px.pie(
+        chart_data, names="数据列", values="数值",
+        color_discrete_sequence=px.colors.sequential.RdBu,
+        template="plotly_white",
+        hole=0.3
+    )
+    # 添加数据标签
+    fig_pie.update_traces(
+        textinfo='label+value+percent',  # 显示标签、数值和百分比
+        textfont_size=10  # 调整为比h4小两号
+    )
+    fig_pie.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(l=10, r=10, t=10, b=10),
+        height=300,
+        font=dict(size=10)  # 图表内部字体比h4小两号
+    )
+    return fig_pie
+
+
+def build_bar_figure(chart_data, color_sequence, population=None):
+    """构建柱状图，chart_data 包含"数据列"和"数值"两列；population 为人群对比数据，不为 None 时叠加中位数和四分位区间"""
+    fig_bar = px.bar(
+        chart_data, x="数据列", y="数值",
+        color_discrete_sequence=color_sequence,
+        template="plotly_white",
+        barmode='group',
+        text="数值"  # 在柱子上显示数值
+    )
+    # 计算y轴范围，确保y轴为自然数（从0开始的正整数）
+    max_value = chart_data["数值"].max()
+    if population is not None:
+        high = [val for val in population['high'] if not np.isnan(val)]
+        max_value = max([max_value] + high)
+    # 为y轴范围添加一些缓冲，确保最大值能够完整显示
+    y_max = max(max_value * 1.2, 1)  # 确保y轴至少显示到1
+    y_min = 0  # 自然数从0开始
+
+    # 计算y轴刻度，只显示自然数
+    y_ticks = list(range(0, int(y_max) + 2))  # 生成0到y_max+1的自然数刻度
+
+    fig_bar.update_traces(
+        textposition='auto',  # 自动调整数值位置，避免重叠
+        textfont_size=10,  # 设置数值字体大小为比h4小两号
+        **_percentile_bar_hover(population)
+    )
+    if population is not None:
+        # 人群中位数（菱形点）及四分位区间（误差线）
+        median = np.array(population['median'], dtype=float)
+        fig_bar.add_trace(go.Scatter(
+            x=chart_data["数据列"],
+            y=median,
+            mode='markers',
+            name='人群中位数',
+            marker=dict(symbol='diamond', size=8, color='rgba(45, 55, 72, 0.9)'),
+            error_y=dict(
+                type='data',
+                symmetric=False,
+                array=np.array(population['high'], dtype=float) - median,
+                arrayminus=median - np.array(population['low'], dtype=float),
+                color='rgba(113, 128, 150, 0.9)',
+                thickness=1
+            ),
+            hovertemplate='%{x}<br>人群中位数: %{y}<extra></extra>'
+        ))
+    fig_bar.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(l=10, r=10, t=10, b=50),
+        xaxis=dict(tickmode='linear', title="数据列", tickangle=45, title_font=dict(size=10), tickfont=dict(size=9)),  # 旋转x轴标签，避免重叠
+        yaxis=dict(
+            title="数据高度", 
+            range=[y_min, y_max],  # 设置y轴范围从0开始
+            tickmode='array',  # 使用自定义刻度
+            tickvals=y_ticks,  # 只显示自然数刻度
+            automargin=True,
+            title_font=dict(size=10),
+            tickfont=dict(size=9)
+        ),
+        font=dict(size=10),  # 图表内部字体比h4小两号
+        bargap=0.5,
+        bargroupgap=0.3,
+        height=350,  # 增加高度以容纳数值标签
+        showlegend=False
+    )
+    return fig_bar
+
+
+def _percentile_bar_hover(population):
+    """柱子的悬停提示中显示百分位"""
+    if population is None or population.get('percentile') is None:
+        return {}
+    return dict(
+        customdata=population['percentile'],
+        hovertemplate='%{x}<br>数值: %{y}<br>百分位: P%{customdata:.0f}<extra></extra>'
+    )
+
+
+def build_line_figure(chart_data):
+    """构建折线图，chart_data 包含"数据列"和"数值"两列"""
+    fig_line = px.line(
+        chart_data, x="数据列", y="数值",
+        color_discrete_sequence=px.colors.sequential.Plasma,
+        template="plotly_white",
+        markers=True,
+        text="数值"  # 在数据点上显示数值
+    )
+    fig_line.update_traces(
+        textposition='top center',  # 数值显示在数据点上方
+        textfont_size=10,  # 设置数值字体大小为比h4小两号
+        marker=dict(size=8)  # 增大数据点大小
+    )
+    # 计算y轴范围，确保y轴为自然数（从0开始的正整数）
+    max_value = chart_data["数值"].max()
+    # 为y轴范围添加一些缓冲，确保最大值能够完整显示
+    y_max = max(max_value * 1.2, 1)  # 确保y轴至少显示到1
+    y_min = 0  # 自然数从0开始
+
+    # 计算y轴刻度，只显示自然数
+    y_ticks = list(range(0, int(y_max) + 2))  # 生成0到y_max+1的自然数刻度
+
+    fig_line.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(l=20, r=20, t=10, b=50),
+        xaxis=dict(tickmode='linear', title="数据列", title_font=dict(size=10), tickfont=dict(size=9)),
+        yaxis=dict(
+            title="数据高度", 
+            range=[y_min, y_max],  # 设置y轴范围从0开始
+            tickmode='array',  # 使用自定义刻度
+            tickvals=y_ticks,  # 只显示自然数刻度
+            automargin=True,
+            title_font=dict(size=10),
+            tickfont=dict(size=9)
+        ),
+        font=dict(size=10),  # 图表内部字体比h4小两号
+        height=450  # 增加高度以容纳数值标签
+    )
+    return fig_line
+
+
+# 图表类型 -> 构建函数，参数为图表数据、颜色序列和人群对比数据
+CHART_BUILDERS = {
+    'pie': lambda chart_data, color_sequence, population: build_pie_figure(chart_data),
+    'bar': build_bar_figure,
+    'line': lambda chart_data, color_sequence, population: build_line_figure(chart_data),
+}
+
+
+def render_sheet_chart(chart, current_name, sheet_dfs, show_population=False):
+    """渲染布局中的一个图表
+
+    Args:
+        chart (dict): 解析后的图表配置（见 chart_layout.resolve_layout）
+        current_name (str): 当前选中的名称
+        sheet_dfs (dict): 子表数据字典
+        show_population (bool): 是否叠加人群中位数和四分位区间（仅柱状图）
+    """
+    chart_label = CHART_TYPES[chart['type']]
     try:
-        if len(sheet_names) > 4:
-            # 使用第五个子表数据
-            line_sheet_name = sheet_names[4]
-            line_df = sheet_dfs[line_sheet_name]
-            # 确保第一列存在
-            if len(line_df.columns) > 0:
-                # 筛选当前人名的数据
-                line_data = line_df[line_df.iloc[:, 0] == current_name]
-                
-                if not line_data.empty:
-                    numeric_cols = line_data.select_dtypes(include=[np.number]).columns.tolist()
-                    if len(numeric_cols) > 0:
-                        row_data = line_data.iloc[0]
-                        # 准备数据：x轴为数据列，y轴为对应值
-                        chart_data = pd.DataFrame({
-                            "数据列": numeric_cols,
-                            "数值": [row_data[col] for col in numeric_cols]
-                        })
-                        
-                        # 显示图表标题
-                        # st.markdown(f"<h4>📈 折线图</h4>", unsafe_allow_html=True)
-                        st.markdown(f"<h5 style='margin-top: -15px; margin-bottom: 15px;'>{current_name} - {line_sheet_name}</h5>", unsafe_allow_html=True)
-                        
-                        # 检查数据是否为零
-                        total_value = chart_data["数值"].sum()
-                        if total_value == 0:
-                            # 数据为零时显示统一文本
-                            st.markdown(f"<h2 style='color: #e53e3e; text-align: center; margin-top: 80px;'>数据为0</h2>", unsafe_allow_html=True)
-                        else:
-                            fig_line = px.line(
-                                chart_data, x="数据列", y="数值",
-                                color_discrete_sequence=px.colors.sequential.Plasma,
-                                template="plotly_white",
-                                markers=True,
-                                text="数值"  # 在数据点上显示数值
-                            )
-                            fig_line.update_traces(
-                                textposition='top center',  # 数值显示在数据点上方
-                                textfont_size=10,  # 设置数值字体大小为比h4小两号
-                                marker=dict(size=8)  # 增大数据点大小
-                            )
-                            # 计算y轴范围，确保y轴为自然数（从0开始的正整数）
-                            max_value = chart_data["数值"].max()
-                            # 为y轴范围添加一些缓冲，确保最大值能够完整显示
-                            y_max = max(max_value * 1.2, 1)  # 确保y轴至少显示到1
-                            y_min = 0  # 自然数从0开始
-                            
-                            # 计算y轴刻度，只显示自然数
-                            y_ticks = list(range(0, int(y_max) + 2))  # 生成0到y_max+1的自然数刻度
-                            
-                            fig_line.update_layout(
-                                plot_bgcolor="rgba(0,0,0,0)",
-                                paper_bgcolor="rgba(0,0,0,0)",
-                                margin=dict(l=20, r=20, t=10, b=50),
-                                xaxis=dict(tickmode='linear', title="数据列", title_font=dict(size=10), tickfont=dict(size=9)),
-                                yaxis=dict(
-                                    title="数据高度", 
-                                    range=[y_min, y_max],  # 设置y轴范围从0开始
-                                    tickmode='array',  # 使用自定义刻度
-                                    tickvals=y_ticks,  # 只显示自然数刻度
-                                    automargin=True,
-                                    title_font=dict(size=10),
-                                    tickfont=dict(size=9)
-                                ),
-                                font=dict(size=10),  # 图表内部字体比h4小两号
-                                height=450  # 增加高度以容纳数值标签
-                            )
-                            st.plotly_chart(fig_line, use_container_width=True)
-                else:
-                    st.info("未找到当前人名的折线图数据")
-            else:
-                st.info("折线图子表没有数据列")
-        else:
-            st.info("请上传包含至少5个子表的Excel文件")
+        if chart['sheet_name'] is None:
+            st.info(chart['missing'])
+            return
+        sheet_name = chart['sheet_name']
+        sheet_df = sheet_dfs[sheet_name]
+        # 确保第一列存在
+        if len(sheet_df.columns) == 0:
+            st.info(f"{chart_label}子表没有数据列")
+            return
+        # 当前人名的数值指标：子表数值矩阵中的一行
+        numeric_cols, values = person_metrics(sheet_dfs, sheet_name, current_name)
+        if values is None:
+            st.info(f"未找到当前人名的{chart_label}数据")
+            return
+        if len(numeric_cols) == 0:
+            return
+        # 准备数据：名称为数值列名称，数值为当前行对应列的值
+        chart_data = chart_data_from_metrics(numeric_cols, values)
+
+        # 显示图表标题
+        st.markdown(f"<h5 style='margin-top: -15px; margin-bottom: 15px;'>{current_name} - {sheet_name}</h5>", unsafe_allow_html=True)
+
+        # 检查数据是否为零
+        total_value = chart_data["数值"].sum()
+        if total_value == 0:
+            # 数据为零时显示统一文本
+            st.markdown(f"<h2 style='color: #e53e3e; text-align: center; margin-top: 80px;'>数据为0</h2>", unsafe_allow_html=True)
+            return
+        population = None
+        if show_population and chart['type'] == 'bar':
+            population = population_overlay(sheet_dfs, sheet_name, current_name, numeric_cols)
+        color_sequence = getattr(px.colors.sequential, chart['colors'], px.colors.sequential.Viridis)
+        fig = CHART_BUILDERS[chart['type']](chart_data, color_sequence, population)
+        get_profiler().add_payload(fig)
+        st.plotly_chart(fig, width='stretch')
     except Exception as e:
-        st.error(f"生成折线图时出错: {str(e)}")
+        st.error(f"生成{chart['label']}时出错: {str(e)}")
+
+
+# 数据预览可选的每页行数
+PREVIEW_PAGE_SIZES = [50, 200, 1000]
+
+
+def preview_window(df, page, page_size, columns=None):
+    """
+    取出数据预览的一页
+
+    Args:
+        df: 完整数据
+        page: 页码，从1开始
+        page_size: 每页行数
+        columns: 只显示这些列，为空时显示所有列
+
+    Returns:
+        (当前页数据, 总页数)
+    """
+    total_pages = max((len(df) - 1) // page_size + 1, 1)
+    page = min(max(int(page), 1), total_pages)
+    offset = (page - 1) * page_size
+    window = df.iloc[offset:offset + page_size]
+    if columns:
+        window = window[[column for column in df.columns if column in columns]]
+    return window, total_pages
+
+
+def show_preview_window(key, df, paged=True):
+    """分页显示数据预览，每次只把当前页、选中的列发送到页面"""
+    page_size = PREVIEW_PAGE_SIZES[0]
+    page = 1
+    columns = None
+    if paged and len(df) > PREVIEW_PAGE_SIZES[0]:
+        col1, col2, col3 = st.columns([0.5, 0.25, 0.25])
+        with col1:
+            columns = st.multiselect("显示列", options=list(df.columns), default=[], placeholder="全部列", key=f"preview_cols_{key}")
+        with col2:
+            page_size = st.selectbox("每页行数", options=PREVIEW_PAGE_SIZES, index=0, key=f"preview_page_size_{key}")
+        with col3:
+            total_pages = max((len(df) - 1) // page_size + 1, 1)
+            page = st.number_input("页码", min_value=1, max_value=total_pages, value=1, step=1, key=f"preview_page_{key}")
+    window, total_pages = preview_window(df, page, page_size, columns)
+    if paged and total_pages > 1:
+        st.caption(f"第 {min(int(page), total_pages)}/{total_pages} 页，共 {len(df)} 行")
+    get_profiler().add_payload(window)
+    st.dataframe(window, width='stretch', height=200)  # 降低高度
 
 
 def show_data_preview(sheet_names, sheet_dfs, current_name):
@@ -642,6 +1176,15 @@ def show_data_preview(sheet_names, sheet_dfs, current_name):
         # 以子表名称命名数据预览
         st.subheader(f"📋 {sheet_name} 数据预览")
         
+        # 尚未解析的子表（图表没有用到）只显示行列数，勾选后才解析
+        if hasattr(sheet_dfs, 'is_loaded') and not sheet_dfs.is_loaded(sheet_name):
+            dimensions = sheet_dfs.dimensions.get(sheet_name)
+            if dimensions is not None:
+                st.caption(f"数据行数: {dimensions[0]}，数据列数: {dimensions[1]}")
+            if not st.checkbox(f"加载 {sheet_name} 预览", key=f"load_preview_{sheet_name}"):
+                st.markdown('</div>', unsafe_allow_html=True)
+                continue
+        
         # 获取当前子表数据
         current_sheet_df = sheet_dfs[sheet_name]
         
@@ -650,19 +1193,264 @@ def show_data_preview(sheet_names, sheet_dfs, current_name):
             # 检查当前子表是否有第一列
             if len(current_sheet_df.columns) > 0:
                 # 使用当前筛选的人名进行筛选
-                filtered_sheet_df = current_sheet_df[current_sheet_df.iloc[:, 0] == current_name]
-                # 显示筛选后的数据
-                st.dataframe(filtered_sheet_df, width='stretch', height=200)  # 降低高度
+                filtered_sheet_df = person_rows(sheet_dfs, sheet_name, current_name)
+                # 显示筛选后的数据（分页）
+                show_preview_window(sheet_name, filtered_sheet_df)
             else:
                 st.info(f"{sheet_name} 子表没有数据列")
         except Exception as e:
             st.error(f"筛选{sheet_name}数据时出错: {str(e)}")
-            # 出错时显示完整数据
-            st.dataframe(current_sheet_df, width='stretch', height=200)  # 降低高度
+            # 出错时只显示完整数据的第一页，不会把整张表发送到页面
+            show_preview_window(f"{sheet_name}_full", current_sheet_df.iloc[:PREVIEW_PAGE_SIZES[0]], paged=False)
         
         st.markdown('</div>', unsafe_allow_html=True)
 
 
+@st.fragment
+def person_dashboard(df, vertex_cols, sheet_names, sheet_dfs, layout=None):
+    """筛选面板及其下方的所有图表
+
+    作为独立片段运行：切换筛选条件时只重新运行本片段（包括内部的各个图表片段），
+    不会重新读取文件、显示文件信息或配置侧边栏。
+    """
+    # 第一行：左侧显示数据筛选，右侧显示雷达图
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    # 使用两列布局，左侧显示数据筛选，右侧显示雷达图
+    row1_col1, row1_col2, row1_col3 = st.columns([0.4, 0.1, 0.5])
+    
+    with row1_col1:
+        # 调用筛选数据函数，获取筛选后的结果
+        with get_profiler().stage('filter_data', rows=len(df)):
+            filtered_df = filter_data(df, sheet_dfs)
+
+        # 显示选中人员信息（大字体）
+        if len(filtered_df) > 0:
+            st.markdown(f"<h1 style='color: #4a5568; font-weight: 800; margin-bottom: 0; margin-left: 100px; margin-top: 30px;'>{filtered_df.iloc[0].iloc[0]}</h1>", unsafe_allow_html=True)
+            st.markdown(f"<p style='color: #718096; margin-top: 0; margin-bottom: 2rem; margin-left: 100px; '>当前选中人员数据</p>", unsafe_allow_html=True)
+
+        # 在雷达图和柱状图上叠加全体人员的中位数和四分位区间
+        show_population = st.checkbox(
+            "显示人群对比",
+            value=False,
+            help="叠加全体人员的中位数和四分位区间（P25-P75），悬停时显示当前人员的百分位",
+            key="show_population"
+        )
+
+    # 中间空白列   
+    row1_col2.write("")  
+    
+    # 右侧显示雷达图
+    with row1_col3:
+        # 检查筛选后的数据是否为空
+        if len(filtered_df) > 0:
+            # 生成雷达图（使用用户选择的顶点列）
+            radar_panel(vertex_cols, filtered_df.iloc[0].iloc[0], sheet_names, sheet_dfs, show_population)
+            
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # # 第二行：选中人员和生成评价
+    # st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    # row2_col1, row2_col2 = st.columns([0.4, 0.6])
+
+
+
+    # with row2_col1:
+    #     # 显示评价生成
+    #     if len(filtered_df) > 0:
+    #         current_name = filtered_df.iloc[0].iloc[0]
+            
+    #         # 添加生成按钮
+    #         if st.button("生成评价", key="generate_eval"):
+    #             with st.spinner("正在生成评价..."):
+    #                 # 导入评价生成模块
+    #                 from qianwen_api import prepare_person_data, generate_evaluation
+    #                 from config import QWEN_API_KEY
+                    
+    #                 # 准备人员数据
+    #                 person_data = prepare_person_data(current_name, sheet_names, sheet_dfs)
+                    
+    #                 # 生成评价
+    #                 evaluation = generate_evaluation(person_data, current_name, QWEN_API_KEY)
+                    
+    #                 # 显示评价
+    #                 st.markdown(f"""
+    #                 <div style='background: rgba(102, 126, 234, 0.1); 
+    #                         padding: 15px; 
+    #                         border-radius: 10px; 
+    #                         margin-top: 10px;
+    #                         font-size: 14px;'>
+    #                     <h6 style='color: #4a5568; margin-bottom: 8px; font-size: 16px;'>📝 评价报告</h6>
+    #                     <p style='color: #2d3748; line-height: 1.6; margin: 0;'>{evaluation}</p>
+    #                 </div>
+    #                 """, unsafe_allow_html=True)
+    # st.markdown('</div>', unsafe_allow_html=True)
+
+
+    # 检查筛选后的数据是否为空
+    if len(filtered_df) > 0:
+        current_name = filtered_df.iloc[0].iloc[0]
+        # 多人对比雷达图（勾选后才计算）
+        comparison_panel(df, vertex_cols, sheet_names, sheet_dfs)
+        # 按布局配置显示其余子表的图表（默认：饼图、柱状图1、柱状图2一行，折线图单独一行）
+        for section in resolve_layout(layout or DEFAULT_LAYOUT, sheet_names):
+            chart_section_panel(section, current_name, sheet_dfs, show_population)
+        # 显示数据预览
+        preview_panel(sheet_names, sheet_dfs, current_name)
+    else:
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        st.info("请先选择数据行")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+def _mark_radar_coords_changed():
+    st.session_state["radar_coords_changed"] = True
+
+
+@st.fragment
+def radar_panel(vertex_cols, current_name, sheet_names, sheet_dfs, show_population=False):
+    """雷达图片段：切换坐标模式时只重新渲染雷达图"""
+    invert_radar_coords = False
+    if len(vertex_cols) >= 2:
+        # 添加雷达图坐标模式选择
+        invert_radar_coords = st.checkbox(
+            "反转雷达图坐标",
+            value=True,
+            help="勾选后：外部边线为0点，数据越大顶点越靠近中心；取消勾选：中心为0点，数据越大顶点越高",
+            key="invert_radar_coords",
+            on_change=_mark_radar_coords_changed
+        )
+        # 多人对比雷达图在另一个片段中，也使用这个设置；切换时本片段单独重新运行不会更新它，需要重新运行整个页面
+        if st.session_state.pop("radar_coords_changed", False) and st.session_state.get("compare_enabled", False):
+            st.rerun()
+    with get_profiler().stage('render_radar_chart'):
+        render_radar_chart(
+            vertex_cols, current_name, sheet_names, sheet_dfs,
+            invert_coordinates=invert_radar_coords, show_population=show_population
+        )
+
+
+@st.fragment
+def comparison_panel(df, vertex_cols, sheet_names, sheet_dfs):
+    """多人对比片段：在一张雷达图上叠加多个人员或分组平均值"""
+    if len(vertex_cols) < 2 or len(sheet_names) == 0:
+        return
+    if not st.checkbox("👥 多人对比雷达图", value=False, key="compare_enabled",
+                       help=f"在一张雷达图上叠加多个人员或分组平均值，最多 {COMPARE_MAX_TRACES} 条"):
+        return
+
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    mode = st.radio("对比方式", options=["人员", "分组平均"], horizontal=True, key="compare_mode")
+    labels, values, title = [], np.empty((0, len(vertex_cols))), ""
+    try:
+        if mode == "人员":
+            if isinstance(sheet_dfs, LazyWorkbook):
+                value_index = sheet_dfs.column_values(sheet_names[0], df.columns[0])
+            else:
+                value_index = ColumnValueIndex(df.iloc[:, 0])
+            selected = st.session_state.get("compare_people", [])
+            if len(value_index) <= PICKER_FULL_LIST_LIMIT:
+                options = value_index.options()
+            else:
+                # 人员太多时按关键字查找，候选项只包含匹配项和已选中的人员，不构建完整列表
+                search_text = st.text_input("搜索人员", value="", key="compare_search")
+                matches = value_index.search(search_text, limit=PICKER_MATCH_LIMIT)
+                selected_set = set(selected)
+                options = list(selected) + [value for value in matches if value not in selected_set]
+            names = st.multiselect(
+                "选择对比人员", options=options, max_selections=COMPARE_MAX_TRACES, key="compare_people"
+            )
+            if names:
+                labels, values = people_matrix(sheet_dfs, sheet_names[0], names, vertex_cols)
+            title = f"多人对比 - {sheet_names[0]}"
+        else:
+            group_options = [column for column in df.columns[1:] if column not in vertex_cols]
+            if not group_options:
+                st.info("第一个子表中没有可用于分组的非数值列")
+            else:
+                group_column = st.selectbox("分组列", options=group_options, key="compare_group_column")
+                labels, values, sizes = group_means(df, group_column, vertex_cols, limit=COMPARE_MAX_TRACES)
+                labels = [f"{label}（{size}人）" for label, size in zip(labels, sizes)]
+                title = f"{group_column} 分组平均 - {sheet_names[0]}"
+
+        if len(labels) > 0:
+            if len(labels) > COMPARE_WEBGL_THRESHOLD:
+                st.caption(f"共 {len(labels)} 条曲线，已切换为WebGL绘制")
+            with get_profiler().stage('render_comparison_radar', rows=len(labels)):
+                fig = build_comparison_radar_figure(
+                    vertex_cols, labels, values,
+                    invert_coordinates=st.session_state.get("invert_radar_coords", True),
+                    title=title
+                )
+                get_profiler().add_payload(fig)
+                st.plotly_chart(fig, width='stretch')
+        elif mode == "人员":
+            st.info("请选择要对比的人员")
+    except Exception as e:
+        st.error(f"生成对比雷达图时出错: {str(e)}")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+def get_chart_layout():
+    """读取图表布局配置，配置有误时提示错误并使用默认布局"""
+    try:
+        return load_layout()
+    except ValueError as e:
+        st.sidebar.error(str(e))
+        return DEFAULT_LAYOUT
+
+
+@st.fragment
+def chart_section_panel(section, current_name, sheet_dfs, show_population=False):
+    """布局中的一个图表分区（独立片段）
+
+    columns 分区并排显示所有图表；tabs 和 expanders 分区只构建当前选中或展开的图表，
+    子表很多时只有实际查看的图表才会解析子表和构建图形。
+    （st.tabs 和 st.expander 即使未显示也会运行其中的代码，所以这里用单选框和开关代替。）
+    """
+    charts = section['charts']
+    if not charts:
+        return
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    if section['title']:
+        st.subheader(section['title'])
+        st.markdown("<div style='margin-bottom: 20px;'></div>", unsafe_allow_html=True)
+
+    def render(chart):
+        with get_profiler().stage(f"render_{chart['type']}_chart[{chart['sheet_name']}]"):
+            render_sheet_chart(chart, current_name, sheet_dfs, show_population)
+
+    if section['display'] == 'tabs':
+        labels = [chart['label'] for chart in charts]
+        selected = st.radio(
+            "选择图表", options=range(len(charts)), format_func=lambda index: labels[index],
+            horizontal=True, label_visibility="collapsed", key=f"layout_tab_{section['key']}"
+        )
+        render(charts[selected])
+    elif section['display'] == 'expanders':
+        for chart in charts:
+            if st.toggle(chart['label'], value=False, key=f"layout_open_{chart['key']}"):
+                render(chart)
+    else:
+        # 每行最多 MAX_COLUMNS 个图表
+        for row_start in range(0, len(charts), MAX_COLUMNS):
+            row_charts = charts[row_start:row_start + MAX_COLUMNS]
+            columns = st.columns(len(row_charts)) if len(charts) > 1 else [st.container()]
+            for column, chart in zip(columns, row_charts):
+                with column:
+                    # 与分区标题相同时不重复显示
+                    if chart['title'] and chart['title'] != section['title']:
+                        st.markdown(f"<h4 style='margin-bottom: 15px;'>{chart['title']}</h4>", unsafe_allow_html=True)
+                    render(chart)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+@st.fragment
+def preview_panel(sheet_names, sheet_dfs, current_name):
+    """数据预览片段：加载某个子表预览时不会重新渲染图表"""
+    with get_profiler().stage('show_data_preview'):
+        show_data_preview(sheet_names, sheet_dfs, current_name)
+
+
 def show_quick_start():
     """显示快速开始指南"""
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
@@ -672,7 +1460,7 @@ def show_quick_start():
     st.markdown("<ul>", unsafe_allow_html=True)
     st.markdown("<li style='margin: 0.5rem 0;'><strong>上传数据</strong>：在主页面点击上传按钮，选择Excel或CSV文件（支持.xlsx, .xls, .csv格式，最大不超过200M）</li>", unsafe_allow_html=True)
     st.markdown("<li style='margin: 0.5rem 0;'><strong>筛选数据</strong>：在'🔍 数据筛选'中选择筛选条件</li>", unsafe_allow_html=True)
-    st.markdown("<li style='margin: 0.5rem 0;'><strong>配置图表</strong>：在左侧侧边栏的'图表配置'中调整雷达图参数</li>", unsafe_allow_html=True)
+    st.markdown("<li style='margin: 0.5rem 0;'><strong>配置图表</strong>：在雷达图上方切换坐标模式，在左侧侧边栏的'图表配置'中查看雷达图顶点</li>", unsafe_allow_html=True)
     st.markdown("<li style='margin: 0.5rem 0;'><strong>查看结果</strong>：浏览生成的各类图表和数据预览</li>", unsafe_allow_html=True)
     st.markdown("</ul>", unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
@@ -690,6 +1478,11 @@ def main():
     # 加载CSS
     load_css()
     
+    # 性能分析：环境变量 APP_PROFILE=1 或页面地址带 ?profile=1 时开启
+    profiler = get_profiler()
+    profiler.enabled = profiling_requested(st.query_params)
+    profiler.start_run()
+    
     # 渲染侧边栏并获取API密钥
     api_key = render_sidebar()
     
@@ -707,131 +1500,47 @@ def main():
     st.markdown("<h6>📁 选择要分析的数据文件</h6>", unsafe_allow_html=True)
     st.markdown("<p style='color: #718096; font-size: 14px; margin-top: 10px;'>支持格式：Excel (.xlsx, .xls) 和 CSV (.csv)，最大不超过200M</p>", unsafe_allow_html=True)
       
-    # 4. 上传组件
-    uploaded_file = st.file_uploader(
-        label="上传数据文件", # 简化标签，实际提示已在页面显示
-        type=["xlsx", "xls", "csv"],
-        label_visibility="collapsed"  # 隐藏默认标签
-    )
+    # 配置了服务器目录（环境变量 WORKBOOK_DIR）时，可以直接选择服务器上的文件，不必上传
+    directory = get_workbook_directory()
+    source = "上传文件"
+    if directory is not None:
+        source = st.radio("数据来源", ["上传文件", "服务器目录"], horizontal=True, key="data_source")
+    
+    if source == "服务器目录":
+        uploaded_file = select_server_file(directory)
+    else:
+        # 4. 上传组件
+        uploaded_file = st.file_uploader(
+            label="上传数据文件", # 简化标签，实际提示已在页面显示
+            type=["xlsx", "xls", "csv"],
+            label_visibility="collapsed"  # 隐藏默认标签
+        )
     
     # 添加一个空白分隔区域
     st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
     
     if uploaded_file is not None:
         # 读取文件
-        df, sheet_names, sheet_dfs = read_file(uploaded_file)
+        with get_profiler().stage('read_file', payload_bytes=uploaded_file.size) as record:
+            df, sheet_names, sheet_dfs = read_file(uploaded_file)
+            if df is not None:
+                record['rows'] = len(df)
         
         if df is not None:
             # 显示文件信息
-            show_file_info(uploaded_file, df, sheet_names)
+            show_file_info(uploaded_file, df, sheet_names, sheet_dfs)
             
             # 配置雷达图
-            vertex_cols, invert_radar_coords = configure_radar_chart(df)
+            with get_profiler().stage('configure_radar_chart'):
+                vertex_cols = configure_radar_chart(df, sheet_dfs)
+            
+            # 批量生成评价
+            render_batch_evaluation(df, sheet_names, sheet_dfs)
             
             # 检查初始数据是否为空
             if len(df) > 0:
-                # 第一行：左侧显示数据筛选，右侧显示雷达图
-                st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                # 使用两列布局，左侧显示数据筛选，右侧显示雷达图
-                row1_col1, row1_col2, row1_col3 = st.columns([0.4, 0.1, 0.5])
-                
-                with row1_col1:
-                    # 调用筛选数据函数，获取筛选后的结果
-                    filtered_df = filter_data(df)
-
-                    # 显示选中人员信息（大字体）
-                    if len(filtered_df) > 0:
-                        st.markdown(f"<h1 style='color: #4a5568; font-weight: 800; margin-bottom: 0; margin-left: 100px; margin-top: 30px;'>{filtered_df.iloc[0].iloc[0]}</h1>", unsafe_allow_html=True)
-                        st.markdown(f"<p style='color: #718096; margin-top: 0; margin-bottom: 2rem; margin-left: 100px; '>当前选中人员数据</p>", unsafe_allow_html=True)
-
-                # 中间空白列   
-                row1_col2.write("")  
-                
-                # 右侧显示雷达图
-                with row1_col3:
-                    # 检查筛选后的数据是否为空
-                    if len(filtered_df) > 0:
-                        # 生成雷达图（使用用户选择的顶点列）
-                        render_radar_chart(vertex_cols, filtered_df.iloc[0].iloc[0], sheet_names, sheet_dfs, invert_coordinates=invert_radar_coords)
-                        
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-                # # 第二行：选中人员和生成评价
-                # st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                # row2_col1, row2_col2 = st.columns([0.4, 0.6])
-
-
-
-                # with row2_col1:
-                #     # 显示评价生成
-                #     if len(filtered_df) > 0:
-                #         current_name = filtered_df.iloc[0].iloc[0]
-                        
-                #         # 添加生成按钮
-                #         if st.button("生成评价", key="generate_eval"):
-                #             with st.spinner("正在生成评价..."):
-                #                 # 导入评价生成模块
-                #                 from qianwen_api import prepare_person_data, generate_evaluation
-                #                 from config import QWEN_API_KEY
-                                
-                #                 # 准备人员数据
-                #                 person_data = prepare_person_data(current_name, sheet_names, sheet_dfs)
-                                
-                #                 # 生成评价
-                #                 evaluation = generate_evaluation(person_data, current_name, QWEN_API_KEY)
-                                
-                #                 # 显示评价
-                #                 st.markdown(f"""
-                #                 <div style='background: rgba(102, 126, 234, 0.1); 
-                #                         padding: 15px; 
-                #                         border-radius: 10px; 
-                #                         margin-top: 10px;
-                #                         font-size: 14px;'>
-                #                     <h6 style='color: #4a5568; margin-bottom: 8px; font-size: 16px;'>📝 评价报告</h6>
-                #                     <p style='color: #2d3748; line-height: 1.6; margin: 0;'>{evaluation}</p>
-                #                 </div>
-                #                 """, unsafe_allow_html=True)
-                # st.markdown('</div>', unsafe_allow_html=True)
-
-
-                # 检查筛选后的数据是否为空
-                if len(filtered_df) > 0:
-                    # 第二行：饼图、柱状图1、柱状图2放置在同一行
-                    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    st.subheader("📊 数据分析")
-                    st.markdown("<div style='margin-bottom: 20px;'></div>", unsafe_allow_html=True)
-                    
-                    # 创建三列布局，将三个图表放在同一行
-                    row2_col1, row2_col2, row2_col3 = st.columns(3)
-                    
-                    with row2_col1:
-                        # 生成饼图（使用第二个子表数据）
-                        st.markdown("<h4 style='margin-bottom: 15px;'>🥧 饼图</h4>", unsafe_allow_html=True)
-                        render_pie_chart(filtered_df.iloc[0].iloc[0], sheet_names, sheet_dfs)
-                    
-                    with row2_col2:
-                        # 第一个柱状图：使用第三个子表数据
-                        st.markdown("<h4 style='margin-bottom: 15px;'>📊 柱状图1</h4>", unsafe_allow_html=True)
-                        render_bar_chart(0, filtered_df.iloc[0].iloc[0], sheet_names, sheet_dfs, px.colors.sequential.Viridis)
-                    
-                    with row2_col3:
-                        # 第二个柱状图：使用第四个子表数据
-                        st.markdown("<h4 style='margin-bottom: 15px;'>📊 柱状图2</h4>", unsafe_allow_html=True)
-                        render_bar_chart(1, filtered_df.iloc[0].iloc[0], sheet_names, sheet_dfs, px.colors.sequential.Plasma)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # 第三行：折线图（单独一行，使用第五个子表数据）
-                    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    st.subheader("📈 折线图")
-                    render_line_chart(filtered_df.iloc[0].iloc[0], sheet_names, sheet_dfs)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # 显示数据预览
-                    show_data_preview(sheet_names, sheet_dfs, filtered_df.iloc[0].iloc[0])
-                else:
-                    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    st.info("请先选择数据行")
-                    st.markdown('</div>', unsafe_allow_html=True)
+                # 筛选和图表区域：切换人员时只重新运行这一部分
+                person_dashboard(df, vertex_cols, sheet_names, sheet_dfs, get_chart_layout())
             else:
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                 st.info("请先选择数据行")
@@ -840,6 +1549,12 @@ def main():
         # 显示快速开始指南
         show_quick_start()
     
+    # 显示性能分析面板
+    render_profiler_panel()
+    
+    # 显示共享缓存管理面板
+    render_cache_admin_panel()
+    
     st.sidebar.markdown('</div>', unsafe_allow_html=True)
 
 
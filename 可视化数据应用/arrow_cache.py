@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # pyarrow 为可选依赖，未安装时不启用磁盘缓存
+    pa = None
+    feather = None
+
+# 默认磁盘缓存上限（MB），可通过环境变量 WORKBOOK_DISK_CACHE_MB 调整，设为0表示关闭
+DEFAULT_DISK_CACHE_MB = 2048
+DEFAULT_DISK_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.workbook_cache')
+MANIFEST_NAME = 'manifest.json'
+# 保存原始列名类型的 schema 元数据键（Arrow 的字段名只能是字符串）
+LABELS_METADATA_KEY = b'column_labels'
+LABEL_TYPES = {'str': str, 'int': int, 'float': float, 'bool': bool}
+# 保存压缩前内存占用（字节）的 schema 元数据键，只有压缩后的子表才有
+RAW_BYTES_METADATA_KEY = b'raw_nbytes'
+
+
+def disk_cache_key(file_hash, compact=False):
+    """磁盘缓存的键：开启内存压缩时保存的是压缩后的子表，与未压缩的分开缓存"""
+    return f'{file_hash}-compact' if compact else file_hash
+
+
+def _encode_labels(columns):
+    """把列名编码为 [[类型, 值], ...] 的JSON；列名不是字符串、整数、浮点数或布尔值时返回 None"""
+    labels = []
+    for label in columns:
+        if hasattr(label, 'item') and not isinstance(label, str):
+            label = label.item()
+        type_name = type(label).__name__
+        if type_name not in LABEL_TYPES:
+            return None
+        labels.append([type_name, label])
+    return json.dumps(labels, ensure_ascii=False).encode('utf-8')
+
+
+def _decode_labels(data):
+    return [LABEL_TYPES[type_name](value) for type_name, value in json.loads(data.decode('utf-8'))]
+
+
+class ArrowSheetCache:
+    """已解析子表的磁盘列式缓存
+
+    每个工作簿按文件内容哈希占用一个目录，目录中保存子表清单（名称、行列数）
+    和每个子表的 Arrow IPC 文件（不压缩，便于内存映射读取）。
+    读取时通过内存映射打开，只有实际用到的列才会被读入内存。
+    目录总大小超过上限时，按最近访问时间淘汰最久未使用的工作簿。
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or os.environ.get('WORKBOOK_DISK_CACHE_DIR', DEFAULT_DISK_CACHE_DIR)
+        if max_bytes is None:
+            try:
+                max_mb = float(os.environ.get('WORKBOOK_DISK_CACHE_MB', DEFAULT_DISK_CACHE_MB))
+            except ValueError:
+                max_mb = DEFAULT_DISK_CACHE_MB
+            max_bytes = int(max_mb * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return feather is not None and self.max_bytes > 0
+
+    def _workbook_dir(self, file_hash):
+        return os.path.join(self.root, file_hash)
+
+    def _sheet_path(self, file_hash, sheet_name):
+        # 子表名称可能包含文件名中不允许的字符，使用哈希作为文件名
+        sheet_key = hashlib.sha1(sheet_name.encode('utf-8')).hexdigest()
+        return os.path.join(self._workbook_dir(file_hash), f'{sheet_key}.arrow')
+
+    def load_manifest(self, file_hash):
+        """读取工作簿的子表清单，不存在时返回 None"""
+        if not self.enabled:
+            return None
+        path = os.path.join(self._workbook_dir(file_hash), MANIFEST_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._touch(file_hash)
+        manifest['dimensions'] = {
+            name: tuple(dims) if dims is not None else None
+            for name, dims in manifest.get('dimensions', {}).items()
+        }
+        return manifest
+
+    def save_manifest(self, file_hash, sheet_names, dimensions):
+        """保存工作簿的子表清单"""
+        if not self.enabled:
+            return
+        manifest = {
+            'sheet_names': list(sheet_names),
+            'dimensions': {name: list(dims) if dims is not None else None for name, dims in dimensions.items()},
+        }
+        try:
+            os.makedirs(self._workbook_dir(file_hash), exist_ok=True)
+            self._write_atomic(
+                os.path.join(self._workbook_dir(file_hash), MANIFEST_NAME),
+                lambda path: _write_json(path, manifest)
+            )
+        except OSError:
+            pass
+
+    def has_sheet(self, file_hash, sheet_name):
+        """子表是否已写入缓存"""
+        return self.enabled and os.path.exists(self._sheet_path(file_hash, sheet_name))
+
+    def load_sheet(self, file_hash, sheet_name):
+        """以内存映射方式读取子表，不存在或读取失败时返回 None"""
+        return self.load_sheet_with_raw_bytes(file_hash, sheet_name)[0]
+
+    def load_sheet_with_raw_bytes(self, file_hash, sheet_name):
+        """
+        读取子表及写入时记录的压缩前内存占用
+
+        Returns:
+            (DataFrame, 压缩前的字节数)，没有记录时字节数为 None；子表不存在或读取失败时为 (None, None)
+        """
+        if not self.enabled:
+            return None, None
+        path = self._sheet_path(file_hash, sheet_name)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            table = feather.read_table(path, memory_map=True)
+            # split_blocks 让无空值的数值列直接引用映射的内存，避免整体复制
+            df = table.to_pandas(split_blocks=True)
+            metadata = table.schema.metadata or {}
+            labels = metadata.get(LABELS_METADATA_KEY)
+            if labels is None:
+                # 旧版本写入的缓存没有保存列名类型，重新解析原文件
+                return None, None
+            # 恢复原始的列名类型（如年份列名 2023 不会变成 '2023'）
+            df.columns = _decode_labels(labels)
+            raw_bytes = metadata.get(RAW_BYTES_METADATA_KEY)
+            raw_bytes = int(raw_bytes) if raw_bytes is not None else None
+        except Exception:
+            return None, None
+        self._touch(file_hash)
+        return df, raw_bytes
+
+    def save_sheet(self, file_hash, sheet_name, df, raw_bytes=None):
+        """
+        把子表写入缓存；无法转换为Arrow的数据（如混合类型列、无法还原的列名类型）直接跳过
+
+        raw_bytes 为压缩后的子表在压缩前的内存占用，与子表一起保存，读取时不必重新解析原文件就能得到。
+        """
+        if not self.enabled:
+            return False
+        labels = _encode_labels(df.columns)
+        if labels is None:
+            return False
+        metadata = {LABELS_METADATA_KEY: labels}
+        if raw_bytes is not None:
+            metadata[RAW_BYTES_METADATA_KEY] = str(int(raw_bytes)).encode('ascii')
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        except Exception:
+            return False
+        try:
+            os.makedirs(self._workbook_dir(file_hash), exist_ok=True)
+            self._write_atomic(
+                self._sheet_path(file_hash, sheet_name),
+                lambda path: feather.write_feather(table, path, compression='uncompressed')
+            )
+        except Exception:
+            return False
+        self._evict(keep=file_hash)
+        return True
+
+    def _write_atomic(self, path, write):
+        # 先写临时文件再改名，避免其他会话读到写了一半的文件
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _touch(self, file_hash):
+        try:
+            os.utime(self._workbook_dir(file_hash))
+        except OSError:
+            pass
+
+    def _entries(self):
+        """返回 [(最近访问时间, 目录大小, 文件哈希)]"""
+        entries = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return entries
+        for name in names:
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            size = 0
+            for file_name in os.listdir(path):
+                try:
+                    size += os.path.getsize(os.path.join(path, file_name))
+                except OSError:
+                    pass
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                mtime = time.time()
+            entries.append((mtime, size, name))
+        return entries
+
+    def _evict(self, keep=None):
+        """超过大小上限时淘汰最久未使用的工作簿目录"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in entries:
+                if total <= self.max_bytes:
+                    break
+                if name == keep:
+                    continue
+                # Windows 下仍被内存映射的文件无法删除，跳过即可
+                shutil.rmtree(self._workbook_dir(name), ignore_errors=True)
+                total -= size
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+_default_cache = None
+
+
+def default_sheet_cache():
+    """进程内共享的磁盘缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArrowSheetCache()
+    return _default_cache
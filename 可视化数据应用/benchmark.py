@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+
+生成指定规模的模拟工作簿，在不启动浏览器的情况下测量读取、筛选、构建图表和准备评价数据
+各阶段的耗时与内存峰值，结果以JSON格式输出，便于在不同版本之间比较。
+
+用法示例：
+    python benchmark.py --people 1000 10000 100000 --sheets 5 --columns 8 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def generate_workbook(path, people, sheets=5, columns=8, name_cardinality=1.0, seed=0):
+    """
+    生成模拟工作簿
+
+    Args:
+        path: 输出文件路径，.csv 时只生成一个表
+        people: 每个子表的数据行数
+        sheets: 子表数量
+        columns: 每个子表的数值列数量
+        name_cardinality: 第一列（人员姓名）不同取值占行数的比例，1.0 表示每行一个人
+        seed: 随机数种子
+
+    Returns:
+        生成的文件路径
+    """
+    rng = np.random.default_rng(seed)
+    unique_names = max(int(people * name_cardinality), 1)
+    names = [f"人员{i % unique_names:07d}" for i in range(people)]
+    departments = np.array(["研发部", "测试部", "产品部", "运营部", "市场部"])
+
+    def make_sheet():
+        data = {"姓名": names, "部门": departments[rng.integers(0, len(departments), people)]}
+        for col in range(columns):
+            # 指标为问题数量，多数为较小的整数
+            data[f"指标{col + 1}"] = rng.poisson(3, people)
+        return pd.DataFrame(data)
+
+    if path.endswith('.csv'):
+        make_sheet().to_csv(path, index=False)
+    else:
+        with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
+            for sheet in range(sheets):
+                make_sheet().to_excel(writer, sheet_name=f"子表{sheet + 1}", index=False)
+    return path
+
+
+class UploadedFile:
+    """模拟 st.file_uploader 返回的文件对象"""
+
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            self._data = f.read()
+        self.size = len(self._data)
+
+    def getvalue(self):
+        return self._data
+
+
+def measure(func, repeat=3):
+    """多次运行func计时，再单独运行一次统计Python层面的内存峰值"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        'seconds_min': min(durations),
+        'seconds_median': statistics.median(durations),
+        'peak_bytes': peak,
+    }
+
+
+def run_benchmark(path, repeat=3, parallel_workers=1):
+    """对一个工作簿运行所有阶段的基准测试"""
+    import app
+    from arrow_cache import default_sheet_cache
+    from population_stats import PopulationStats
+    from qianwen_api import prepare_person_data
+
+    uploaded_file = UploadedFile(path)
+    stages = {}
+
+    def read_cold():
+        # 清空会话缓存，并关闭磁盘缓存，测量完整解析的耗时
+        app.get_workbook_cache().clear()
+        disk_cache_bytes = default_sheet_cache().max_bytes
+        default_sheet_cache().max_bytes = 0
+        try:
+            df, sheet_names, sheet_dfs = app.read_file(uploaded_file, parallel_workers=parallel_workers)
+            sheet_dfs.load_all(parallel_workers)
+        finally:
+            default_sheet_cache().max_bytes = disk_cache_bytes
+        return df, sheet_names, sheet_dfs
+
+    (df, sheet_names, sheet_dfs), stages['read_file'] = measure(read_cold, repeat)
+
+    def read_disk_cache():
+        app.get_workbook_cache().clear()
+        _, _, cached_dfs = app.read_file(uploaded_file)
+        cached_dfs.load_all()
+        return cached_dfs
+
+    read_disk_cache()
+    _, stages['read_file_disk_cache'] = measure(read_disk_cache, repeat)
+
+    _, stages['read_file_memory_cache'] = measure(lambda: app.read_file(uploaded_file), repeat)
+
+    filtered_df, stages['filter_data'] = measure(lambda: app.filter_data(df, sheet_dfs), repeat)
+    current_name = filtered_df.iloc[0].iloc[0]
+
+    def person_lookup():
+        return [app.person_rows(sheet_dfs, sheet_name, current_name) for sheet_name in sheet_names]
+
+    _, stages['person_lookup'] = measure(person_lookup, repeat)
+
+    vertex_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+
+    def radar_figure():
+        _, radar_values = app.person_metrics(sheet_dfs, sheet_names[0], current_name, vertex_cols)
+        original_values = radar_values.tolist()
+        return app.build_radar_figure(vertex_cols, original_values, current_name, invert_coordinates=True)
+
+    _, stages['render_radar_chart'] = measure(radar_figure, repeat)
+
+    def comparison_radar_figure():
+        names = df.iloc[:app.COMPARE_MAX_TRACES, 0].tolist()
+        labels, values = app.people_matrix(sheet_dfs, sheet_names[0], names, vertex_cols)
+        return app.build_comparison_radar_figure(vertex_cols, labels, values, invert_coordinates=True)
+
+    _, stages['render_comparison_radar'] = measure(comparison_radar_figure, repeat)
+
+    def chart_data(sheet_name):
+        numeric_cols, values = app.person_metrics(sheet_dfs, sheet_name, current_name)
+        return app.chart_data_from_metrics(numeric_cols, values)
+
+    figure_stages = [
+        ('render_pie_chart', 1, lambda data: app.build_pie_figure(data)),
+        ('render_bar_chart_1', 2, lambda data: app.build_bar_figure(data, app.px.colors.sequential.Viridis)),
+        ('render_bar_chart_2', 3, lambda data: app.build_bar_figure(data, app.px.colors.sequential.Plasma)),
+        ('render_line_chart', 4, lambda data: app.build_line_figure(data)),
+    ]
+    for stage_name, sheet_index, build in figure_stages:
+        if len(sheet_names) > sheet_index:
+            sheet_name = sheet_names[sheet_index]
+            _, stages[stage_name] = measure(lambda: build(chart_data(sheet_name)), repeat)
+
+    _, stages['population_stats_build'] = measure(lambda: PopulationStats(matrix=sheet_dfs.metric_matrix(sheet_names[0])), repeat)
+    _, stages['population_overlay'] = measure(
+        lambda: app.population_overlay(sheet_dfs, sheet_names[0], current_name, vertex_cols), repeat
+    )
+
+    _, stages['prepare_person_data'] = measure(
+        lambda: prepare_person_data(current_name, sheet_names, sheet_dfs), repeat
+    )
+
+    rows = sum(len(sheet_dfs[sheet_name]) for sheet_name in sheet_names)
+    return {
+        'file': os.path.basename(path),
+        'file_bytes': uploaded_file.size,
+        'sheets': len(sheet_names),
+        'rows_per_sheet': len(df),
+        'total_rows': rows,
+        'stages': stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="数据可视化应用性能基准测试")
+    parser.add_argument('--people', type=int, nargs='+', default=[1000, 10000], help="每个子表的行数，可指定多个规模")
+    parser.add_argument('--sheets', type=int, default=5, help="子表数量")
+    parser.add_argument('--columns', type=int, default=8, help="每个子表的数值列数量")
+    parser.add_argument('--name-cardinality', type=float, default=1.0, help="姓名不同取值占行数的比例")
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help="生成的文件格式")
+    parser.add_argument('--repeat', type=int, default=3, help="每个阶段重复运行的次数")
+    parser.add_argument('--parallel-workers', type=int, default=1, help="读取文件时并行解析的进程数")
+    parser.add_argument('--workdir', default=None, help="保存生成文件的目录，默认使用临时目录")
+    parser.add_argument('--output', default=None, help="结果JSON文件路径，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    # 不在 streamlit run 下运行时 Streamlit 会输出大量警告（如 missing ScriptRunContext），这里统一屏蔽。
+    # Streamlit 的日志器各自设置级别且不向上传递，只设置 'streamlit' 日志器不起作用，需要设置全局级别；
+    # 第一次读取配置时会按配置项 logger.level 重设级别，所以先读取配置再设置
+    import streamlit.config
+    import streamlit.logger
+    streamlit.config.get_option('logger.level')
+    streamlit.logger.set_log_level('error')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='excel_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    # 磁盘缓存写入工作目录，避免污染应用自身的缓存
+    os.environ.setdefault('WORKBOOK_DISK_CACHE_DIR', os.path.join(workdir, 'cache'))
+
+    runs = []
+    for people in args.people:
+        path = os.path.join(workdir, f"bench_{people}_{args.sheets}x{args.columns}.{args.format}")
+        start = time.perf_counter()
+        generate_workbook(path, people, args.sheets, args.columns, args.name_cardinality)
+        generate_seconds = time.perf_counter() - start
+        result = run_benchmark(path, repeat=args.repeat, parallel_workers=args.parallel_workers)
+        result['generate_seconds'] = generate_seconds
+        runs.append(result)
+        print(f"{people} 行：读取 {result['stages']['read_file']['seconds_median']:.3f}s", file=sys.stderr)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'config': vars(args),
+        'runs': runs,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+图表布局配置
+
+布局由若干分区组成，每个分区把子表（按名称或从0开始的序号）映射到图表类型：
+
+    {
+        "sections": [
+            {
+                "title": "📊 数据分析",
+                "display": "columns",          # columns: 并排全部显示；tabs: 标签页；expanders: 逐个展开
+                "charts": [
+                    {"sheet": 1, "type": "pie", "title": "🥧 饼图"},
+                    {"sheet": "考勤", "type": "bar", "colors": "Viridis"}
+                ]
+            }
+        ],
+        "rest": {"title": "📁 其他子表", "display": "expanders", "type": "bar"}
+    }
+
+rest 为可选项，把没有出现在任何分区中的子表（第一个子表用于雷达图，除外）按同一类型放入一个分区，
+适合子表很多的工作簿。tabs 和 expanders 分区只构建当前显示的图表。
+环境变量 CHART_LAYOUT 可指定JSON格式的布局文件，未指定时使用同目录下的 chart_layout.json（如果存在），
+否则使用与原页面相同的默认布局。
+"""
+
+import copy
+import json
+import os
+
+CHART_TYPES = {'pie': '饼图', 'bar': '柱状图', 'line': '折线图'}
+DISPLAY_MODES = ('columns', 'tabs', 'expanders')
+# columns 分区每行最多显示的图表数
+MAX_COLUMNS = 3
+
+DEFAULT_LAYOUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chart_layout.json')
+
+DEFAULT_LAYOUT = {
+    'sections': [
+        {
+            'title': '📊 数据分析',
+            'display': 'columns',
+            'charts': [
+                {'sheet': 1, 'type': 'pie', 'title': '🥧 饼图'},
+                {'sheet': 2, 'type': 'bar', 'title': '📊 柱状图1', 'colors': 'Viridis'},
+                {'sheet': 3, 'type': 'bar', 'title': '📊 柱状图2', 'colors': 'Plasma'},
+            ],
+        },
+        {
+            'title': '📈 折线图',
+            'display': 'columns',
+            'charts': [
+                {'sheet': 4, 'type': 'line', 'title': '📈 折线图'},
+            ],
+        },
+    ],
+    'rest': {'title': '📁 其他子表', 'display': 'expanders', 'type': 'bar', 'colors': 'Viridis'},
+}
+
+
+def load_layout(path=None):
+    """
+    读取布局配置
+
+    Args:
+        path: JSON文件路径，默认读取环境变量 CHART_LAYOUT 或同目录下的 chart_layout.json
+
+    Returns:
+        布局字典；没有配置文件时返回默认布局
+
+    Raises:
+        ValueError: 配置文件无法读取或格式不正确
+    """
+    path = path or os.environ.get('CHART_LAYOUT')
+    if not path:
+        if not os.path.exists(DEFAULT_LAYOUT_PATH):
+            return copy.deepcopy(DEFAULT_LAYOUT)
+        path = DEFAULT_LAYOUT_PATH
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            layout = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"无法读取图表布局 {path}: {e}")
+    validate_layout(layout)
+    return layout
+
+
+def validate_layout(layout):
+    """检查布局格式，不正确时抛出 ValueError"""
+    if not isinstance(layout, dict) or not isinstance(layout.get('sections', []), list):
+        raise ValueError("图表布局必须包含 sections 列表")
+    for section in layout.get('sections', []):
+        if section.get('display', 'columns') not in DISPLAY_MODES:
+            raise ValueError(f"不支持的显示方式: {section.get('display')}")
+        for chart in section.get('charts', []):
+            if chart.get('type') not in CHART_TYPES:
+                raise ValueError(f"不支持的图表类型: {chart.get('type')}")
+            if not isinstance(chart.get('sheet'), (int, str)):
+                raise ValueError("图表必须用 sheet 指定子表名称或序号")
+    rest = layout.get('rest')
+    if rest is not None:
+        if rest.get('type') not in CHART_TYPES:
+            raise ValueError(f"不支持的图表类型: {rest.get('type')}")
+        if rest.get('display', 'expanders') not in DISPLAY_MODES:
+            raise ValueError(f"不支持的显示方式: {rest.get('display')}")
+
+
+def _resolve_sheet(sheet, sheet_names):
+    """把子表名称或序号转换为子表名称，不存在时返回 None"""
+    if isinstance(sheet, int):
+        return sheet_names[sheet] if 0 <= sheet < len(sheet_names) else None
+    return sheet if sheet in sheet_names else None
+
+
+def _resolve_chart(chart, sheet_names, key):
+    sheet_name = _resolve_sheet(chart['sheet'], sheet_names)
+    if sheet_name is None:
+        if isinstance(chart['sheet'], int):
+            missing = f"请上传包含至少{chart['sheet'] + 1}个子表的Excel文件"
+        else:
+            missing = f"未找到子表: {chart['sheet']}"
+    else:
+        missing = None
+    return {
+        'key': key,
+        'type': chart['type'],
+        'title': chart.get('title'),
+        'label': chart.get('title') or f"{CHART_TYPES[chart['type']]} - {sheet_name or chart['sheet']}",
+        'sheet_name': sheet_name,
+        'colors': chart.get('colors', 'Viridis'),
+        'missing': missing,
+    }
+
+
+def resolve_layout(layout, sheet_names):
+    """
+    按工作簿的子表解析布局
+
+    Returns:
+        分区列表，每个分区为 {'key', 'title', 'display', 'charts'}，
+        图表为 {'key', 'type', 'title', 'label', 'sheet_name', 'colors', 'missing'}；
+        子表不存在时 sheet_name 为 None，missing 为提示文本
+    """
+    sections = []
+    used = {sheet_names[0]} if sheet_names else set()
+    for section_index, section in enumerate(layout.get('sections', [])):
+        charts = [
+            _resolve_chart(chart, sheet_names, f"{section_index}_{chart_index}")
+            for chart_index, chart in enumerate(section.get('charts', []))
+        ]
+        used.update(chart['sheet_name'] for chart in charts if chart['sheet_name'] is not None)
+        sections.append({
+            'key': str(section_index),
+            'title': section.get('title'),
+            'display': section.get('display', 'columns'),
+            'charts': charts,
+        })
+
+    rest = layout.get('rest')
+    remaining = [sheet_name for sheet_name in sheet_names if sheet_name not in used]
+    if rest is not None and remaining:
+        sections.append({
+            'key': 'rest',
+            'title': rest.get('title'),
+            'display': rest.get('display', 'expanders'),
+            'charts': [
+                _resolve_chart(
+                    {'sheet': sheet_name, 'type': rest['type'], 'colors': rest.get('colors', 'Viridis')},
+                    sheet_names,
+                    f"rest_{chart_index}",
+                )
+                for chart_index, sheet_name in enumerate(remaining)
+            ],
+        })
+    return sections
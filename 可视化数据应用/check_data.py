@@ -1,20 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+工作簿检查工具
+
+在上传到页面之前快速检查Excel或CSV文件：从元数据读取各子表的行列数和表头，不解析全部单元格；
+可选读取前若干行样本，估算每个子表载入后的内存占用并显示各列类型；
+可选完整读取第一列（人员姓名），统计不同人员数量以及各子表与第一个子表的人员匹配情况。
+每个步骤都会计时。
+
+用法示例：
+    python check_data.py 数据.xlsx
+    python check_data.py 数据.xlsx --sample-rows 1000 --keys
+    python check_data.py 数据.csv --sample-rows 1000 --json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
 import pandas as pd
 
-# 读取Excel文件
-try:
-    excel_file = pd.ExcelFile('sample_data.xlsx')
-    print('子表名称:', excel_file.sheet_names)
-    
-    for sheet_name in excel_file.sheet_names:
-        print('\n' + '-'*50)
-        print(f'子表: {sheet_name}')
-        df = excel_file.parse(sheet_name)
-        print(f'数据行数: {df.shape[0]}')
-        print(f'数据列数: {df.shape[1]}')
-        print('\n数据预览:')
-        print(df.head())
-        if df.shape[0] > 5:
-            print('\n... 更多数据 ...')
-    print('\n' + '-'*50)
-except Exception as e:
-    print(f'读取文件时出错: {e}')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from workbook import pick_excel_engine, read_sheet_dimensions
+from workbook_cache import frame_nbytes
+
+
+@contextmanager
+def timed(timings, step):
+    """记录一个步骤的耗时（毫秒）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append({'step': step, 'ms': round((time.perf_counter() - start) * 1000, 2)})
+
+
+def _read_sheet(source, sheet_name, is_csv, **kwargs):
+    if is_csv:
+        return pd.read_csv(io.BytesIO(source), **kwargs)
+    return source.parse(sheet_name, **kwargs)
+
+
+def profile_workbook(path, sample_rows=0, read_keys=False, engine=None):
+    """
+    检查工作簿
+
+    Args:
+        path: Excel或CSV文件路径
+        sample_rows: 每个子表读取的样本行数，0 表示只读取表头
+        read_keys: 是否完整读取每个子表的第一列，统计人员数量和跨子表匹配情况
+        engine: Excel解析引擎，默认与页面相同的自动选择
+
+    Returns:
+        检查结果字典
+    """
+    timings = []
+    file_name = os.path.basename(path)
+    is_csv = file_name.lower().endswith('.csv')
+
+    with timed(timings, '读取文件'):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+    with timed(timings, '读取元数据'):
+        if is_csv:
+            source = data
+            sheet_names = ['Sheet1']
+            # 按换行符数估算行数（不考虑引号内的换行）
+            line_count = data.count(b'\n') + (0 if data.endswith(b'\n') else 1)
+            dimensions = {'Sheet1': (max(line_count - 1, 0), None)}
+            engine = 'csv'
+        else:
+            engine = engine or pick_excel_engine(file_name)
+            source = pd.ExcelFile(io.BytesIO(data), engine=engine)
+            sheet_names = list(source.sheet_names)
+            dimensions = read_sheet_dimensions(source, data, file_name)
+
+    sheets = []
+    keys = {}
+    for sheet_name in sheet_names:
+        dims = dimensions.get(sheet_name)
+        rows = dims[0] if dims is not None else None
+        info = {'name': sheet_name, 'rows': rows, 'columns': dims[1] if dims is not None else None}
+
+        with timed(timings, f'{sheet_name}: 读取表头'):
+            header = _read_sheet(source, sheet_name, is_csv, nrows=0)
+        info['headers'] = [str(column) for column in header.columns]
+        if info['columns'] is None:
+            info['columns'] = len(header.columns)
+
+        if sample_rows > 0:
+            with timed(timings, f'{sheet_name}: 读取{sample_rows}行样本'):
+                sample = _read_sheet(source, sheet_name, is_csv, nrows=sample_rows)
+            info['sample_rows'] = len(sample)
+            info['dtypes'] = {str(column): str(dtype) for column, dtype in sample.dtypes.items()}
+            if len(sample) > 0 and rows is not None:
+                # 按样本每行的平均内存占用估算整个子表
+                info['estimated_bytes'] = int(frame_nbytes(sample) / len(sample) * rows)
+            if len(sample.columns) > 0:
+                info['key_column'] = str(sample.columns[0])
+                info['sample_unique_keys'] = int(sample.iloc[:, 0].nunique(dropna=True))
+
+        if read_keys and len(header.columns) > 0:
+            with timed(timings, f'{sheet_name}: 读取第一列'):
+                key_series = _read_sheet(source, sheet_name, is_csv, usecols=[0]).iloc[:, 0].dropna()
+            keys[sheet_name] = set(key_series.tolist())
+            info['key_column'] = str(header.columns[0])
+            info['key_rows'] = len(key_series)
+            info['unique_keys'] = len(keys[sheet_name])
+            info['duplicate_key_rows'] = len(key_series) - len(keys[sheet_name])
+        sheets.append(info)
+
+    key_match = []
+    if keys and sheet_names[0] in keys:
+        with timed(timings, '人员匹配'):
+            base_keys = keys[sheet_names[0]]
+            for sheet_name in sheet_names[1:]:
+                if sheet_name not in keys:
+                    continue
+                sheet_keys = keys[sheet_name]
+                matched = len(base_keys & sheet_keys)
+                key_match.append({
+                    'sheet': sheet_name,
+                    'matched': matched,
+                    'missing': len(base_keys) - matched,
+                    'extra': len(sheet_keys) - matched,
+                    'ratio': round(matched / len(base_keys), 4) if base_keys else None,
+                })
+
+    return {
+        'file': path,
+        'file_bytes': len(data),
+        'engine': engine,
+        'sheet_names': sheet_names,
+        'sheets': sheets,
+        'key_match': key_match,
+        'timings': timings,
+        'total_ms': round(sum(timing['ms'] for timing in timings), 2),
+    }
+
+
+def format_report(report):
+    """把检查结果格式化为便于阅读的文本"""
+    lines = [
+        f"文件: {report['file']} ({report['file_bytes'] / 1024 / 1024:.1f} MB，引擎 {report['engine']})",
+        f"子表名称: {report['sheet_names']}",
+    ]
+    for info in report['sheets']:
+        lines.append('-' * 50)
+        lines.append(f"子表: {info['name']}")
+        rows = info['rows'] if info['rows'] is not None else '未知'
+        lines.append(f"数据行数: {rows}")
+        lines.append(f"数据列数: {info['columns']}")
+        lines.append(f"表头: {', '.join(info['headers'])}")
+        if 'estimated_bytes' in info:
+            lines.append(f"估算内存: {info['estimated_bytes'] / 1024 / 1024:.1f} MB（按 {info['sample_rows']} 行样本）")
+        if 'dtypes' in info:
+            lines.append('列类型: ' + ', '.join(f"{column}={dtype}" for column, dtype in info['dtypes'].items()))
+        if 'unique_keys' in info:
+            lines.append(
+                f"人员列 {info['key_column']}: {info['unique_keys']} 个不同人员，"
+                f"{info['duplicate_key_rows']} 行重复"
+            )
+        elif 'sample_unique_keys' in info:
+            lines.append(f"人员列 {info['key_column']}: 样本中 {info['sample_unique_keys']} 个不同人员")
+    if report['key_match']:
+        lines.append('-' * 50)
+        lines.append(f"人员匹配（以 {report['sheet_names'][0]} 为准）:")
+        for match in report['key_match']:
+            ratio = f"{match['ratio']:.1%}" if match['ratio'] is not None else '-'
+            lines.append(
+                f"  {match['sheet']}: 匹配 {match['matched']} ({ratio})，"
+                f"缺少 {match['missing']}，多出 {match['extra']}"
+            )
+    lines.append('-' * 50)
+    lines.append('耗时:')
+    for timing in report['timings']:
+        lines.append(f"  {timing['step']}: {timing['ms']:.1f} ms")
+    lines.append(f"  合计: {report['total_ms']:.1f} ms")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="快速检查Excel或CSV工作簿")
+    parser.add_argument('path', nargs='?', default='sample_data.xlsx', help="Excel或CSV文件路径")
+    parser.add_argument('--sample-rows', type=int, default=0, help="每个子表读取的样本行数，用于估算内存和列类型")
+    parser.add_argument('--keys', action='store_true', help="完整读取第一列，统计人员数量和跨子表匹配情况")
+    parser.add_argument('--engine', default=None, help="Excel解析引擎，默认自动选择")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args(argv)
+
+    try:
+        report = profile_workbook(args.path, args.sample_rows, args.keys, args.engine)
+    except Exception as e:
+        print(f'读取文件时出错: {e}')
+        return 1
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
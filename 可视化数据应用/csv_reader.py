@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from workbook_cache import frame_nbytes
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:  # pyarrow 为可选依赖，未安装时使用pandas分块读取
+    pa = None
+    pa_csv = None
+
+# 推断列类型时读取的样本大小（字节）
+SCHEMA_SAMPLE_BYTES = 1024 * 1024
+# pyarrow 每次读取的数据块大小（字节）
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+# pandas 每次读取的行数
+CSV_CHUNK_ROWS = 100_000
+# 与 pandas 默认一致的空值写法
+NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+
+def pick_csv_engine():
+    """选择CSV解析引擎：环境变量 CSV_ENGINE 优先，其次已安装的 pyarrow（多线程），否则使用 pandas"""
+    engine = os.environ.get('CSV_ENGINE')
+    if engine in ('pyarrow', 'pandas'):
+        return engine if engine == 'pandas' or pa_csv is not None else 'pandas'
+    return 'pyarrow' if pa_csv is not None else 'pandas'
+
+
+def _last_record_end(sample):
+    """样本中最后一个完整记录的结束位置（换行符之后）
+
+    引号中的字段可以包含换行符，只有之前的引号个数为偶数（不在引号中）的换行符才是记录的边界；
+    转义的引号（""）成对出现，不影响奇偶。找不到时返回0。
+    """
+    quotes = sample.count(b'"')
+    end = len(sample)
+    while True:
+        newline = sample.rfind(b'\n', 0, end)
+        if newline < 0:
+            return 0
+        quotes -= sample.count(b'"', newline, end)
+        if quotes % 2 == 0:
+            return newline + 1
+        end = newline
+
+
+def infer_csv_schema(data, sample_bytes=SCHEMA_SAMPLE_BYTES):
+    """
+    用文件开头的样本推断每列的类型
+
+    Returns:
+        (样本DataFrame的列类型, 平均每行字节数)
+    """
+    sample = data[:sample_bytes]
+    if len(data) > sample_bytes:
+        sample = sample[:_last_record_end(sample)] or sample
+    sample_df = pd.read_csv(io.BytesIO(sample))
+    row_bytes = len(sample) / max(len(sample_df), 1)
+    return sample_df.dtypes, row_bytes
+
+
+def _arrow_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(dtype):
+        return pa.float64()
+    return pa.string()
+
+
+def _iter_arrow_chunks(data, dtypes, block_bytes):
+    # 按位置命名各列并跳过表头，再换成 pandas 的列名（pandas 会给重复或空的列名改名）
+    column_names = [f'column_{position}' for position in range(len(dtypes))]
+    column_types = {name: _arrow_type(dtype) for name, dtype in zip(column_names, dtypes)}
+    reader = pa_csv.open_csv(
+        pa.BufferReader(data),
+        read_options=pa_csv.ReadOptions(
+            use_threads=True, block_size=block_bytes, column_names=column_names, skip_rows=1
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        chunk = batch.to_pandas()
+        chunk.columns = dtypes.index
+        yield chunk
+
+
+def _iter_pandas_chunks(data, dtypes, chunk_rows):
+    # 整数列可能在后面的行中出现空值，只固定浮点列和文本列的类型
+    fixed_dtypes = {}
+    for name, dtype in dtypes.items():
+        if pd.api.types.is_float_dtype(dtype):
+            fixed_dtypes[name] = 'float64'
+        elif not pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            fixed_dtypes[name] = dtype
+    integer_columns = [name for name, dtype in dtypes.items() if pd.api.types.is_integer_dtype(dtype)]
+    for chunk in pd.read_csv(io.BytesIO(data), dtype=fixed_dtypes, chunksize=chunk_rows):
+        # 样本中的整数列在后面的块中出现文本时，合并后会成为数值和文本混合的列，交给调用方整体重新读取
+        for name in integer_columns:
+            if not pd.api.types.is_numeric_dtype(chunk[name].dtype):
+                raise ValueError(f"列 {name} 的类型与样本不一致")
+        yield chunk
+
+
+def empty_frame(dtypes):
+    """只有表头的CSV对应的空表：保留表头中的列名和推断出的类型"""
+    df = pd.DataFrame({position: pd.Series(dtype=dtype) for position, dtype in enumerate(dtypes)})
+    df.columns = dtypes.index
+    return df
+
+
+def concat_chunks(chunks, dtypes=None):
+    """合并分块读取的结果，各块都是分类类型的列合并后仍为分类类型
+
+    没有任何数据块时，提供了 dtypes 则返回带有这些列的空表，否则返回没有列的空表。
+    """
+    if not chunks:
+        return empty_frame(dtypes) if dtypes is not None else pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    columns = {}
+    for position in range(len(chunks[0].columns)):
+        parts = [chunk.iloc[:, position] for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[position] = pd.Series(union_categoricals(parts))
+        else:
+            columns[position] = pd.concat(parts, ignore_index=True)
+    df = pd.concat(columns, axis=1)
+    df.columns = chunks[0].columns
+    return df
+
+
+def read_csv_chunked(data, engine=None, transform=None, progress=None, stats=None,
+                     block_bytes=CSV_BLOCK_BYTES, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    分块读取CSV文件内容
+
+    先用样本推断列类型，再按固定大小分块解析并指定类型，每块可经 transform 处理
+    （如压缩内存）后再合并，避免整个文件先以推断出的宽类型完整读入内存。
+    各块独立处理的结果类型可能不同（例如某列在一块中转换为分类类型，在另一块中没有），
+    因此有多块时合并后再对整个表调用一次 transform，使每列的类型由全部数据决定。
+    pyarrow 读取时使用多线程；后面的行与样本类型不一致时退回 pandas 读取。
+    样本无法解析或指定的类型与数据不符时，按 pandas 默认方式一次读取整个文件，结果与 pd.read_csv 相同。
+    注意合并时所有块和合并结果同时存在，未开启压缩时内存峰值约为最终结果的两倍。
+
+    Args:
+        data: 文件内容（bytes）
+        engine: 'pyarrow' 或 'pandas'，默认自动选择
+        transform: 每块读取后调用 transform(DataFrame)，返回处理后的块
+        progress: 每读取一块调用 progress(已读取的比例)
+        stats: 提供字典时写入 stats['raw_bytes']：各块经 transform 处理前的内存占用之和（只统计最终采用的读取方式）
+        block_bytes: pyarrow 每块的字节数
+        chunk_rows: pandas 每块的行数
+
+    Returns:
+        DataFrame
+    """
+    def read_whole():
+        # 不分块读取，每列的类型由整列数据决定
+        df = pd.read_csv(io.BytesIO(data))
+        if stats is not None:
+            stats['raw_bytes'] = frame_nbytes(df)
+        if transform is not None:
+            df = transform(df)
+        if progress is not None:
+            progress(1.0)
+        return df
+
+    engine = engine or pick_csv_engine()
+    try:
+        dtypes, row_bytes = infer_csv_schema(data)
+    except ValueError:
+        # 样本无法解析（如截断位置不当、编码问题），直接按默认方式读取，由 pandas 报告真正的错误
+        return read_whole()
+    estimated_rows = max(len(data) / max(row_bytes, 1), 1)
+    if pa_csv is None:
+        engine = 'pandas'
+
+    def read(chunk_iter):
+        chunks = []
+        rows = 0
+        raw_bytes = 0
+        for chunk in chunk_iter:
+            rows += len(chunk)
+            if stats is not None:
+                raw_bytes += frame_nbytes(chunk)
+            chunks.append(transform(chunk) if transform is not None else chunk)
+            if progress is not None:
+                progress(min(rows / estimated_rows, 1.0))
+        df = concat_chunks(chunks, dtypes)
+        if transform is not None and len(chunks) > 1:
+            df = transform(df)
+        if stats is not None:
+            # 没有数据块（只有表头）时为空表本身的大小
+            stats['raw_bytes'] = raw_bytes if chunks else frame_nbytes(df)
+        return df
+
+    if engine == 'pyarrow':
+        try:
+            return read(_iter_arrow_chunks(data, dtypes, block_bytes))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    try:
+        return read(_iter_pandas_chunks(data, dtypes, chunk_rows))
+    except (TypeError, ValueError):
+        # 指定的类型与数据不符时完全按 pandas 默认方式读取；分块读取时各块的类型各自推断，
+        # 同一列可能在一块中是数值、在另一块中是文本，合并后成为混合类型，因此一次读取整个文件
+        return read_whole()
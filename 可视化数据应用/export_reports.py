@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+批量导出人员报告
+
+读取一次工作簿，为第一个子表第一列中的每个人员生成与页面相同的雷达图、饼图、柱状图和折线图，
+每人输出一个HTML文件。所有报告共用输出目录中的一份 plotly.min.js。
+人员分批交给多个进程处理，每个进程只打开一次工作簿，内存占用与进程数相关而与人数无关。
+子进程通过磁盘缓存读取主进程解析好的子表；磁盘缓存未启用（未安装 pyarrow 或 WORKBOOK_DISK_CACHE_MB=0）时
+每个子进程都要重新解析整个文件，因此改为在当前进程中导出。
+
+用法示例：
+    python export_reports.py 数据.xlsx --output reports --workers 8
+"""
+
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from arrow_cache import default_sheet_cache
+from chart_layout import DEFAULT_LAYOUT, load_layout, resolve_layout
+from workbook import LazyWorkbook, compact_from_env
+from workbook_cache import content_hash
+
+PLOTLY_JS_NAME = 'plotly.min.js'
+
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: sans-serif; background: #f7fafc; color: #2d3748; margin: 2rem; }}
+.chart {{ background: #fff; border-radius: 15px; box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1); padding: 1rem 2rem; margin-bottom: 1rem; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{charts}
+</body>
+</html>
+"""
+
+# 子进程中打开的工作簿和图表配置，每个进程只初始化一次
+_worker_state = {}
+
+
+def open_workbook_file(path):
+    """读取文件并打开为按需解析的工作簿（使用磁盘缓存）"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return LazyWorkbook.open(
+        os.path.basename(path), data, file_hash=content_hash(data), disk_cache=default_sheet_cache(),
+        compact=compact_from_env()
+    )
+
+
+def build_person_figures(current_name, sheet_names, sheet_dfs, vertex_cols, invert_coordinates=True, layout=None):
+    """
+    按页面的规则和图表布局为一个人员构建所有图表
+
+    Returns:
+        [(图表标题, 图表)]，没有数据或数据全为0的图表不包含在内
+    """
+    import app
+
+    figures = []
+    if len(vertex_cols) >= 2 and len(sheet_names) > 0:
+        _, radar_values = app.person_metrics(sheet_dfs, sheet_names[0], current_name, vertex_cols)
+        if radar_values is not None:
+            original_values = radar_values.tolist()
+            if sum(original_values) != 0:
+                figures.append((
+                    f"📊 雷达图 - {sheet_names[0]}",
+                    app.build_radar_figure(vertex_cols, original_values, current_name, invert_coordinates)
+                ))
+
+    for section in resolve_layout(layout or DEFAULT_LAYOUT, sheet_names):
+        for chart in section['charts']:
+            sheet_name = chart['sheet_name']
+            if sheet_name is None or len(sheet_dfs[sheet_name].columns) == 0:
+                continue
+            numeric_cols, values = app.person_metrics(sheet_dfs, sheet_name, current_name)
+            if values is None or not numeric_cols:
+                continue
+            chart_data = app.chart_data_from_metrics(numeric_cols, values)
+            if chart_data["数值"].sum() == 0:
+                continue
+            color_sequence = getattr(app.px.colors.sequential, chart['colors'], app.px.colors.sequential.Viridis)
+            figures.append((
+                f"{chart['label']} - {sheet_name}" if chart['title'] else chart['label'],
+                app.CHART_BUILDERS[chart['type']](chart_data, color_sequence, None)
+            ))
+    return figures
+
+
+def report_file_name(current_name):
+    """把人员姓名转换为安全的文件名"""
+    safe_name = re.sub(r'[\\/:*?"<>|\s]+', '_', str(current_name)).strip('_')
+    return f"{safe_name or 'report'}.html"
+
+
+def unique_report_file_names(names):
+    """
+    为每个人员分配不重复的文件名
+
+    不同姓名转换后可能得到相同的文件名（如 "a b" 和 "a_b"），之后出现的加数字后缀（a_b_2.html），
+    避免后写出的报告覆盖前一份。按不区分大小写比较，兼容 Windows 和 macOS 的文件系统。
+    """
+    used = set()
+    file_names = []
+    for name in names:
+        file_name = report_file_name(name)
+        stem = file_name[:-len('.html')]
+        suffix = 2
+        while file_name.lower() in used:
+            file_name = f"{stem}_{suffix}.html"
+            suffix += 1
+        used.add(file_name.lower())
+        file_names.append(file_name)
+    return file_names
+
+
+def match_names(requested, keys):
+    """把命令行传入的姓名（字符串）对应到第一列中的实际取值，数字姓名也能匹配；找不到时保留原值"""
+    by_text = {}
+    for key in keys:
+        by_text.setdefault(str(key), key)
+    return [by_text.get(str(name), name) for name in requested]
+
+
+def write_report(output_dir, current_name, figures, file_name=None):
+    """写出一个人员的HTML报告，返回文件路径；file_name 默认由姓名生成"""
+    charts = []
+    for title, fig in figures:
+        charts.append(
+            f'<div class="chart"><h4>{html.escape(title)}</h4>'
+            f'{fig.to_html(full_html=False, include_plotlyjs=False, validate=False)}</div>'
+        )
+    if not charts:
+        charts.append('<div class="chart"><h2 style="color: #e53e3e;">数据为0</h2></div>')
+    path = os.path.join(output_dir, file_name or report_file_name(current_name))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(REPORT_TEMPLATE.format(
+            title=html.escape(str(current_name)),
+            plotly_js=PLOTLY_JS_NAME,
+            charts='\n'.join(charts)
+        ))
+    return path
+
+
+def quiet_streamlit_logging():
+    """屏蔽不在 streamlit run 下运行时的警告（如 missing ScriptRunContext）
+
+    Streamlit 的日志器各自设置级别且不向上传递，第一次读取配置时还会按 logger.level 重设级别，
+    所以先读取配置，再设置全局级别。
+    """
+    import streamlit.config
+    import streamlit.logger
+    streamlit.config.get_option('logger.level')
+    streamlit.logger.set_log_level('error')
+
+
+def _init_export_worker(path, output_dir, invert_coordinates, workbook=None):
+    # 子进程中不会运行 streamlit，屏蔽导入 app 时的警告
+    quiet_streamlit_logging()
+    if workbook is None:
+        workbook = open_workbook_file(path)
+    vertex_cols = list(workbook.metric_matrix(workbook.sheet_names[0]).columns)
+    _worker_state.update(
+        workbook=workbook,
+        output_dir=output_dir,
+        vertex_cols=vertex_cols,
+        invert_coordinates=invert_coordinates,
+        # 与页面使用同一份布局配置（环境变量 CHART_LAYOUT 或 chart_layout.json）
+        layout=load_layout(),
+    )
+
+
+def _export_person(task):
+    current_name, file_name = task
+    workbook = _worker_state['workbook']
+    figures = build_person_figures(
+        current_name,
+        workbook.sheet_names,
+        workbook,
+        _worker_state['vertex_cols'],
+        _worker_state['invert_coordinates'],
+        _worker_state['layout'],
+    )
+    return write_report(_worker_state['output_dir'], current_name, figures, file_name)
+
+
+def export_reports(path, output_dir, workers=None, names=None, invert_coordinates=True, progress=None,
+                   notice=None):
+    """
+    为每个人员导出HTML报告
+
+    Args:
+        path: 工作簿文件路径
+        output_dir: 输出目录
+        workers: 进程数，默认为CPU核数；为1时在当前进程中导出
+        names: 只导出这些人员，默认导出第一个子表第一列中的所有人员
+        invert_coordinates: 雷达图是否反转坐标
+        progress: 每导出一个人员时调用 progress(已完成数, 总数)
+        notice: 需要提示用户时调用 notice(消息)，如磁盘缓存未启用而改为在当前进程中导出
+
+    Returns:
+        生成的报告文件路径列表
+    """
+    import plotly.offline
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, PLOTLY_JS_NAME), 'w', encoding='utf-8') as f:
+        f.write(plotly.offline.get_plotlyjs())
+
+    # 主进程先解析所有子表并写入磁盘缓存，子进程随后直接映射读取，不必各自解析原文件
+    workbook = open_workbook_file(path)
+    workbook.load_all()
+    first_df = workbook[workbook.sheet_names[0]]
+    keys = first_df.iloc[:, 0].dropna().unique().tolist() if len(first_df.columns) > 0 else []
+    names = keys if names is None else match_names(names, keys)
+    del first_df
+    # 文件名在主进程中统一分配，并行导出时也不会互相覆盖
+    tasks = list(zip(names, unique_report_file_names(names)))
+
+    workers = workers or os.cpu_count() or 1
+    total = len(names)
+    if workers > 1 and total >= 2 and not default_sheet_cache().enabled:
+        # 子进程无法读取主进程解析的结果，各自重新解析整个文件比在当前进程中导出更慢
+        if notice is not None:
+            notice("磁盘缓存未启用（未安装 pyarrow 或 WORKBOOK_DISK_CACHE_MB=0），改为在当前进程中导出")
+        workers = 1
+    paths = []
+    if workers <= 1 or total < 2:
+        # 直接使用已解析的工作簿
+        _init_export_worker(path, output_dir, invert_coordinates, workbook)
+        results = map(_export_person, tasks)
+        for done, report_path in enumerate(results, start=1):
+            paths.append(report_path)
+            if progress is not None:
+                progress(done, total)
+        return paths
+
+    del workbook
+    chunksize = max(1, min(64, total // (workers * 4)))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_export_worker,
+        initargs=(path, output_dir, invert_coordinates),
+    ) as executor:
+        for done, report_path in enumerate(executor.map(_export_person, tasks, chunksize=chunksize), start=1):
+            paths.append(report_path)
+            if progress is not None:
+                progress(done, total)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量导出人员HTML报告")
+    parser.add_argument('path', help="Excel或CSV文件路径")
+    parser.add_argument('--output', default='reports', help="输出目录")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument('--names', nargs='+', default=None, help="只导出指定人员")
+    parser.add_argument('--no-invert', action='store_true', help="雷达图不反转坐标（中心为0）")
+    args = parser.parse_args(argv)
+
+    quiet_streamlit_logging()
+    start = time.perf_counter()
+
+    def progress(done, total):
+        if done == total or done % 50 == 0:
+            print(f"已导出 {done}/{total}", file=sys.stderr)
+
+    paths = export_reports(
+        args.path,
+        args.output,
+        workers=args.workers,
+        names=args.names,
+        invert_coordinates=not args.no_invert,
+        progress=progress,
+        notice=lambda message: print(message, file=sys.stderr),
+    )
+    print(f"共导出 {len(paths)} 份报告到 {args.output}，耗时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+
+def matrix_dtype(dtypes):
+    """能无损容纳所有数值列的最小公共类型
+
+    压缩后的子表（uint8、int16、float32 等列）不必放大为 float64；
+    有可空整数等扩展类型时使用 float64，空值转换为 NaN。
+    """
+    dtypes = list(dtypes)
+    if not dtypes or not all(isinstance(dtype, np.dtype) for dtype in dtypes):
+        return np.dtype(np.float64)
+    dtype = np.result_type(*dtypes)
+    if dtype.kind == 'f' and dtype.itemsize < 4:
+        return np.dtype(np.float32)
+    return dtype
+
+
+class MetricMatrix:
+    """一个子表所有数值列组成的连续矩阵
+
+    第一次使用时把数值列转换为按行连续存储的矩阵，类型为各列的公共类型（见 matrix_dtype），
+    图表、评价数据和人群统计都直接使用这一份矩阵，不必各自筛选数值列。
+    取出的指标统一为 float64：矩阵本身是 float64 时取一行只是视图，否则只复制取出的部分。
+    """
+
+    def __init__(self, df):
+        numeric = df.select_dtypes(include=[np.number])
+        self.columns = numeric.columns.tolist()
+        dtype = matrix_dtype(numeric.dtypes)
+        if dtype.kind == 'f':
+            values = numeric.to_numpy(dtype=dtype, na_value=np.nan)
+        else:
+            values = numeric.to_numpy(dtype=dtype)
+        self.values = np.ascontiguousarray(values)
+        self._positions = {column: position for position, column in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def column_positions(self, columns):
+        """列名对应的列位置"""
+        return [self._positions[column] for column in columns]
+
+    def row(self, position, columns=None):
+        """
+        某一行的指标
+
+        columns 为空且矩阵为 float64 时返回整行的视图（不复制）；指定列时按列顺序返回新数组。
+        """
+        if columns is None:
+            return _as_float64(self.values[position])
+        return _as_float64(self.values[position, self.column_positions(columns)])
+
+    def rows(self, positions, columns=None):
+        """多行的指标，形状为 (行数, 列数)"""
+        values = self.values[positions]
+        if columns is not None:
+            values = values[:, self.column_positions(columns)]
+        return _as_float64(values)
+
+    def nbytes(self):
+        return self.values.nbytes
+
+
+def _as_float64(values):
+    return values if values.dtype == np.float64 else values.astype(np.float64)
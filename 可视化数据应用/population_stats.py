@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from metric_matrix import MetricMatrix
+
+
+class PopulationStats:
+    """一个子表所有数值列的人群统计
+
+    构建时一次性向量化计算每列的分位数、均值和标准差，以及每一行在每列中的
+    百分位、排名和Z分数，之后查询某一行的统计只是数组取值。
+    统计按行进行，同一人员有多行时每行都计入人群。
+    """
+
+    # 预先计算的分位数，图表使用其中的中位数和四分位区间
+    QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+    def __init__(self, df=None, matrix=None):
+        """由子表数据或已提取的数值矩阵（MetricMatrix）构建，提供矩阵时不再重新提取数值列"""
+        if matrix is None:
+            matrix = MetricMatrix(df)
+        self.columns = list(matrix.columns)
+        self._positions = {column: position for position, column in enumerate(self.columns)}
+        values = matrix.values
+        numeric = pd.DataFrame(values, columns=pd.RangeIndex(len(self.columns)), copy=False)
+        self.rows = len(values)
+
+        with warnings.catch_warnings():
+            # 全为空值的列统计结果为NaN，不需要警告
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.count = np.sum(~np.isnan(values), axis=0)
+            # 压缩后的矩阵可能是整数或 float32，均值和标准差按 float64 累加
+            self.mean = np.nanmean(values, axis=0, dtype=np.float64)
+            self.std = np.nanstd(values, axis=0, dtype=np.float64)
+            if self.rows:
+                self.quantiles = np.nanquantile(values, self.QUANTILES, axis=0)
+            else:
+                self.quantiles = np.full((len(self.QUANTILES), len(self.columns)), np.nan)
+
+        # 百分位：不大于该值的比例（并列取平均）；排名：数值从大到小，并列取最小名次
+        self.percentile = (numeric.rank(pct=True, method='average').to_numpy(dtype=np.float32, na_value=np.nan)
+                           * np.float32(100))
+        self.rank = numeric.rank(ascending=False, method='min').to_numpy(dtype=np.float32, na_value=np.nan)
+        std = np.where(self.std > 0, self.std, np.nan)
+        self.zscore = np.nan_to_num((values - self.mean) / std, nan=0.0).astype(np.float32)
+
+    def _column_positions(self, columns):
+        return [self._positions[column] for column in columns]
+
+    def quantile(self, q, columns=None):
+        """列的分位数，q 必须是 QUANTILES 中的值"""
+        columns = self.columns if columns is None else list(columns)
+        row = self.quantiles[self.QUANTILES.index(q)]
+        return row[self._column_positions(columns)]
+
+    def band(self, columns=None, low=0.25, high=0.75):
+        """列的分位区间：(下限, 中位数, 上限)"""
+        return self.quantile(low, columns), self.quantile(0.5, columns), self.quantile(high, columns)
+
+    def row_stats(self, position, columns=None):
+        """
+        某一行在各列中的统计
+
+        Args:
+            position: 行位置
+            columns: 只返回这些列，默认所有数值列
+
+        Returns:
+            以列名为索引的DataFrame，包含百分位、排名、Z分数和人数
+        """
+        columns = self.columns if columns is None else list(columns)
+        positions = self._column_positions(columns)
+        return pd.DataFrame({
+            '百分位': self.percentile[position, positions],
+            '排名': self.rank[position, positions],
+            'Z分数': self.zscore[position, positions],
+            '人数': self.count[positions],
+        }, index=columns)
+
+    def nbytes(self):
+        return self.percentile.nbytes + self.rank.nbytes + self.zscore.nbytes + self.quantiles.nbytes
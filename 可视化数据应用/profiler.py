@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+
+def approx_payload_bytes(obj):
+    """估算发送到浏览器的数据大小（图表按JSON长度，表格按内存占用）"""
+    try:
+        if hasattr(obj, 'to_json') and hasattr(obj, 'data') and hasattr(obj, 'layout'):
+            # plotly 图表
+            return len(obj.to_json())
+        if isinstance(obj, pd.DataFrame):
+            return int(obj.memory_usage(index=True, deep=True).sum())
+        if isinstance(obj, str):
+            return len(obj.encode('utf-8'))
+    except Exception:
+        pass
+    return 0
+
+
+class Profiler:
+    """记录页面各阶段耗时、数据行数和发送数据量
+
+    未启用时所有方法都是空操作，对页面几乎没有额外开销。
+    启用并配置了 log_path 时，每个阶段的记录会追加写入JSONL文件，便于离线分析。
+    """
+
+    def __init__(self, enabled=False, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.records = []
+        self.run_id = None
+        self._active = []
+        self._lock = threading.Lock()
+
+    def start_run(self):
+        """开始新的一次页面运行，清空上一次的记录"""
+        self.run_id = uuid.uuid4().hex[:8]
+        self.records = []
+        self._active = []
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """计时一个阶段，可在with块中向返回的记录添加 rows 等字段"""
+        if not self.enabled:
+            yield {}
+            return
+        record = {'stage': name, **fields}
+        self._active.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['ms'] = round((time.perf_counter() - start) * 1000, 2)
+            self._active.remove(record)
+            self._append(record)
+
+    def add_payload(self, obj):
+        """把obj的估算大小累加到当前阶段的 payload_bytes"""
+        if not self.enabled or not self._active:
+            return
+        record = self._active[-1]
+        record['payload_bytes'] = record.get('payload_bytes', 0) + approx_payload_bytes(obj)
+
+    def _append(self, record):
+        record['run_id'] = self.run_id
+        record['time'] = datetime.now().isoformat(timespec='milliseconds')
+        with self._lock:
+            self.records.append(record)
+            if self.log_path:
+                try:
+                    with open(self.log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                except OSError:
+                    pass
+
+    def to_frame(self):
+        """以表格形式返回本次运行的记录"""
+        columns = ['stage', 'ms', 'rows', 'payload_bytes']
+        frame = pd.DataFrame(self.records)
+        for column in columns:
+            if column not in frame.columns:
+                frame[column] = None
+        return frame[columns]
+
+
+def profiling_requested(query_params=None):
+    """是否开启性能分析：环境变量 APP_PROFILE=1 或页面地址带有 ?profile=1"""
+    if os.environ.get('APP_PROFILE', '').lower() in ('1', 'true', 'yes'):
+        return True
+    if query_params is not None:
+        return str(query_params.get('profile', '')).lower() in ('1', 'true', 'yes')
+    return False
+
+
+def profile_log_path():
+    """性能记录的JSONL文件路径（环境变量 APP_PROFILE_LOG），未配置时不写文件"""
+    return os.environ.get('APP_PROFILE_LOG') or None
@@ -1,33 +1,351 @@
 # -*- coding: utf-8 -*-
 
-from openai import OpenAI
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from openai import (
+    APIConnectionError, APIStatusError, APITimeoutError, AuthenticationError, BadRequestError, NotFoundError,
+    OpenAI, PermissionDeniedError, RateLimitError, Timeout, UnprocessableEntityError
+)
+
+# 默认超时和重试配置（秒），可通过环境变量 QWEN_CONNECT_TIMEOUT / QWEN_READ_TIMEOUT /
+# QWEN_MAX_RETRIES / QWEN_RETRY_BACKOFF / QWEN_DEADLINE_SECONDS 调整
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 8.0
+DEFAULT_DEADLINE_SECONDS = 60.0
+
+
+class GenerationError(Exception):
+    """生成失败的基类
+
+    retryable 表示重试可能成功；status_code 为服务端返回的HTTP状态码（没有时为 None）。
+    """
+
+    retryable = False
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AuthError(GenerationError):
+    """API Key 未配置、无效或没有权限（401/403）"""
+
+
+class EndpointNotFoundError(GenerationError):
+    """API 地址或模型不存在（404）"""
+
+
+class InvalidRequestError(GenerationError):
+    """请求参数不被接受（400/422）"""
+
+
+class RateLimitedError(GenerationError):
+    """请求过于频繁（429），retry_after 为服务端建议的等待秒数"""
+
+    retryable = True
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+
+class ServerError(GenerationError):
+    """服务端暂时出错（5xx、408、409）"""
+
+    retryable = True
+
+
+class NetworkError(GenerationError):
+    """无法连接到服务端"""
+
+    retryable = True
+
+
+class RequestTimeoutError(NetworkError):
+    """连接或读取超时"""
+
+
+class DeadlineExceededError(GenerationError):
+    """超过了整个调用（包括重试）的时间上限"""
+
+
+class GenerationCancelled(GenerationError):
+    """调用方取消了生成"""
+
+
+def _retry_after_seconds(response):
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def classify_error(error):
+    """把 OpenAI SDK 抛出的异常转换为对应的 GenerationError"""
+    if isinstance(error, GenerationError):
+        return error
+    message = str(error)
+    if isinstance(error, APITimeoutError):
+        return RequestTimeoutError(message)
+    if isinstance(error, APIConnectionError):
+        return NetworkError(message)
+    if isinstance(error, APIStatusError):
+        status_code = error.status_code
+        if isinstance(error, (AuthenticationError, PermissionDeniedError)):
+            return AuthError(message, status_code)
+        if isinstance(error, NotFoundError):
+            return EndpointNotFoundError(message, status_code)
+        if isinstance(error, (BadRequestError, UnprocessableEntityError)):
+            return InvalidRequestError(message, status_code)
+        if isinstance(error, RateLimitError):
+            return RateLimitedError(message, status_code, _retry_after_seconds(error.response))
+        if status_code >= 500 or status_code in (408, 409):
+            return ServerError(message, status_code)
+        return GenerationError(message, status_code)
+    return GenerationError(message)
+
+
+def _wait_cancelled(seconds, cancel_event=None):
+    """等待 seconds 秒，cancel_event 被设置时立即返回；返回是否已被取消"""
+    if cancel_event is None:
+        time.sleep(seconds)
+        return False
+    return cancel_event.wait(seconds)
+
+
+def _float_env(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class RetryPolicy:
+    """超时和重试策略
+
+    只重试可重试的错误（网络错误、超时、429、5xx），第 n 次重试前等待
+    0 到 min(max_backoff, backoff * 2**n) 之间的随机时间（full jitter），避免并发请求同时重试；
+    429 带有 Retry-After 时至少等待该时间（不超过 max_backoff）。
+    deadline 是整个调用（所有尝试和等待）的时间上限，每次请求的超时也会缩短到剩余时间以内，
+    因此调用方最多被阻塞 deadline 秒。
+    """
+
+    def __init__(self, max_retries=None, backoff=None, max_backoff=None, deadline=None,
+                 connect_timeout=None, read_timeout=None):
+        if max_retries is None:
+            max_retries = int(_float_env('QWEN_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+        self.max_retries = max(int(max_retries), 0)
+        self.backoff = _float_env('QWEN_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF) if backoff is None else backoff
+        self.max_backoff = DEFAULT_MAX_BACKOFF if max_backoff is None else max_backoff
+        self.deadline = _float_env('QWEN_DEADLINE_SECONDS', DEFAULT_DEADLINE_SECONDS) if deadline is None else deadline
+        self.connect_timeout = (_float_env('QWEN_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)
+                                if connect_timeout is None else connect_timeout)
+        self.read_timeout = _float_env('QWEN_READ_TIMEOUT', DEFAULT_READ_TIMEOUT) if read_timeout is None else read_timeout
+
+    def delay(self, attempt, error=None):
+        """第 attempt 次失败（从0开始）后重试前的等待秒数"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    def timeout(self, remaining=None):
+        """单次请求的超时，不超过剩余时间"""
+        read_timeout, connect_timeout = self.read_timeout, self.connect_timeout
+        if remaining is not None:
+            read_timeout = min(read_timeout, remaining)
+            connect_timeout = min(connect_timeout, remaining)
+        return Timeout(read_timeout, connect=connect_timeout)
+
 
 class QwenClient:
-    def __init__(self, api_key, base_url, model):
+    def __init__(self, api_key, base_url, model, retry=None):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
+        self.retry = retry or RetryPolicy()
+        # 重试由 RetryPolicy 控制，关闭 SDK 自带的重试，避免两层重试叠加超过时间上限
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url=self.base_url
+            base_url=self.base_url,
+            timeout=self.retry.timeout(),
+            max_retries=0
         )
     
-    def generate(self, messages, temperature=0.7, max_tokens=2000):
-        """生成文本"""
+    def close(self):
+        """关闭HTTP连接池"""
+        self.client.close()
+
+    def complete(self, messages, temperature=0.7, max_tokens=2000, timeout=None):
+        """生成文本（只请求一次，不重试），出错时抛出 SDK 的异常"""
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout or self.retry.timeout()
+        )
+        return completion.choices[0].message.content
+
+    def _with_retry(self, call, retry, deadline=None, cancel_event=None, before_attempt=None):
+        """
+        按重试策略调用 call(timeout)
+
+        Args:
+            call: 发出一次请求的函数，参数为本次请求的超时
+            retry: RetryPolicy
+            deadline: time.monotonic() 形式的截止时间；为 None 时从第一次 before_attempt 结束后开始计算，
+                排队等待限速的时间不计入第一次请求的时间上限
+            cancel_event: threading.Event，被设置后不再发出新请求，并立即结束重试前的等待
+            before_attempt: 每次请求前调用（例如限速等待）
+
+        Raises:
+            GenerationError: 不可重试的错误、重试次数用完、超过时间上限或被取消
+        """
+        for attempt in range(retry.max_retries + 1):
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled("生成已取消")
+            if before_attempt is not None:
+                before_attempt()
+            if deadline is None:
+                deadline = time.monotonic() + retry.deadline
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"超过时间上限 {retry.deadline:g} 秒")
+            try:
+                return call(retry.timeout(remaining))
+            except Exception as e:
+                error = classify_error(e)
+                cause = e
+            if not error.retryable or attempt == retry.max_retries:
+                raise error from cause
+            delay = retry.delay(attempt, error)
+            if time.monotonic() + delay >= deadline:
+                raise DeadlineExceededError(f"超过时间上限 {retry.deadline:g} 秒（最后一次错误: {error}）") from cause
+            if _wait_cancelled(delay, cancel_event):
+                raise GenerationCancelled("生成已取消") from cause
+
+    def generate(self, messages, temperature=0.7, max_tokens=2000, retry=None, cancel_event=None,
+                 before_attempt=None):
+        """
+        生成文本，按重试策略重试可重试的错误
+
+        Args:
+            retry: RetryPolicy，默认使用客户端的策略
+            cancel_event: threading.Event，被设置后放弃生成
+            before_attempt: 每次请求前调用的函数（例如限速等待）
+
+        Raises:
+            GenerationError: 生成失败，子类表示失败原因
+        """
+        retry = retry or self.retry
+        return self._with_retry(
+            lambda timeout: self.complete(messages, temperature=temperature, max_tokens=max_tokens, timeout=timeout),
+            retry,
+            cancel_event=cancel_event,
+            before_attempt=before_attempt
+        )
+
+    def complete_stream(self, messages, temperature=0.7, max_tokens=2000):
+        """流式生成文本（只请求一次，不重试），逐段返回新生成的内容，出错时抛出 SDK 的异常"""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
         try:
-            completion = self.client.chat.completions.create(
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # 调用方提前停止读取时关闭连接
+            stream.close()
+
+    def generate_stream(self, messages, temperature=0.7, max_tokens=2000, retry=None, cancel_event=None):
+        """
+        流式生成文本，逐段返回新生成的内容
+
+        建立连接阶段的可重试错误按重试策略重试；开始返回内容后出错不再重试（已输出的内容无法撤回）。
+        每段内容之间检查取消和时间上限，调用方提前停止读取时关闭连接。
+
+        Raises:
+            GenerationError: 生成失败，子类表示失败原因
+        """
+        retry = retry or self.retry
+        deadline = time.monotonic() + retry.deadline
+        stream = self._with_retry(
+            lambda timeout: self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
-                max_tokens=max_tokens
-            )
-            return completion.choices[0].message.content
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=timeout
+            ),
+            retry,
+            deadline,
+            cancel_event
+        )
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled("生成已取消")
+                if time.monotonic() > deadline:
+                    raise DeadlineExceededError(f"超过时间上限 {retry.deadline:g} 秒")
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except GenerationError:
+            raise
         except Exception as e:
-            return f"生成失败: {str(e)}"
+            raise classify_error(e) from e
+        finally:
+            stream.close()
+
+
+# 客户端注册表最多保留的客户端数量
+MAX_CLIENTS = 16
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key, base_url, model):
+    """获取复用的客户端
+
+    按 (base_url, api_key, model) 复用同一个客户端及其HTTP连接池，
+    不同调用和不同会话之间共享连接，避免每次调用都重新建立连接。
+    """
+    key = (base_url, api_key, model)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = QwenClient(api_key=api_key, base_url=base_url, model=model)
+            _clients[key] = client
+        _clients.move_to_end(key)
+        while len(_clients) > MAX_CLIENTS:
+            # 关闭被淘汰客户端的HTTP连接池
+            _, evicted = _clients.popitem(last=False)
+            evicted.close()
+        return client
 
 
+import hashlib
 import json
-import numpy as np
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from workbook import person_metrics
+
 
 def prepare_person_data(current_name, sheet_names, sheet_dfs):
     """
@@ -44,39 +362,19 @@ def prepare_person_data(current_name, sheet_names, sheet_dfs):
     person_data = {}
     
     for sheet_name in sheet_names:
-        df = sheet_dfs[sheet_name]
-        person_row = df[df.iloc[:, 0] == current_name]
+        # 直接取子表数值矩阵中该人员的一行
+        numeric_cols, values = person_metrics(sheet_dfs, sheet_name, current_name)
         
-        if not person_row.empty:
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-            if numeric_cols:
-                person_data[sheet_name] = {}
-                for col in numeric_cols:
-                    person_data[sheet_name][col] = float(person_row.iloc[0][col])
+        if values is not None and numeric_cols:
+            person_data[sheet_name] = dict(zip(numeric_cols, values.tolist()))
     
     return json.dumps(person_data, ensure_ascii=False, indent=2)
 
 
-def generate_evaluation(person_data, person_name, api_key, base_url, model):
-    """
-    生成人员评价
-    
-    Args:
-        person_data: 人员数据JSON字符串
-        person_name: 人员姓名
-        api_key: API密钥
-        base_url: API基础URL
-        model: 模型名称
-    
-    Returns:
-        生成的评价文本
-    """
-    try:
-        # 初始化客户端
-        client = QwenClient(api_key=api_key, base_url=base_url, model=model)
-        
-        # 构建提示词
-        prompt = f"""请根据以下数据，为{person_name}生成一份专业的评价报告。
+def build_evaluation_messages(person_data, person_name):
+    """构建生成人员评价的消息列表"""
+    # 构建提示词
+    prompt = f"""请根据以下数据，为{person_name}生成一份专业的评价报告。
 
 数据如下：
 {person_data}
@@ -94,24 +392,310 @@ def generate_evaluation(person_data, person_name, api_key, base_url, model):
 - 字数控制在200字左右
 
 """
-        
+    
+    return [
+        {
+            'role': 'system',
+            'content': '你是一位专业的数据分析师，擅长根据数据生成客观、准确的人员评价。'
+        },
+        {
+            'role': 'user',
+            'content': prompt
+        }
+    ]
+
+
+def generate_evaluation(person_data, person_name, api_key, base_url, model, use_cache=True, refresh=False):
+    """
+    生成人员评价
+    
+    Args:
+        person_data: 人员数据JSON字符串
+        person_name: 人员姓名
+        api_key: API密钥
+        base_url: API基础URL
+        model: 模型名称
+        use_cache: 是否使用评价缓存，数据、提示词和模型参数都相同时直接返回上次的结果
+        refresh: 为True时忽略已有缓存重新生成，并用新结果更新缓存
+    
+    Returns:
+        生成的评价文本
+
+    Raises:
+        GenerationError: 生成失败，子类表示失败原因（其他异常也转换为 GenerationError）
+    """
+    try:
         # 调用通义千问模型
-        messages = [
-            {
-                'role': 'system',
-                'content': '你是一位专业的数据分析师，擅长根据数据生成客观、准确的人员评价。'
-            },
-            {
-                'role': 'user',
-                'content': prompt
-            }
-        ]
+        messages = build_evaluation_messages(person_data, person_name)
+        cache = default_evaluation_cache() if use_cache else None
+        cache_key = evaluation_cache_key(messages, model, 0.7, 200)
+        if cache is not None and not refresh:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # 获取复用的客户端
+        client = get_client(api_key=api_key, base_url=base_url, model=model)
     #  调用客户端的生成方法，生成文本响应     
     #  参数说明：- messages: 输入的消息列表，用于生成上下文   
     #   - temperature: 控制生成文本的随机性，值越大随机性越高，当前设为0.7      
     #   - max_tokens: 生成文本的最大长度，当前设为200个token       
-        return client.generate(messages, temperature=0.7, max_tokens=200) 
+        evaluation = client.generate(messages, temperature=0.7, max_tokens=200) 
+        if cache is not None:
+            cache.put(cache_key, evaluation)
+        return evaluation
 
-        
+    except GenerationError:
+        raise
     except Exception as e:
-        return f"生成评价时出错: {str(e)}"
+        raise GenerationError(f"生成评价时出错: {str(e)}") from e
+
+
+def stream_evaluation(person_data, person_name, api_key, base_url, model, use_cache=True, refresh=False,
+                      cancel_event=None):
+    """
+    流式生成人员评价，逐段返回生成的内容
+    
+    参数与 generate_evaluation 相同，cancel_event 被设置后放弃生成。命中缓存时一次性返回缓存的评价；
+    完整生成成功后写入缓存。
+
+    Raises:
+        GenerationError: 生成失败（可能已经返回了部分内容），子类表示失败原因
+    """
+    messages = build_evaluation_messages(person_data, person_name)
+    cache = default_evaluation_cache() if use_cache else None
+    cache_key = evaluation_cache_key(messages, model, 0.7, 200)
+    if cache is not None and not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    parts = []
+    client = get_client(api_key=api_key, base_url=base_url, model=model)
+    for part in client.generate_stream(messages, temperature=0.7, max_tokens=200, cancel_event=cancel_event):
+        parts.append(part)
+        yield part
+    if cache is not None:
+        cache.put(cache_key, ''.join(parts))
+
+
+# 默认缓存配置，可通过环境变量 QWEN_CACHE_PATH / QWEN_CACHE_TTL_HOURS / QWEN_CACHE_MB 调整
+DEFAULT_EVALUATION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.qwen_cache.sqlite3')
+DEFAULT_EVALUATION_CACHE_TTL_HOURS = 24 * 7
+DEFAULT_EVALUATION_CACHE_MB = 50
+
+
+def evaluation_cache_key(messages, model, temperature, max_tokens):
+    """由提示词（含人员数据）、模型和生成参数计算缓存键"""
+    payload = json.dumps(
+        {'messages': messages, 'model': model, 'temperature': temperature, 'max_tokens': max_tokens},
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache:
+    """保存在本地SQLite文件中的评价结果缓存
+
+    条目超过有效期（TTL）后视为失效；总大小超过上限时按最近访问时间淘汰最久未使用的条目。
+    hits / misses 记录当前进程中的命中和未命中次数。
+    """
+
+    def __init__(self, path=None, ttl_seconds=None, max_bytes=None):
+        self.path = path or os.environ.get('QWEN_CACHE_PATH', DEFAULT_EVALUATION_CACHE_PATH)
+        if ttl_seconds is None:
+            ttl_seconds = _float_env('QWEN_CACHE_TTL_HOURS', DEFAULT_EVALUATION_CACHE_TTL_HOURS) * 3600
+        if max_bytes is None:
+            max_bytes = _float_env('QWEN_CACHE_MB', DEFAULT_EVALUATION_CACHE_MB) * 1024 * 1024
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS evaluations ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        """打开连接，正常退出时提交、出错时回滚，最后关闭连接"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """读取未过期的缓存，不存在时返回 None"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT value, created_at FROM evaluations WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute('DELETE FROM evaluations WHERE key = ?', (key,))
+                self.misses += 1
+                return None
+            conn.execute('UPDATE evaluations SET accessed_at = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        """写入缓存，并按大小上限淘汰最久未使用的条目"""
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO evaluations (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, value, size, now, now)
+            )
+            conn.execute('DELETE FROM evaluations WHERE created_at < ?', (now - self.ttl_seconds,))
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM evaluations').fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute('SELECT key, size FROM evaluations ORDER BY accessed_at').fetchall()
+                for old_key, old_size in rows:
+                    if total <= self.max_bytes or old_key == key:
+                        break
+                    conn.execute('DELETE FROM evaluations WHERE key = ?', (old_key,))
+                    total -= old_size
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM evaluations')
+
+    def stats(self):
+        """返回缓存统计：条目数、总大小、命中和未命中次数"""
+        with self._lock, self._connect() as conn:
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM evaluations').fetchone()
+        return {'entries': count, 'bytes': total, 'hits': self.hits, 'misses': self.misses}
+
+
+_evaluation_cache = None
+_evaluation_cache_lock = threading.Lock()
+
+
+def default_evaluation_cache():
+    """进程内共享的评价缓存实例"""
+    global _evaluation_cache
+    with _evaluation_cache_lock:
+        if _evaluation_cache is None:
+            _evaluation_cache = EvaluationCache()
+        return _evaluation_cache
+
+
+class RateLimiter:
+    """按每分钟请求数限速，多个线程共享"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, cancel_event=None):
+        """
+        等待直到允许发出下一个请求
+
+        Raises:
+            GenerationCancelled: 等待期间 cancel_event 被设置
+        """
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now and _wait_cancelled(start - now, cancel_event):
+            raise GenerationCancelled("生成已取消")
+
+
+def _evaluate_with_retry(client, person_data, person_name, rate_limiter, retry, cache, refresh, cancel_event):
+    messages = build_evaluation_messages(person_data, person_name)
+    cache_key = evaluation_cache_key(messages, client.model, 0.7, 200)
+    if cache is not None and not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    # 每次请求（包括重试）前都按限速等待，取消后立即结束等待；失败时抛出 GenerationError
+    evaluation = client.generate(
+        messages, temperature=0.7, max_tokens=200, retry=retry, cancel_event=cancel_event,
+        before_attempt=lambda: rate_limiter.wait(cancel_event)
+    )
+    if cache is not None:
+        cache.put(cache_key, evaluation)
+    return evaluation
+
+
+def generate_evaluations_batch(person_names, sheet_names, sheet_dfs, api_key, base_url, model,
+                               concurrency=4, requests_per_minute=60, max_retries=3, backoff=1.0,
+                               progress_callback=None, use_cache=True, refresh=False, cancel_event=None):
+    """
+    批量生成人员评价
+    
+    多个请求并发发送，总耗时取决于并发数而不是所有请求耗时之和。
+    
+    Args:
+        person_names: 要评价的人员姓名列表（第一列的值）
+        sheet_names: 子表名称列表
+        sheet_dfs: 子表数据字典
+        api_key: API密钥
+        base_url: API基础URL
+        model: 模型名称
+        concurrency: 同时进行的请求数
+        requests_per_minute: 每分钟最多发出的请求数，0表示不限速
+        max_retries: 失败后的最大重试次数（API Key无效等错误不重试）
+        backoff: 第一次重试前最长等待的秒数，之后每次翻倍（实际等待时间随机抖动，见 RetryPolicy）
+        progress_callback: 每完成一个人员时调用 progress_callback(已完成数, 总数, 人员姓名)，
+            在调用本函数的线程中执行
+        use_cache: 是否使用评价缓存，已缓存的人员不再发出请求
+        refresh: 为True时忽略已有缓存重新生成
+        cancel_event: threading.Event，被设置后不再发出新请求
+    
+    Returns:
+        (evaluations, failures)：evaluations 为 {人员姓名: 评价文本}，只包含成功的人员；
+        failures 为 {人员姓名: GenerationError}，子类表示失败原因（其他异常也转换为 GenerationError）
+
+    progress_callback 抛出异常时（例如页面重新运行或用户离开页面，Streamlit 会在下一次调用页面组件时
+    中断脚本），取消尚未开始的请求，正在等待重试的请求立即结束，然后把异常继续抛出，不等待剩余请求完成。
+    """
+    client = get_client(api_key=api_key, base_url=base_url, model=model)
+    rate_limiter = RateLimiter(requests_per_minute)
+    retry = RetryPolicy(max_retries=max_retries, backoff=backoff)
+    cache = default_evaluation_cache() if use_cache else None
+    cancel_event = cancel_event or threading.Event()
+    total = len(person_names)
+    evaluations = {}
+    failures = {}
+    executor = ThreadPoolExecutor(max_workers=max(int(concurrency), 1))
+    cancelled = False
+    try:
+        futures = {}
+        for person_name in person_names:
+            person_data = prepare_person_data(person_name, sheet_names, sheet_dfs)
+            future = executor.submit(
+                _evaluate_with_retry, client, person_data, person_name, rate_limiter, retry,
+                cache, refresh, cancel_event
+            )
+            futures[future] = person_name
+        for done, future in enumerate(as_completed(futures), start=1):
+            person_name = futures[future]
+            try:
+                evaluations[person_name] = future.result()
+            except GenerationError as e:
+                failures[person_name] = e
+            except Exception as e:
+                failures[person_name] = GenerationError(str(e))
+            if progress_callback is not None:
+                progress_callback(done, total, person_name)
+    except BaseException:
+        cancelled = True
+        cancel_event.set()
+        raise
+    finally:
+        # 被取消时不等待正在进行的请求（它们受超时和时间上限约束，会自行结束）
+        executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
+    return evaluations, failures
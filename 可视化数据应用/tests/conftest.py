@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+# 应用的模块都在上一级目录中，直接以模块名导入（与 streamlit run app.py 时相同）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
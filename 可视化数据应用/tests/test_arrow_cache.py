@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from arrow_cache import ArrowSheetCache, disk_cache_key  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ArrowSheetCache(root=str(tmp_path), max_bytes=100 * 1024 * 1024)
+
+
+def test_column_labels_round_trip(cache):
+    df = pd.DataFrame([['张三', 1, 2.5, True]], columns=['姓名', 2023, 1.5, True])
+    assert cache.save_sheet('hash', 'Sheet1', df)
+    loaded = cache.load_sheet('hash', 'Sheet1')
+    assert list(loaded.columns) == ['姓名', 2023, 1.5, True]
+    assert [type(label) for label in loaded.columns] == [str, int, float, bool]
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+
+
+def test_unsupported_labels_are_not_cached(cache):
+    df = pd.DataFrame([[1, 2]], columns=pd.MultiIndex.from_tuples([('a', 'x'), ('a', 'y')]))
+    assert not cache.save_sheet('hash', 'Sheet1', df)
+    assert cache.load_sheet('hash', 'Sheet1') is None
+
+
+def test_categorical_and_raw_bytes_round_trip(cache):
+    df = pd.DataFrame({'部门': pd.Categorical(['研发部', '市场部', '研发部']), '得分': pd.array([1, 2, 3], dtype='uint8')})
+    cache.save_sheet('hash', 'Sheet1', df, raw_bytes=12345)
+    loaded, raw_bytes = cache.load_sheet_with_raw_bytes('hash', 'Sheet1')
+    assert raw_bytes == 12345
+    assert isinstance(loaded['部门'].dtype, pd.CategoricalDtype)
+    assert loaded['得分'].dtype == 'uint8'
+    assert cache.load_sheet_with_raw_bytes('hash', 'missing') == (None, None)
+
+
+def test_manifest_round_trip(cache):
+    cache.save_manifest('hash', ['Sheet1', 'Sheet2'], {'Sheet1': (10, 3), 'Sheet2': None})
+    manifest = cache.load_manifest('hash')
+    assert manifest['sheet_names'] == ['Sheet1', 'Sheet2']
+    assert manifest['dimensions'] == {'Sheet1': (10, 3), 'Sheet2': None}
+    assert cache.load_manifest('other') is None
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ArrowSheetCache(root=str(tmp_path), max_bytes=0)
+    assert not cache.enabled
+    assert not cache.save_sheet('hash', 'Sheet1', pd.DataFrame({'a': [1]}))
+    assert cache.load_sheet('hash', 'Sheet1') is None
+
+
+def test_compacted_workbooks_use_separate_key():
+    assert disk_cache_key('abc') == 'abc'
+    assert disk_cache_key('abc', compact=True) != disk_cache_key('abc')
+
+
+def test_compacted_sheets_are_cached_compacted(cache):
+    import io
+
+    from workbook import LazyWorkbook
+    from workbook_cache import content_hash
+
+    df = pd.DataFrame({
+        '姓名': [f'人员{i}' for i in range(300)],
+        '部门': [['研发部', '市场部'][i % 2] for i in range(300)],
+        '得分': [i % 100 for i in range(300)],
+    })
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    data = buffer.getvalue()
+
+    reports = []
+    for _ in range(2):
+        workbook = LazyWorkbook.open('test.xlsx', data, file_hash=content_hash(data), disk_cache=cache, compact=True)
+        workbook.load_all()
+        reports.append(workbook.memory_report())
+    # 第二次从缓存读取：缓存中是压缩后的数据，压缩前后的大小与第一次解析时一致
+    cached = cache.load_sheet(disk_cache_key(content_hash(data), compact=True), 'Sheet1')
+    assert cached['得分'].dtype == 'uint8'
+    assert isinstance(cached['部门'].dtype, pd.CategoricalDtype)
+    assert reports[0][0] == reports[1][0]
+    assert reports[0][0] > reports[0][1]
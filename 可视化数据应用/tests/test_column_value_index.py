@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+from workbook import ColumnValueIndex
+
+
+def test_prefix_matches_come_before_substring_matches():
+    index = ColumnValueIndex(pd.Series(['Bob', 'alice', 'Albert', 'bobby', 'Carla', 'Al', 'Sal']))
+    assert index.search('al') == ['Al', 'Albert', 'alice', 'Sal']
+    assert index.search('ob') == ['Bob', 'bobby']
+
+
+def test_search_is_case_insensitive_and_limited():
+    index = ColumnValueIndex(pd.Series([f'人员{i:04d}' for i in range(1000)]))
+    assert len(index.search('人员', limit=20)) == 20
+    assert index.search('人员0999') == ['人员0999']
+    assert index.search('不存在') == []
+
+
+def test_empty_query_returns_sorted_options():
+    index = ColumnValueIndex(pd.Series(['c', 'a', 'b', 'a', None]))
+    assert index.search('') == ['a', 'b', 'c']
+    assert index.search('  ', limit=2) == ['a', 'b']
+    assert len(index) == 3
+
+
+def test_mixed_types_and_long_values():
+    long_value = 'x' * 10_000
+    index = ColumnValueIndex(pd.Series([3, 'three', long_value, 12]))
+    assert index.search('3') == [3]
+    assert index.search('1') == [12]
+    assert index.search('xxx') == [long_value]
+    # 键是变长字符串，一个很长的取值不会放大整个索引
+    assert index._keys.dtype == object
+
+
+def test_rows_returns_positions_of_value():
+    index = ColumnValueIndex(pd.Series(['a', 'b', 'a', None]))
+    assert index.rows('a').tolist() == [0, 2]
+    assert index.rows('missing').tolist() == []
+    assert np.array_equal(index.codes, [0, 1, 0, -1])
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from workbook import compact_frame
+
+
+def sample_frame(rows=1000):
+    return pd.DataFrame({
+        '姓名': [f'人员{i}' for i in range(rows)],
+        '部门': [['研发部', '市场部', '运营部'][i % 3] for i in range(rows)],
+        '得分': [i % 100 for i in range(rows)],
+        '差值': [i - 500 for i in range(rows)],
+        '大数': [2 ** 40 + i for i in range(rows)],
+        '比例': [i / 8 for i in range(rows)],
+        '精确小数': [i / 7 for i in range(rows)],
+        '整数浮点': [float(i) for i in range(rows)],
+        '有空值': [np.nan if i % 10 == 0 else float(i) for i in range(rows)],
+        '是否': [i % 2 == 0 for i in range(rows)],
+    })
+
+
+def test_round_trip_keeps_values():
+    df = sample_frame()
+    compacted = compact_frame(df)
+    assert list(compacted.columns) == list(df.columns)
+    for column in df.columns:
+        # 转换回原来的类型后与原数据完全相同
+        pd.testing.assert_series_equal(compacted[column].astype(df[column].dtype), df[column])
+    assert compacted.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+
+
+def test_chosen_dtypes():
+    compacted = compact_frame(sample_frame())
+    assert isinstance(compacted['部门'].dtype, pd.CategoricalDtype)
+    assert compacted['得分'].dtype == np.uint8
+    assert compacted['差值'].dtype == np.int16
+    assert compacted['大数'].dtype == np.uint64
+    assert compacted['比例'].dtype == np.float32
+    # 无法用 float32 精确保存的小数保留 float64
+    assert compacted['精确小数'].dtype == np.float64
+    assert compacted['整数浮点'].dtype == np.uint16
+    assert compacted['有空值'].dtype == np.float32
+    assert compacted['是否'].dtype == bool
+
+
+def test_original_frame_is_unchanged():
+    df = sample_frame()
+    before = df.dtypes.copy()
+    compact_frame(df)
+    pd.testing.assert_series_equal(df.dtypes, before)
+
+
+def test_frame_without_columns_is_returned_as_is():
+    df = pd.DataFrame(index=range(3))
+    assert compact_frame(df) is df
+
+
+@pytest.mark.parametrize('value', [2.0 ** 63, -2.0 ** 64, 1e300])
+def test_whole_floats_outside_int64_stay_float(value):
+    df = pd.DataFrame({'x': [value, 1.0]})
+    compacted = compact_frame(df)
+    assert pd.api.types.is_float_dtype(compacted['x'].dtype)
+    assert compacted['x'].tolist() == [value, 1.0]
+
+
+def test_unique_names_stay_text():
+    # 几乎不重复的姓名列转换为分类类型反而更大，保持文本
+    df = pd.DataFrame({'姓名': [f'人员{i}' for i in range(1000)], '得分': range(1000)})
+    assert not isinstance(compact_frame(df)['姓名'].dtype, pd.CategoricalDtype)
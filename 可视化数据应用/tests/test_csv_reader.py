@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+import pandas as pd
+import pytest
+
+from csv_reader import SCHEMA_SAMPLE_BYTES, concat_chunks, infer_csv_schema, pa_csv, read_csv_chunked
+from workbook import compact_frame
+
+ENGINES = ['pandas'] + (['pyarrow'] if pa_csv is not None else [])
+
+
+def to_csv_bytes(df):
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def sample_frame(rows=1000):
+    return pd.DataFrame({
+        '姓名': [f'人员{i}' for i in range(rows)],
+        '部门': [['研发部', '市场部', '运营部'][i % 3] for i in range(rows)],
+        '得分': [i % 100 for i in range(rows)],
+        '比例': [i / 7 for i in range(rows)],
+    })
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_matches_pandas_read_csv(engine):
+    data = to_csv_bytes(sample_frame(5000))
+    result = read_csv_chunked(data, engine=engine, block_bytes=16 * 1024, chunk_rows=700)
+    pd.testing.assert_frame_equal(result, pd.read_csv(io.BytesIO(data)))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_quoted_newlines_across_sample_boundary(engine):
+    # 每行的文本字段中都有换行，样本的截断位置几乎一定落在引号内
+    rows = 6000
+    df = pd.DataFrame({
+        'name': [f'p{i}' for i in range(rows)],
+        'value': range(rows),
+        'note': ['line1\n' + 'y' * 200] * rows,
+    })
+    data = to_csv_bytes(df)
+    assert len(data) > SCHEMA_SAMPLE_BYTES
+    infer_csv_schema(data)
+    result = read_csv_chunked(data, engine=engine)
+    pd.testing.assert_frame_equal(result, pd.read_csv(io.BytesIO(data)))
+
+
+def test_unparsable_sample_falls_back_to_whole_file(monkeypatch):
+    import csv_reader
+
+    def broken_schema(data, sample_bytes=SCHEMA_SAMPLE_BYTES):
+        raise pd.errors.ParserError('EOF inside string')
+
+    monkeypatch.setattr(csv_reader, 'infer_csv_schema', broken_schema)
+    data = to_csv_bytes(sample_frame(100))
+    stats = {}
+    result = read_csv_chunked(data, stats=stats)
+    pd.testing.assert_frame_equal(result, pd.read_csv(io.BytesIO(data)))
+    assert stats['raw_bytes'] > 0
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_text_after_numeric_sample_reads_like_pandas(engine):
+    # 样本中全是整数，最后一行是文本：结果应与 pd.read_csv 一致，而不是数值和文本混合的列
+    lines = ['a,b'] + [f'{i},{i}' for i in range(200_000)] + ['x,hello']
+    data = '\n'.join(lines).encode('utf-8')
+    result = read_csv_chunked(data, engine=engine, chunk_rows=50_000)
+    expected = pd.read_csv(io.BytesIO(data))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_integer_column_with_later_blanks(engine):
+    lines = ['a,b'] + [f'{i},{i}' for i in range(200_000)] + [',3']
+    data = '\n'.join(lines).encode('utf-8')
+    result = read_csv_chunked(data, engine=engine, chunk_rows=50_000)
+    pd.testing.assert_frame_equal(result, pd.read_csv(io.BytesIO(data)))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_header_only_keeps_columns(engine):
+    result = read_csv_chunked(b'a,b,c\n', engine=engine)
+    assert list(result.columns) == ['a', 'b', 'c']
+    assert len(result) == 0
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_transform_and_raw_bytes(engine):
+    data = to_csv_bytes(sample_frame(5000))
+    stats = {}
+    result = read_csv_chunked(
+        data, engine=engine, transform=compact_frame, stats=stats, block_bytes=16 * 1024, chunk_rows=700
+    )
+    expected = pd.read_csv(io.BytesIO(data))
+    assert isinstance(result['部门'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+    # 压缩前的大小与直接读取的结果相当，而不是压缩后的大小
+    assert stats['raw_bytes'] > result.memory_usage(deep=True).sum()
+
+
+def test_concat_chunks_unions_categories():
+    chunks = [
+        pd.DataFrame({'x': pd.Categorical(['a', 'b'])}),
+        pd.DataFrame({'x': pd.Categorical(['c'])}),
+    ]
+    result = concat_chunks(chunks)
+    assert isinstance(result['x'].dtype, pd.CategoricalDtype)
+    assert result['x'].tolist() == ['a', 'b', 'c']
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import openai
+import pytest
+
+from qianwen_api import (
+    AuthError, DeadlineExceededError, EndpointNotFoundError, GenerationCancelled, GenerationError,
+    InvalidRequestError, NetworkError, QwenClient, RateLimitedError, RateLimiter, RequestTimeoutError,
+    RetryPolicy, ServerError, classify_error,
+)
+
+REQUEST = None
+
+
+class FakeResponse:
+    """SDK 构造状态码异常时只用到响应的状态码、响应头和请求"""
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.request = REQUEST
+
+
+def status_error(error_class, status_code, headers=None):
+    return error_class(f'HTTP {status_code}', response=FakeResponse(status_code, headers), body=None)
+
+
+@pytest.mark.parametrize('error, expected, retryable', [
+    (status_error(openai.AuthenticationError, 401), AuthError, False),
+    (status_error(openai.PermissionDeniedError, 403), AuthError, False),
+    (status_error(openai.NotFoundError, 404), EndpointNotFoundError, False),
+    (status_error(openai.BadRequestError, 400), InvalidRequestError, False),
+    (status_error(openai.RateLimitError, 429), RateLimitedError, True),
+    (status_error(openai.InternalServerError, 503), ServerError, True),
+    (openai.APITimeoutError(request=REQUEST), RequestTimeoutError, True),
+    (openai.APIConnectionError(request=REQUEST), NetworkError, True),
+    (RuntimeError('unexpected'), GenerationError, False),
+])
+def test_classify_error(error, expected, retryable):
+    classified = classify_error(error)
+    assert type(classified) is expected
+    assert classified.retryable is retryable
+
+
+def test_retry_after_is_read_from_headers():
+    error = classify_error(status_error(openai.RateLimitError, 429, {'retry-after': '3'}))
+    assert error.retry_after == 3.0
+    assert error.status_code == 429
+
+
+def test_delay_uses_full_jitter_and_retry_after():
+    policy = RetryPolicy(max_retries=3, backoff=1.0, max_backoff=8.0, deadline=60)
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt) <= min(8.0, 2 ** attempt)
+    assert policy.delay(0, RateLimitedError('slow down', 429, retry_after=5)) >= 5
+    assert policy.delay(0, RateLimitedError('slow down', 429, retry_after=100)) <= 8.0
+
+
+def test_timeout_is_capped_by_remaining_time():
+    policy = RetryPolicy(connect_timeout=10, read_timeout=30, deadline=60)
+    timeout = policy.timeout(remaining=5)
+    assert timeout.read == 5
+    assert timeout.connect == 5
+    assert policy.timeout().read == 30
+
+
+def test_policy_reads_environment(monkeypatch):
+    monkeypatch.setenv('QWEN_MAX_RETRIES', '5')
+    monkeypatch.setenv('QWEN_DEADLINE_SECONDS', 'not a number')
+    policy = RetryPolicy()
+    assert policy.max_retries == 5
+    assert policy.deadline == 60.0
+
+
+@pytest.fixture
+def client():
+    client = QwenClient(api_key='test', base_url='http://localhost:9/v1', model='test')
+    yield client
+    client.close()
+
+
+def failing_call(errors, result='ok'):
+    """依次抛出 errors 中的异常，之后返回 result；记录每次调用的超时"""
+    timeouts = []
+
+    def call(timeout):
+        timeouts.append(timeout)
+        if len(timeouts) <= len(errors):
+            raise errors[len(timeouts) - 1]
+        return result
+
+    return call, timeouts
+
+
+def test_retries_retryable_errors_until_success(client):
+    call, timeouts = failing_call([
+        openai.APIConnectionError(request=REQUEST),
+        status_error(openai.InternalServerError, 502),
+    ])
+    retry = RetryPolicy(max_retries=3, backoff=0.01, deadline=10)
+    assert client._with_retry(call, retry) == 'ok'
+    assert len(timeouts) == 3
+
+
+def test_non_retryable_error_is_raised_immediately(client):
+    call, timeouts = failing_call([status_error(openai.AuthenticationError, 401)])
+    with pytest.raises(AuthError):
+        client._with_retry(call, RetryPolicy(max_retries=3, backoff=0.01, deadline=10))
+    assert len(timeouts) == 1
+
+
+def test_last_error_is_raised_when_retries_run_out(client):
+    call, timeouts = failing_call([status_error(openai.InternalServerError, 500)] * 5)
+    with pytest.raises(ServerError):
+        client._with_retry(call, RetryPolicy(max_retries=2, backoff=0.01, deadline=10))
+    assert len(timeouts) == 3
+
+
+def test_deadline_stops_retrying(client):
+    call, timeouts = failing_call([RateLimitedError('slow down', 429, retry_after=5)] * 5)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        client._with_retry(call, RetryPolicy(max_retries=5, backoff=0.01, max_backoff=8.0, deadline=1))
+    # 需要等待的时间超过剩余时间时不再等待，直接失败
+    assert time.monotonic() - start < 1
+    assert len(timeouts) == 1
+
+
+def test_cancel_interrupts_backoff(client):
+    call, _ = failing_call([RateLimitedError('slow down', 429, retry_after=5)] * 5)
+    cancel_event = threading.Event()
+    threading.Timer(0.1, cancel_event.set).start()
+    start = time.monotonic()
+    with pytest.raises(GenerationCancelled):
+        client._with_retry(call, RetryPolicy(max_retries=3, backoff=0.01, max_backoff=8.0, deadline=30),
+                           cancel_event=cancel_event)
+    assert time.monotonic() - start < 2
+
+
+def test_cancelled_before_first_attempt(client):
+    call, timeouts = failing_call([])
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(GenerationCancelled):
+        client._with_retry(call, RetryPolicy(deadline=10), cancel_event=cancel_event)
+    assert timeouts == []
+
+
+def test_rate_limiter_wait_can_be_cancelled():
+    limiter = RateLimiter(requests_per_minute=6)
+    limiter.wait()
+    cancel_event = threading.Event()
+    threading.Timer(0.1, cancel_event.set).start()
+    start = time.monotonic()
+    with pytest.raises(GenerationCancelled):
+        limiter.wait(cancel_event)
+    assert time.monotonic() - start < 2
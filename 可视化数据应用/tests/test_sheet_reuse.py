@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+import pandas as pd
+
+from workbook import LazyWorkbook, sheet_part_hashes
+
+
+def sheet_frames(changed_score=0):
+    frames = {}
+    for number in range(1, 4):
+        frames[f'子表{number}'] = pd.DataFrame({
+            '姓名': ['张三', '李四', '王五'],
+            '部门': ['研发部', '市场部', '研发部'],
+            '得分': [80 + number, 70 + number, 60 + number],
+        })
+    frames['子表2'].loc[0, '得分'] += changed_score
+    return frames
+
+
+def to_xlsx(frames):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for name, df in frames.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return buffer.getvalue()
+
+
+def test_only_the_changed_sheet_gets_a_new_hash():
+    before = sheet_part_hashes(to_xlsx(sheet_frames()))
+    after = sheet_part_hashes(to_xlsx(sheet_frames(changed_score=5)))
+    assert set(before) == {'子表1', '子表2', '子表3'}
+    assert before['子表1'] == after['子表1']
+    assert before['子表3'] == after['子表3']
+    assert before['子表2'] != after['子表2']
+
+
+def test_shared_string_change_changes_hash():
+    frames = sheet_frames()
+    before = sheet_part_hashes(to_xlsx(frames))
+    frames['子表3'].loc[2, '部门'] = '市场部'
+    frames['子表3'].loc[1, '部门'] = '研发部'
+    after = sheet_part_hashes(to_xlsx(frames))
+    assert before['子表3'] != after['子表3']
+
+
+def test_non_xlsx_content_has_no_hashes():
+    assert sheet_part_hashes(b'a,b\n1,2\n') == {}
+
+
+def test_reuse_unchanged_sheets():
+    previous = LazyWorkbook.open('data.xlsx', to_xlsx(sheet_frames()))
+    previous.load_all()
+    previous.person_index('子表1')
+    current = LazyWorkbook.open('data.xlsx', to_xlsx(sheet_frames(changed_score=5)))
+
+    assert sorted(current.reuse_unchanged_sheets(previous)) == ['子表1', '子表3']
+    # 复用的子表直接使用旧版本的解析结果和索引，修改过的子表重新解析
+    assert current['子表1'] is previous['子表1']
+    assert current.person_index('子表1') is previous.person_index('子表1')
+    assert not current.is_loaded('子表2')
+    assert current['子表2'].loc[0, '得分'] == previous['子表2'].loc[0, '得分'] + 5
+
+
+def test_no_reuse_across_compaction_settings():
+    data = to_xlsx(sheet_frames())
+    previous = LazyWorkbook.open('data.xlsx', data)
+    previous.load_all()
+    current = LazyWorkbook.open('data.xlsx', data, compact=True)
+    assert current.reuse_unchanged_sheets(previous) == []
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+from workbook_cache import WorkbookCache, content_hash
+
+
+def test_content_hash_depends_only_on_content():
+    assert content_hash(b'abc') == content_hash(b'abc')
+    assert content_hash(b'abc') != content_hash(b'abd')
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = WorkbookCache(max_bytes=10, sizeof=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    # 访问 a 后 b 成为最久未使用的条目
+    assert cache.get('a') == 'xxxx'
+    cache.put('c', 'xxxx')
+    assert 'a' in cache and 'c' in cache
+    assert 'b' not in cache
+    assert cache.total_bytes() <= 10
+
+
+def test_keeps_newest_entry_even_if_over_budget():
+    cache = WorkbookCache(max_bytes=10, sizeof=len)
+    cache.put('a', 'xxxx')
+    cache.put('big', 'x' * 100)
+    assert len(cache) == 1
+    assert cache.get('big') == 'x' * 100
+
+
+def test_trim_remeasures_growing_entries():
+    # 按需解析的工作簿会逐渐变大，trim 时按当前大小重新检查预算
+    cache = WorkbookCache(max_bytes=10, sizeof=len)
+    first, second = [1, 2], [3]
+    cache.put('first', first)
+    cache.put('second', second)
+    first.extend(range(20))
+    cache.trim()
+    assert 'first' not in cache
+    assert 'second' in cache
+
+
+def test_hit_and_miss_counts():
+    cache = WorkbookCache(max_bytes=100, sizeof=len)
+    assert cache.get('missing') is None
+    cache.put('a', 'x')
+    cache.get('a')
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_or_create_calls_create_once_under_concurrency():
+    import threading
+    import time
+
+    cache = WorkbookCache(max_bytes=100, sizeof=len)
+    calls = []
+    start = threading.Barrier(8)
+
+    def create():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(cache.get_or_create('key', create))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(created for _, created in results) == [False] * 7 + [True]
+    assert {value for value, _ in results} == {'value'}
+    # get_or_create 不计入命中统计
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_failed_create_can_be_retried():
+    cache = WorkbookCache(max_bytes=100, sizeof=len)
+
+    def broken():
+        raise ValueError('parse failed')
+
+    try:
+        cache.get_or_create('key', broken)
+    except ValueError:
+        pass
+    assert 'key' not in cache
+    assert cache.get_or_create('key', lambda: 'ok') == ('ok', True)
+
+
+def test_peek_does_not_count_or_reorder():
+    cache = WorkbookCache(max_bytes=10, sizeof=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    assert cache.peek('a') == 'xxxx'
+    assert cache.peek('missing') is None
+    assert (cache.hits, cache.misses) == (0, 0)
+    # peek 不把 a 移到最近使用的位置，超出预算时仍先淘汰 a
+    cache.put('c', 'xxxx')
+    assert 'a' not in cache
+
+
+def test_discard_and_describe():
+    cache = WorkbookCache(max_bytes=100, sizeof=len)
+    cache.put('a', 'x')
+    cache.put('b', 'yy')
+    assert [entry['key'] for entry in cache.describe()] == ['b', 'a']
+    assert cache.describe()[0]['bytes'] == 2
+    cache.discard('a')
+    cache.discard('missing')
+    assert [key for key, _ in cache.items()] == ['b']
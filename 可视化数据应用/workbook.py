@@ -0,0 +1,711 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from arrow_cache import disk_cache_key
+from csv_reader import read_csv_chunked
+from metric_matrix import MetricMatrix
+from population_stats import PopulationStats
+from workbook_cache import frame_nbytes
+
+# 文件小于该大小（字节）时并行解析得不偿失，直接串行解析
+PARALLEL_MIN_BYTES = 5 * 1024 * 1024
+
+
+# 文本列不同取值占行数的比例不超过该值时转换为分类类型
+CATEGORY_MAX_RATIO = 0.5
+
+
+def compact_from_env():
+    """是否开启内存压缩（环境变量 WORKBOOK_COMPACT=1）"""
+    return os.environ.get('WORKBOOK_COMPACT', '').lower() in ('1', 'true', 'yes')
+
+
+def _is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _downcast_numeric(series):
+    """把数值列转换为能无损保存数据的最小类型"""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype):
+        if len(series) and series.min() >= 0:
+            return pd.to_numeric(series, downcast='unsigned')
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series.dtype):
+        values = series.to_numpy()
+        finite = values[~np.isnan(values)]
+        # int64 的取值范围是 [-2**63, 2**63)，与浮点数比较时使用精确的边界
+        if (len(finite) == len(values) and np.array_equal(finite, np.round(finite))
+                and (not len(finite) or (finite.min() >= -2.0 ** 63 and finite.max() < 2.0 ** 63))):
+            # 没有空值且都是整数的浮点列（如问题数量）转换为整数，超出 int64 范围时保留浮点类型
+            return _downcast_numeric(series.astype(np.int64))
+        magnitude = np.abs(finite[np.isfinite(finite)])
+        if len(magnitude) and magnitude.max() > np.finfo(np.float32).max:
+            # 超出 float32 范围的值转换后会变成无穷大
+            return series
+        downcast = series.astype(np.float32)
+        if np.array_equal(downcast.to_numpy().astype(values.dtype), values, equal_nan=True):
+            return downcast
+    return series
+
+
+def compact_frame(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    """
+    压缩DataFrame的内存占用
+
+    不同取值较少的文本列转换为分类类型（第一列人员姓名在更省内存时也转换），
+    数值列转换为能无损保存数据的最小整数或浮点类型。
+
+    Returns:
+        压缩后的新DataFrame，原数据不变；没有列时直接返回原数据
+    """
+    if len(df.columns) == 0:
+        return df
+    columns = {}
+    for position in range(len(df.columns)):
+        series = df.iloc[:, position]
+        try:
+            if _is_text(series):
+                if series.nunique(dropna=True) <= len(series) * category_max_ratio:
+                    series = series.astype('category')
+                elif position == 0:
+                    # 人员姓名列只在转换后确实更省内存时使用分类类型（姓名几乎不重复时反而更大）
+                    category = series.astype('category')
+                    if category.memory_usage(deep=True) < series.memory_usage(deep=True):
+                        series = category
+            elif pd.api.types.is_numeric_dtype(series.dtype):
+                series = _downcast_numeric(series)
+        except (TypeError, ValueError):
+            pass
+        columns[position] = series
+    compacted = pd.concat(columns, axis=1)
+    compacted.columns = df.columns
+    return compacted
+
+
+def parallel_workers_from_env():
+    """读取环境变量 WORKBOOK_PARALLEL_WORKERS 配置的并行解析进程数，未配置时为1（串行）"""
+    try:
+        return max(int(os.environ.get('WORKBOOK_PARALLEL_WORKERS', 1)), 1)
+    except ValueError:
+        return 1
+
+
+def pick_excel_engine(file_name):
+    """选择解析Excel的引擎
+
+    优先使用环境变量 EXCEL_ENGINE 指定的引擎；否则在安装了 python-calamine
+    时使用更快的 calamine 引擎，.xlsx 文件回退到只读模式的 openpyxl。
+    """
+    engine = os.environ.get('EXCEL_ENGINE')
+    if engine:
+        return engine
+    try:
+        import python_calamine  # noqa: F401
+        if 'calamine' in pd.ExcelFile._engines:
+            return 'calamine'
+    except ImportError:
+        pass
+    if file_name.lower().endswith(('.xlsx', '.xlsm')):
+        return 'openpyxl'
+    # .xls 等格式交给 pandas 自动选择
+    return None
+
+
+def read_sheet_dimensions(excel_file, data, file_name):
+    """从工作簿元数据读取各子表的行列数，不解析单元格内容
+
+    Returns:
+        {子表名称: (数据行数, 数据列数)}，无法读取时值为 None
+    """
+    dimensions = {name: None for name in excel_file.sheet_names}
+    book = excel_file.book if excel_file.engine == 'openpyxl' else None
+    if book is None and file_name.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            from openpyxl import load_workbook
+            book = load_workbook(io.BytesIO(data), read_only=True, data_only=True, keep_links=False)
+        except Exception:
+            book = None
+    if book is None:
+        return dimensions
+    for name in excel_file.sheet_names:
+        try:
+            worksheet = book[name]
+            if worksheet.max_row is not None and worksheet.max_column is not None:
+                # 第一行是表头
+                dimensions[name] = (max(worksheet.max_row - 1, 0), worksheet.max_column)
+        except Exception:
+            pass
+    return dimensions
+
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+# 引用共享字符串的单元格：<c ... t="s"><v>序号</v></c>
+_SHARED_STRING_CELL = re.compile(rb'<(?:\w+:)?c\b[^>]*?\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)</')
+_SHARED_STRING_ITEM = re.compile(rb'<(?:\w+:)?si\b.*?</(?:\w+:)?si>', re.S)
+
+
+def sheet_part_hashes(data):
+    """计算 .xlsx 文件中每个子表的内容哈希，不解析单元格
+
+    哈希包含子表的XML、其引用的共享字符串以及样式表（影响日期等类型的识别），
+    任何一项变化都会改变哈希。无法读取时返回空字典。
+
+    Returns:
+        {子表名称: 哈希}
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            names = set(archive.namelist())
+            workbook_xml = ET.fromstring(archive.read('xl/workbook.xml'))
+            rels_xml = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+            targets = {}
+            for rel in rels_xml.iter(f'{_PACKAGE_REL_NS}Relationship'):
+                target = rel.get('Target', '')
+                targets[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+
+            shared_strings = []
+            if 'xl/sharedStrings.xml' in names:
+                shared_strings = _SHARED_STRING_ITEM.findall(archive.read('xl/sharedStrings.xml'))
+            common = hashlib.sha256()
+            if 'xl/styles.xml' in names:
+                common.update(archive.read('xl/styles.xml'))
+            workbook_pr = workbook_xml.find(f'{_MAIN_NS}workbookPr')
+            if workbook_pr is not None:
+                common.update(str(workbook_pr.get('date1904')).encode())
+
+            hashes = {}
+            for sheet in workbook_xml.iter(f'{_MAIN_NS}sheet'):
+                part = targets.get(sheet.get(f'{_REL_NS}id'))
+                if part not in names:
+                    continue
+                sheet_xml = archive.read(part)
+                digest = common.copy()
+                digest.update(sheet_xml)
+                for index in sorted({int(index) for index in _SHARED_STRING_CELL.findall(sheet_xml)}):
+                    digest.update(shared_strings[index] if index < len(shared_strings) else b'')
+                hashes[sheet.get('name')] = digest.hexdigest()
+            return hashes
+    except (zipfile.BadZipFile, KeyError, ET.ParseError, OSError):
+        return {}
+
+
+class LazyWorkbook(Mapping):
+    """按需解析子表的工作簿
+
+    创建时只读取子表名称和行列数，某个子表在第一次被访问时才会解析，
+    之后复用解析结果。可以像子表数据字典一样使用：workbook[sheet_name]。
+    提供了磁盘缓存时，解析过的子表会写入缓存，同一文件再次打开时直接从缓存映射读取。
+    """
+
+    def __init__(self, file_name, data=None, engine=None, file_hash=None, disk_cache=None, compact=False):
+        self.file_name = file_name
+        self.data = data
+        self.engine = engine
+        self.file_hash = file_hash
+        self.disk_cache = disk_cache
+        self.compact = compact
+        self._excel_file = None
+        self._frames = {}
+        self._frame_bytes = {}
+        self._raw_bytes = {}
+        self._person_index = {}
+        self._column_values = {}
+        self._population_stats = {}
+        self._metric_matrices = {}
+        self._lock = threading.RLock()
+        self.sheet_names = []
+        self.dimensions = {}
+        self.reused_sheets = []
+        self._sheet_hashes = None
+        # 服务器目录中的文件路径，上传的文件为 None
+        self.source_path = None
+
+    @classmethod
+    def open(cls, file_name, data, engine=None, file_hash=None, disk_cache=None, compact=False):
+        """打开文件内容，只读取元数据
+
+        Args:
+            file_name: 文件名，用于判断文件类型
+            data: 文件内容（bytes）
+            engine: Excel解析引擎，默认自动选择
+            file_hash: 文件内容哈希，使用磁盘缓存时必须提供
+            disk_cache: ArrowSheetCache 实例，为 None 时不使用磁盘缓存
+            compact: 是否在子表加载后压缩内存（见 compact_frame）
+        """
+        if disk_cache is not None and (file_hash is None or not disk_cache.enabled):
+            disk_cache = None
+        workbook = cls(file_name, data, engine, file_hash, disk_cache, compact)
+        manifest = disk_cache.load_manifest(workbook.disk_cache_key) if disk_cache is not None else None
+        if manifest is not None:
+            # 已缓存的文件直接使用清单，不需要打开原文件
+            workbook.sheet_names = manifest['sheet_names']
+            workbook.dimensions = manifest['dimensions']
+        elif workbook.is_csv:
+            # CSV文件只有一个表
+            workbook.sheet_names = ["Sheet1"]
+            workbook.dimensions = {"Sheet1": None}
+        else:
+            excel_file = workbook._open_excel()
+            workbook.sheet_names = list(excel_file.sheet_names)
+            workbook.dimensions = read_sheet_dimensions(excel_file, data, file_name)
+        if disk_cache is not None and manifest is None:
+            disk_cache.save_manifest(workbook.disk_cache_key, workbook.sheet_names, workbook.dimensions)
+        return workbook
+
+    @property
+    def disk_cache_key(self):
+        """磁盘缓存中的键，区分是否开启内存压缩"""
+        return disk_cache_key(self.file_hash, self.compact)
+
+    @property
+    def is_csv(self):
+        return self.file_name.endswith('.csv')
+
+    def _open_excel(self):
+        if self._excel_file is None:
+            if self.engine is None:
+                self.engine = pick_excel_engine(self.file_name)
+            self._excel_file = pd.ExcelFile(io.BytesIO(self.data), engine=self.engine)
+        return self._excel_file
+
+    def _parse_sheet(self, sheet_name, progress=None):
+        """
+        解析单个子表：优先读取磁盘缓存，否则解析原文件（开启压缩时压缩）并写入缓存
+
+        Returns:
+            (子表数据, 压缩前的字节数)，未开启压缩时字节数为 None
+        """
+        cached = self._load_cached_sheet(sheet_name)
+        if cached is not None:
+            return cached
+        if self.is_csv:
+            # 分块读取，开启压缩时每块读取后立即压缩，降低内存峰值；压缩前的大小为各块压缩前的大小之和
+            stats = {} if self.compact else None
+            df = read_csv_chunked(
+                self.data, transform=compact_frame if self.compact else None, progress=progress, stats=stats
+            )
+            raw_bytes = stats['raw_bytes'] if self.compact else None
+        else:
+            df, raw_bytes = self._compact_parsed(self._open_excel().parse(sheet_name))
+        self._save_cached_sheet(sheet_name, df, raw_bytes)
+        return df, raw_bytes
+
+    def _compact_parsed(self, df):
+        """开启压缩时压缩刚解析出的子表，返回 (子表数据, 压缩前的字节数)"""
+        if not self.compact:
+            return df, None
+        return compact_frame(df), frame_nbytes(df)
+
+    def _load_cached_sheet(self, sheet_name):
+        """从磁盘缓存读取子表，返回 (子表数据, 压缩前的字节数)，没有缓存时返回 None"""
+        if self.disk_cache is None:
+            return None
+        df, raw_bytes = self.disk_cache.load_sheet_with_raw_bytes(self.disk_cache_key, sheet_name)
+        if df is None or (self.compact and raw_bytes is None):
+            # 压缩的子表缓存中没有压缩前的大小时是旧版本写入的未压缩数据，重新解析
+            return None
+        return df, raw_bytes
+
+    def _save_cached_sheet(self, sheet_name, df, raw_bytes=None):
+        if self.disk_cache is not None:
+            self.disk_cache.save_sheet(self.disk_cache_key, sheet_name, df, raw_bytes)
+
+    def load_all(self, workers=1):
+        """解析所有尚未加载的子表
+
+        workers 大于1时在多个进程中并行解析；文件较小或待解析的子表少于2个时
+        自动退回串行解析，避免进程启动的开销。
+        """
+        pending = []
+        with self._lock:
+            for sheet_name in self.sheet_names:
+                if sheet_name in self._frames:
+                    continue
+                cached = self._load_cached_sheet(sheet_name)
+                if cached is not None:
+                    self._store(sheet_name, *cached)
+                else:
+                    pending.append(sheet_name)
+
+            use_parallel = (
+                workers > 1
+                and len(pending) > 1
+                and not self.is_csv
+                and self.data is not None
+                and len(self.data) >= PARALLEL_MIN_BYTES
+            )
+            if not use_parallel:
+                for sheet_name in pending:
+                    self._store(sheet_name, *self._parse_sheet(sheet_name))
+                return self
+
+            if self.engine is None:
+                self.engine = pick_excel_engine(self.file_name)
+            # 使用spawn方式启动子进程，避免在多线程的Streamlit服务进程中fork
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_parse_worker,
+                initargs=(self.data, self.engine),
+            ) as executor:
+                for sheet_name, df in zip(pending, executor.map(_parse_sheet_in_worker, pending)):
+                    df, raw_bytes = self._compact_parsed(df)
+                    self._save_cached_sheet(sheet_name, df, raw_bytes)
+                    self._store(sheet_name, df, raw_bytes)
+        return self
+
+    def _store(self, sheet_name, df, raw_bytes=None):
+        """保存已解析（开启压缩时已压缩）的子表；raw_bytes 为压缩前的字节数，为 None 时与当前大小相同"""
+        frame_bytes = frame_nbytes(df)
+        self._frames[sheet_name] = df
+        self._raw_bytes[sheet_name] = frame_bytes if raw_bytes is None else raw_bytes
+        self._frame_bytes[sheet_name] = frame_bytes
+        self.dimensions[sheet_name] = df.shape
+
+    def load_sheet(self, sheet_name, progress=None):
+        """返回子表数据，尚未解析时立即解析；progress(比例) 报告CSV文件的读取进度"""
+        df = self._frames.get(sheet_name)
+        if df is not None:
+            return df
+        if sheet_name not in self.sheet_names:
+            raise KeyError(sheet_name)
+        with self._lock:
+            # 加锁后再检查一次，避免并发访问时重复解析
+            if sheet_name not in self._frames:
+                self._store(sheet_name, *self._parse_sheet(sheet_name, progress))
+            return self._frames[sheet_name]
+
+    def __getitem__(self, sheet_name):
+        return self.load_sheet(sheet_name)
+
+    def __iter__(self):
+        return iter(self.sheet_names)
+
+    def __len__(self):
+        return len(self.sheet_names)
+
+    def is_loaded(self, sheet_name):
+        """子表是否已经解析"""
+        return sheet_name in self._frames
+
+    def loaded_sheets(self):
+        """已经解析的子表名称列表"""
+        return [name for name in self.sheet_names if name in self._frames]
+
+    def nbytes(self):
+        """估算工作簿占用的内存（原始文件内容 + 已解析的子表 + 已构建的数值矩阵和人群统计）"""
+        raw_bytes = len(self.data) if self.data is not None else 0
+        stats_bytes = sum(stats.nbytes() for stats in list(self._population_stats.values()))
+        matrix_bytes = sum(matrix.nbytes() for matrix in list(self._metric_matrices.values()))
+        return raw_bytes + sum(self._frame_bytes.values()) + stats_bytes + matrix_bytes
+
+    def sheet_hashes(self):
+        """各子表的内容哈希（仅 .xlsx/.xlsm），第一次调用时计算"""
+        if self._sheet_hashes is None:
+            is_xlsx = self.file_name.lower().endswith(('.xlsx', '.xlsm'))
+            self._sheet_hashes = sheet_part_hashes(self.data) if is_xlsx and self.data is not None else {}
+        return self._sheet_hashes
+
+    def reuse_unchanged_sheets(self, previous):
+        """从同一文件的旧版本复用内容没有变化的子表
+
+        只比较子表的内容哈希，相同的子表直接使用旧版本已解析的数据及其人员索引、
+        列取值索引和人群统计，修改过的和新增的子表仍按需解析。
+
+        Returns:
+            复用的子表名称列表
+        """
+        if previous is self or previous.compact != self.compact:
+            return []
+        new_hashes = self.sheet_hashes()
+        if not new_hashes:
+            return []
+        old_hashes = previous.sheet_hashes()
+        reused = []
+        with self._lock, previous._lock:
+            for sheet_name in self.sheet_names:
+                sheet_hash = new_hashes.get(sheet_name)
+                if (sheet_hash is None or old_hashes.get(sheet_name) != sheet_hash
+                        or sheet_name in self._frames or sheet_name not in previous._frames):
+                    continue
+                df = previous._frames[sheet_name]
+                self._frames[sheet_name] = df
+                self._frame_bytes[sheet_name] = previous._frame_bytes[sheet_name]
+                self._raw_bytes[sheet_name] = previous._raw_bytes[sheet_name]
+                self.dimensions[sheet_name] = df.shape
+                if sheet_name in previous._metric_matrices:
+                    self._metric_matrices[sheet_name] = previous._metric_matrices[sheet_name]
+                if sheet_name in previous._person_index:
+                    self._person_index[sheet_name] = previous._person_index[sheet_name]
+                if sheet_name in previous._population_stats:
+                    self._population_stats[sheet_name] = previous._population_stats[sheet_name]
+                for key, index in previous._column_values.items():
+                    if key[0] == sheet_name:
+                        self._column_values[key] = index
+                # 同时写入新文件的磁盘缓存，服务重启后也不必重新解析
+                if self.disk_cache is not None and not self.disk_cache.has_sheet(self.disk_cache_key, sheet_name):
+                    self._save_cached_sheet(sheet_name, df)
+                reused.append(sheet_name)
+        self.reused_sheets = reused
+        return reused
+
+    def memory_report(self):
+        """已加载子表压缩前后的内存占用（字节）：(压缩前, 压缩后)"""
+        return sum(self._raw_bytes.values()), sum(self._frame_bytes.values())
+
+    def person_index(self, sheet_name):
+        """子表的人员索引：第一列的值 -> 行位置数组
+
+        每个子表只在第一次查询时构建一次，之后的查询都是哈希表查找。
+        """
+        index = self._person_index.get(sheet_name)
+        if index is not None:
+            return index
+        df = self[sheet_name]
+        with self._lock:
+            if sheet_name not in self._person_index:
+                self._person_index[sheet_name] = build_person_index(df)
+            return self._person_index[sheet_name]
+
+    def person_rows(self, sheet_name, key):
+        """返回子表中第一列等于key的所有行"""
+        positions = self.person_index(sheet_name).get(key, _NO_ROWS)
+        return self[sheet_name].iloc[positions]
+
+    def column_values(self, sheet_name, column):
+        """子表某一列的取值索引（排序后的不同取值及每行的编码），每列只计算一次"""
+        key = (sheet_name, column)
+        index = self._column_values.get(key)
+        if index is not None:
+            return index
+        df = self[sheet_name]
+        with self._lock:
+            if key not in self._column_values:
+                self._column_values[key] = ColumnValueIndex(df[column])
+            return self._column_values[key]
+
+    def population_stats(self, sheet_name):
+        """子表的人群统计（分位数、百分位、排名、Z分数），每个子表只计算一次"""
+        stats = self._population_stats.get(sheet_name)
+        if stats is not None:
+            return stats
+        matrix = self.metric_matrix(sheet_name)
+        with self._lock:
+            if sheet_name not in self._population_stats:
+                self._population_stats[sheet_name] = PopulationStats(matrix=matrix)
+            return self._population_stats[sheet_name]
+
+    def metric_matrix(self, sheet_name):
+        """子表的数值矩阵（MetricMatrix），第一次调用时提取
+
+        不在子表加载时提取：矩阵是数值列的一份副本，只有用到时才占用内存，
+        内存映射读取的子表也只在这时才读入数值列。
+        """
+        matrix = self._metric_matrices.get(sheet_name)
+        if matrix is not None:
+            return matrix
+        df = self[sheet_name]
+        with self._lock:
+            if sheet_name not in self._metric_matrices:
+                self._metric_matrices[sheet_name] = MetricMatrix(df)
+            return self._metric_matrices[sheet_name]
+
+    def person_position(self, sheet_name, key):
+        """人员在子表中第一行的位置，不存在时返回 None"""
+        positions = self.person_index(sheet_name).get(key, _NO_ROWS)
+        return int(positions[0]) if len(positions) else None
+
+
+_NO_ROWS = np.array([], dtype=np.intp)
+
+# 并行解析子进程中打开的工作簿，每个进程只打开一次
+_worker_excel_file = None
+
+
+def _init_parse_worker(data, engine):
+    global _worker_excel_file
+    _worker_excel_file = pd.ExcelFile(io.BytesIO(data), engine=engine)
+
+
+def _parse_sheet_in_worker(sheet_name):
+    return _worker_excel_file.parse(sheet_name)
+
+
+def build_person_index(df):
+    """按第一列构建 值 -> 行位置数组 的哈希表（空值不参与索引）"""
+    if len(df.columns) == 0:
+        return {}
+    return df.groupby(df.iloc[:, 0], sort=False, observed=True).indices
+
+
+def person_rows(sheet_dfs, sheet_name, key):
+    """查找子表中第一列等于key的行
+
+    sheet_dfs 为 LazyWorkbook 时使用人员索引，普通字典时回退到逐行比较。
+    """
+    if isinstance(sheet_dfs, LazyWorkbook):
+        return sheet_dfs.person_rows(sheet_name, key)
+    df = sheet_dfs[sheet_name]
+    return df[df.iloc[:, 0] == key]
+
+
+def person_metrics(sheet_dfs, sheet_name, key, columns=None):
+    """
+    人员在子表中第一行的数值指标
+
+    sheet_dfs 为 LazyWorkbook 时直接取数值矩阵的一行（不指定列时为视图，不复制）。
+
+    Returns:
+        (列名列表, 数值数组)，人员不存在时数值数组为 None
+    """
+    if isinstance(sheet_dfs, LazyWorkbook):
+        matrix = sheet_dfs.metric_matrix(sheet_name)
+        position = sheet_dfs.person_position(sheet_name, key)
+        if position is None:
+            return (matrix.columns if columns is None else list(columns)), None
+        if columns is None:
+            return matrix.columns, matrix.row(position)
+        return list(columns), matrix.row(position, columns)
+    rows = person_rows(sheet_dfs, sheet_name, key)
+    numeric = rows.select_dtypes(include=[np.number])
+    columns = numeric.columns.tolist() if columns is None else list(columns)
+    if rows.empty:
+        return columns, None
+    return columns, rows.iloc[0][columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def people_matrix(sheet_dfs, sheet_name, keys, columns):
+    """
+    一次取出多个人员在指定列上的数值
+
+    每人取第一行，不存在的人员跳过。
+
+    Returns:
+        (人员列表, 形状为 (人数, 列数) 的浮点数组)
+    """
+    df = sheet_dfs[sheet_name]
+    if isinstance(sheet_dfs, LazyWorkbook):
+        index = sheet_dfs.person_index(sheet_name)
+        found = [(key, index[key][0]) for key in keys if key in index and len(index[key])]
+    else:
+        first_positions = np.flatnonzero(~df.iloc[:, 0].duplicated().to_numpy())
+        positions = dict(zip(df.iloc[first_positions, 0].tolist(), first_positions))
+        found = [(key, positions[key]) for key in keys if key in positions]
+    found_keys = [key for key, _ in found]
+    positions = np.array([position for _, position in found], dtype=np.intp)
+    if isinstance(sheet_dfs, LazyWorkbook):
+        return found_keys, sheet_dfs.metric_matrix(sheet_name).rows(positions, columns)
+    values = df[columns].iloc[positions].to_numpy(dtype=np.float64, na_value=np.nan)
+    return found_keys, values
+
+
+def group_means(df, group_column, columns, limit=None):
+    """
+    按分组列计算指定列的平均值
+
+    Args:
+        limit: 只保留人数最多的前若干组
+
+    Returns:
+        (分组名称列表, 形状为 (组数, 列数) 的浮点数组, 各组行数)
+    """
+    grouped = df.groupby(group_column, sort=False, observed=True, dropna=True)
+    means = grouped[columns].mean()
+    sizes = grouped.size()
+    if limit is not None and len(sizes) > limit:
+        sizes = sizes.nlargest(limit)
+        means = means.loc[sizes.index]
+    else:
+        sizes = sizes.loc[means.index]
+    return means.index.tolist(), means.to_numpy(dtype=np.float64, na_value=np.nan), sizes.to_numpy()
+
+
+def person_statistics(sheet_dfs, sheet_name, key):
+    """
+    查找人员在子表人群中的统计
+
+    Returns:
+        (PopulationStats, 人员第一行的位置)，人员不存在时位置为 None。
+        sheet_dfs 为普通字典时每次重新计算统计。
+    """
+    if isinstance(sheet_dfs, LazyWorkbook):
+        return sheet_dfs.population_stats(sheet_name), sheet_dfs.person_position(sheet_name, key)
+    df = sheet_dfs[sheet_name]
+    positions = np.flatnonzero((df.iloc[:, 0] == key).to_numpy())
+    return PopulationStats(df), (int(positions[0]) if len(positions) else None)
+
+
+class ColumnValueIndex:
+    """一列数据的取值索引
+
+    把列转换为编码（codes）和排序后的不同取值（values），筛选时比较整数编码；
+    另外保存按字符串排序的小写键，支持前缀查找（二分）和子串查找（向量化），
+    只返回前若干个匹配项，适合取值非常多的列。
+    """
+
+    def __init__(self, series):
+        try:
+            codes, uniques = pd.factorize(series, sort=True)
+        except TypeError:
+            # 混合类型无法直接排序时按字符串排序
+            codes, uniques = pd.factorize(series)
+            order = np.argsort(np.array([str(value) for value in uniques]), kind='stable')
+            remap = np.empty(len(order), dtype=np.intp)
+            remap[order] = np.arange(len(order))
+            codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+            uniques = uniques.take(order)
+        self.codes = codes
+        self.values = uniques
+        # 使用对象数组保存变长字符串；定长的 str 数组按最长的取值分配每一项，一个很长的取值会放大整个索引
+        keys = np.empty(len(uniques), dtype=object)
+        keys[:] = [str(value).lower() for value in uniques]
+        self._key_order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._key_order]
+        self._keys = keys
+
+    def __len__(self):
+        return len(self.values)
+
+    def options(self, limit=None):
+        """排序后的取值列表，limit 限制返回数量"""
+        values = self.values if limit is None else self.values[:limit]
+        return values.tolist()
+
+    def search(self, query, limit=200):
+        """查找包含query的取值：前缀匹配在前，其余子串匹配在后，最多返回limit个"""
+        query = str(query).strip().lower()
+        if not query:
+            return self.options(limit)
+        start = np.searchsorted(self._sorted_keys, query, side='left')
+        end = np.searchsorted(self._sorted_keys, query + '\uffff', side='left')
+        prefix_positions = np.sort(self._key_order[start:end])[:limit]
+        positions = prefix_positions
+        if len(positions) < limit:
+            contains = np.flatnonzero(pd.Series(self._keys, copy=False).str.contains(query, regex=False).to_numpy())
+            contains = contains[~np.isin(contains, prefix_positions)]
+            positions = np.concatenate([prefix_positions, contains[:limit - len(positions)]])
+        return self.values.take(positions).tolist()
+
+    def rows(self, value):
+        """取值为value的行位置"""
+        code = self.values.get_indexer([value])[0]
+        if code < 0:
+            return _NO_ROWS
+        return np.flatnonzero(self.codes == code)
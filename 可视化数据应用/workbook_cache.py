@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 默认内存预算（MB），可通过环境变量 WORKBOOK_CACHE_MB 调整
+DEFAULT_CACHE_MB = 1024
+
+
+def content_hash(data):
+    """计算上传文件内容的哈希值，作为缓存键"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def frame_nbytes(df):
+    """估算DataFrame占用的内存字节数（包含字符串对象）"""
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+def cache_budget_bytes():
+    """读取环境变量中的内存预算配置"""
+    try:
+        budget_mb = float(os.environ.get('WORKBOOK_CACHE_MB', DEFAULT_CACHE_MB))
+    except ValueError:
+        budget_mb = DEFAULT_CACHE_MB
+    return int(budget_mb * 1024 * 1024)
+
+
+class WorkbookCache:
+    """按内容哈希缓存已解析工作簿的LRU缓存
+
+    条目大小由 sizeof 估算，并在每次淘汰时重新计算（按需解析的工作簿会逐渐变大）。
+    总量超过预算时从最久未使用的条目开始淘汰；最近使用的条目即使单独超过预算也会保留，
+    避免每次重新运行都重新解析。
+    """
+
+    def __init__(self, max_bytes=None, sizeof=None):
+        self.max_bytes = cache_budget_bytes() if max_bytes is None else max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._entries = OrderedDict()
+        self._last_access = {}
+        self._lock = threading.Lock()
+        # 正在创建的条目各自的锁，同一个键只创建一次
+        self._creating = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """读取缓存，命中时将条目移到最近使用的位置"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._last_access[key] = time.time()
+            self.hits += 1
+            return self._entries[key]
+
+    def peek(self, key):
+        """读取缓存但不计入命中和未命中次数，也不改变淘汰顺序；不存在时返回 None"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def get_or_create(self, key, create):
+        """读取缓存，不存在时调用 create() 创建并写入
+
+        多个线程（会话）同时请求同一个键时只有一个会调用 create，其余等待后直接使用结果。
+        不计入命中和未命中次数（调用方通常已先用 get 检查过）。
+
+        Returns:
+            (值, 是否由本次调用创建)
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._last_access[key] = time.time()
+                return value, False
+            key_lock = self._creating.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                value = self._entries.get(key)
+            if value is not None:
+                return value, False
+            try:
+                return self.put(key, create()), True
+            finally:
+                with self._lock:
+                    self._creating.pop(key, None)
+
+    def put(self, key, value):
+        """写入缓存并按内存预算淘汰旧条目"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._last_access[key] = time.time()
+            self._evict()
+        return value
+
+    def discard(self, key):
+        """删除一个条目（不存在时忽略）"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._last_access.pop(key, None)
+
+    def trim(self):
+        """按当前估算大小重新检查预算"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        sizes = {key: self.sizeof(value) for key, value in self._entries.items()}
+        total = sum(sizes.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self._last_access.pop(key, None)
+            total -= sizes[key]
+
+    def items(self):
+        """按最近使用顺序（最新的在前）返回所有条目，不改变顺序"""
+        with self._lock:
+            return list(reversed(self._entries.items()))
+
+    def describe(self):
+        """每个条目的键、值、估算大小和最近访问时间，按最近使用顺序（最新的在前），不改变顺序"""
+        with self._lock:
+            return [
+                {'key': key, 'value': value, 'bytes': self.sizeof(value), 'last_access': self._last_access.get(key)}
+                for key, value in reversed(self._entries.items())
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_access.clear()
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(self.sizeof(value) for value in self._entries.values())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def shared_workbook_cache(sizeof=None):
+    """进程内所有会话共享的工作簿缓存
+
+    同一份文件内容只解析、保存一次，各会话以只读方式共用，内存占用与不同工作簿的数量相关，
+    与用户数无关。预算由环境变量 WORKBOOK_CACHE_MB 设置。sizeof 只在第一次调用时生效。
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = WorkbookCache(sizeof=sizeof)
+        return _shared_cache
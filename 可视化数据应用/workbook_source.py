@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+服务器目录数据源
+
+环境变量 WORKBOOK_DIR 指定一个服务器上的目录时，页面可以直接从目录中选择工作簿，不必每次都上传。
+每个文件的内容哈希按修改时间和大小缓存：文件没有变化时只需一次 stat，不读取文件内容，
+已解析的工作簿直接从共享缓存中取出；修改时间或大小变化后才重新读取并计算哈希，
+哈希变化的文件才会重新解析。
+
+环境变量 WORKBOOK_DIR_PREFETCH=1 时，后台线程每隔 WORKBOOK_DIR_SCAN_SECONDS 秒（默认30秒）
+扫描一次目录，预先解析新增或修改过的文件，用户打开时不必等待解析。
+"""
+
+import os
+import threading
+import time
+
+from workbook_cache import content_hash
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+DEFAULT_SCAN_SECONDS = 30
+
+
+def workbook_dir_from_env():
+    """读取环境变量 WORKBOOK_DIR 配置的工作簿目录，未配置或目录不存在时返回 None"""
+    path = os.environ.get('WORKBOOK_DIR')
+    if not path or not os.path.isdir(path):
+        return None
+    return path
+
+
+def prefetch_from_env():
+    """是否在后台预先解析目录中的文件：环境变量 WORKBOOK_DIR_PREFETCH=1"""
+    return os.environ.get('WORKBOOK_DIR_PREFETCH', '').lower() in ('1', 'true', 'yes')
+
+
+def scan_seconds_from_env():
+    """读取环境变量 WORKBOOK_DIR_SCAN_SECONDS 配置的后台扫描间隔（秒）"""
+    try:
+        return max(float(os.environ.get('WORKBOOK_DIR_SCAN_SECONDS', DEFAULT_SCAN_SECONDS)), 1.0)
+    except ValueError:
+        return DEFAULT_SCAN_SECONDS
+
+
+class ServerFile:
+    """目录中的一个文件
+
+    与 st.file_uploader 返回的对象一样提供 name、size 和 getvalue()，另外带有文件路径（path）
+    和已知的内容哈希（file_hash），文件内容只有在调用 getvalue() 时才读取。
+    """
+
+    def __init__(self, path, size, file_hash, data=None):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = size
+        self.file_hash = file_hash
+        self._data = data
+
+    def getvalue(self):
+        if self._data is None:
+            with open(self.path, 'rb') as f:
+                self._data = f.read()
+        return self._data
+
+
+class WorkbookDirectory:
+    """服务器上的工作簿目录
+
+    只列出目录第一层中支持的文件（不包括隐藏文件和子目录）。
+    每个文件记录 (修改时间, 大小, 哈希)，修改时间和大小不变时直接使用记录的哈希。
+    """
+
+    def __init__(self, root, extensions=SUPPORTED_EXTENSIONS):
+        self.root = os.path.abspath(root)
+        self.extensions = tuple(extensions)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def list_files(self):
+        """
+        列出目录中的工作簿
+
+        Returns:
+            按文件名排序的列表，每项为 {'name', 'size', 'mtime'}
+        """
+        files = []
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.') or not entry.name.lower().endswith(self.extensions):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append({'name': entry.name, 'size': stat.st_size, 'mtime': stat.st_mtime})
+        except OSError:
+            return []
+        files.sort(key=lambda info: info['name'])
+        return files
+
+    def _path(self, name):
+        # 只接受目录第一层的文件名，不允许通过路径访问目录以外的文件
+        if os.path.basename(name) != name or name.startswith('.'):
+            raise ValueError(f"无效的文件名: {name}")
+        return os.path.join(self.root, name)
+
+    def get(self, name):
+        """
+        打开目录中的文件
+
+        修改时间和大小与上次记录相同时不读取文件内容；否则读取文件并重新计算哈希，
+        读取的内容保留在返回的对象中，解析时不必再读一次。
+
+        Raises:
+            ValueError: 文件名无效
+            OSError: 文件不存在或无法读取
+        """
+        path = self._path(name)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is not None and entry[:2] == signature:
+            return ServerFile(path, stat.st_size, entry[2])
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        file_hash = content_hash(data)
+        with self._lock:
+            # 使用读取之前的 stat：读取期间文件再次被修改时，下次访问会发现修改时间不同并重新计算
+            self._entries[name] = (stat.st_mtime_ns, stat.st_size, file_hash)
+        return ServerFile(path, len(data), file_hash, data)
+
+    def known_hash(self, name):
+        """不读取文件，返回记录中的哈希；文件已修改或还没有记录时返回 None"""
+        try:
+            stat = os.stat(self._path(name))
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return entry[2]
+
+
+class DirectoryPrefetcher:
+    """后台线程定期扫描目录，对新增或修改过的文件调用 load 预先解析
+
+    load(server_file) 在后台线程中运行，不能调用页面组件。
+    单个文件解析失败只记录错误，不影响其他文件，文件修改后会再次尝试。
+    """
+
+    def __init__(self, directory, load, interval=None):
+        self.directory = directory
+        self.load = load
+        self.interval = scan_seconds_from_env() if interval is None else interval
+        self.errors = {}
+        self.last_scan = None
+        self._loaded = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='workbook-prefetch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.scan_once()
+            self._stop.wait(self.interval)
+
+    def scan_once(self):
+        """扫描一次目录，解析哈希与上次预解析时不同的文件"""
+        for info in self.directory.list_files():
+            if self._stop.is_set():
+                break
+            name = info['name']
+            try:
+                server_file = self.directory.get(name)
+                if self._loaded.get(name) == server_file.file_hash:
+                    continue
+                self.load(server_file)
+                self._loaded[name] = server_file.file_hash
+                self.errors.pop(name, None)
+            except Exception as e:
+                self.errors[name] = str(e)
+        self.last_scan = time.time()
+
+
+_shared_directory = None
+_shared_prefetcher = None
+_shared_lock = threading.Lock()
+
+
+def shared_workbook_directory(root, load=None):
+    """
+    进程内共享的工作簿目录
+
+    Args:
+        root: 目录路径，只在第一次调用时生效
+        load: 预解析函数，环境变量 WORKBOOK_DIR_PREFETCH=1 时第一次调用会用它启动后台扫描线程
+    """
+    global _shared_directory, _shared_prefetcher
+    with _shared_lock:
+        if _shared_directory is None:
+            _shared_directory = WorkbookDirectory(root)
+        if _shared_prefetcher is None and load is not None and prefetch_from_env():
+            _shared_prefetcher = DirectoryPrefetcher(_shared_directory, load).start()
+        return _shared_directory
+
+
+def shared_prefetcher():
+    """后台预解析线程，未开启时返回 None"""
+    return _shared_prefetcher